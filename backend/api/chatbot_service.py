@@ -7,6 +7,8 @@ import concurrent.futures
 from typing import List, Dict, Any
 from decouple import config
 
+from .utils.resilience import get_upstream
+
 
 class ChatbotService:
     """
@@ -20,6 +22,8 @@ class ChatbotService:
         self.model = "gpt-5.2"
         self._assistant = None
         self._created_threads = {}  # Cache mapping of user thread IDs to Backboard thread IDs
+        # Timeouts, retries and the circuit breaker for Backboard calls
+        self.upstream = get_upstream("backboard")
         
         if not self.backboard_api_key:
             raise ValueError("BACKBOARD_API_KEY not configured in environment")
@@ -27,7 +31,10 @@ class ChatbotService:
         # Lazy import to avoid issues if backboard-sdk is not installed
         try:
             from backboard import BackboardClient
-            self.client = BackboardClient(api_key=self.backboard_api_key)
+            self.client = BackboardClient(
+                api_key=self.backboard_api_key,
+                timeout=self.upstream.policy.timeout_s
+            )
         except ImportError:
             raise ImportError("backboard-sdk not installed. Please install it to use the chatbot.")
     
@@ -43,7 +50,8 @@ class ChatbotService:
         Get or create the assistant (cached to avoid recreation on each call).
         """
         if self._assistant is None:
-            self._assistant = await self.client.create_assistant(
+            # Not idempotent: a retry after a lost response would leave a duplicate assistant
+            self._assistant = await self.upstream.call(lambda: self.client.create_assistant(
                 name="FinSight AI Assistant",
                 system_prompt=(
                     "You are FinSight AI, a specialized financial intelligence engine designed for high-precision analysis of "
@@ -62,7 +70,7 @@ class ChatbotService:
                     "5. FORMATTING: Use 'Bottom Line Up Front' (BLUF). Use Markdown tables for data comparisons and bold "
                     "headers for scannability. Be concise but thorough."
                 )
-            )
+            ), idempotent=False)
         return self._assistant
     
     async def generate_response(
@@ -92,11 +100,11 @@ class ChatbotService:
             # Create or reuse thread with proper caching
             if thread_id not in self._created_threads:
                 try:
-                    thread = await self.client.get_thread(thread_id)
+                    thread = await self.upstream.call(lambda: self.client.get_thread(thread_id))
                     self._created_threads[thread_id] = thread.thread_id
                 except Exception:
                     # Thread doesn't exist, create a new one with the user's thread_id
-                    thread = await self.client.create_thread(assistant.assistant_id)
+                    thread = await self.upstream.call(lambda: self.client.create_thread(assistant.assistant_id))
                     # Store the actual thread ID returned by Backboard
                     self._created_threads[thread_id] = thread.thread_id
             
@@ -117,13 +125,17 @@ class ChatbotService:
                 context = "\n".join(context_messages)
                 full_message = f"Previous conversation:\n{context}\n\nCurrent message: {message}"
             
-            # Send message to Backboard
-            response = await self.client.add_message(
-                thread_id=actual_thread_id,
-                content=full_message,
-                llm_provider=self.provider,
-                model_name=self.model,
-                stream=False
+            # Send message to Backboard. Not retried: a timed-out message may still
+            # have been appended to the thread.
+            response = await self.upstream.call(
+                lambda: self.client.add_message(
+                    thread_id=actual_thread_id,
+                    content=full_message,
+                    llm_provider=self.provider,
+                    model_name=self.model,
+                    stream=False
+                ),
+                idempotent=False
             )
             
             return response.content
@@ -0,0 +1,311 @@
+"""
+Resilient calls to upstream APIs (Backboard).
+
+Backend copy of models/resilience.py (the two services are deployed
+separately); settings are read with decouple instead of os.getenv.
+
+Each upstream gets a ResilientUpstream with its own policy:
+
+- a per-attempt timeout,
+- jittered exponential retries for idempotent calls (timeouts, connection
+  errors, 429 and 5xx only),
+- optional hedging: when an attempt is still running after the upstream's
+  observed p95 latency, a duplicate is started and the first success wins,
+- a circuit breaker that fails fast after repeated failures and lets a single
+  probe through once the reset period has passed.
+
+Policies come from settings, e.g. UPSTREAM_BACKBOARD_TIMEOUT_S,
+UPSTREAM_BACKBOARD_RETRIES, UPSTREAM_BACKBOARD_HEDGE (see get_upstream).
+"""
+
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from decouple import config
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+_RETRYABLE_ERROR_NAMES = ("Timeout", "Connect", "Connection", "Network", "RemoteProtocol", "ServerError", "RateLimit")
+
+
+class CircuitOpenError(RuntimeError):
+    """The upstream has failed repeatedly; calls fail fast until the breaker resets."""
+
+
+class UpstreamTimeoutError(TimeoutError):
+    """An attempt exceeded the upstream's timeout."""
+
+
+@dataclass
+class UpstreamPolicy:
+    timeout_s: float = 60.0
+    retries: int = 2
+    backoff_base_s: float = 0.5
+    backoff_max_s: float = 8.0
+    hedge: bool = False
+    # Hedge after the observed p95 latency, but never sooner than this
+    hedge_min_delay_s: float = 1.0
+    breaker_failures: int = 5
+    breaker_reset_s: float = 30.0
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of an upstream error response, if the error carries one."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient failures only: timeouts, connection problems, 429 and 5xx responses."""
+    if isinstance(error, (UpstreamTimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status_code = _status_code(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    name = type(error).__name__
+    message = str(error)
+    return any(part in name for part in _RETRYABLE_ERROR_NAMES) or "timed out" in message or "Connection error" in message
+
+
+def _consume_result(task: "asyncio.Future"):
+    if not task.cancelled():
+        task.exception()
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open (one probe) after the reset period."""
+
+    def __init__(self, failure_threshold: int, reset_s: float):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_s else "open"
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may go through now. Returns True
+        when the caller is the half-open probe and must end it (see abandon_probe).
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if time.monotonic() - self._opened_at < self.reset_s or self._probe_in_flight:
+                raise CircuitOpenError("upstream circuit is open")
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None and not self._probe_in_flight:
+                # A call that started before the breaker opened; only the probe may close it
+                return
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def abandon_probe(self):
+        """The probe ended without a verdict (e.g. cancelled): reopen for another reset period."""
+        with self._lock:
+            if self._probe_in_flight:
+                self._probe_in_flight = False
+                self._opened_at = time.monotonic()
+
+
+class ResilientUpstream:
+    """Timeouts, retries, hedging and a circuit breaker around calls to one upstream."""
+
+    def __init__(self, name: str, policy: Optional[UpstreamPolicy] = None):
+        self.name = name
+        self.policy = policy or UpstreamPolicy()
+        self.breaker = CircuitBreaker(self.policy.breaker_failures, self.policy.breaker_reset_s)
+        self._latencies: deque = deque(maxlen=512)
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+            "failures": 0, "timeouts": 0, "rejected": 0
+        }
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def _hedge_delay(self) -> float:
+        p95 = self._percentile(0.95)
+        return max(self.policy.hedge_min_delay_s, p95 or 0.0)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.policy.backoff_max_s, self.policy.backoff_base_s * (2 ** attempt)))
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self._count("attempts")
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(fn(), timeout=self.policy.timeout_s)
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            raise UpstreamTimeoutError(f"{self.name} call timed out after {self.policy.timeout_s:.0f}s")
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+        return result
+
+    async def _hedged_attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run one attempt; if it outlives the hedge delay, race a duplicate against it."""
+        primary = asyncio.ensure_future(self._attempt(fn))
+        done, _ = await asyncio.wait({primary}, timeout=self._hedge_delay())
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        hedge = asyncio.ensure_future(self._attempt(fn))
+        pending = {primary, hedge}
+        for task in pending:
+            # The losing attempt's error is irrelevant once the other one succeeds
+            task.add_done_callback(_consume_result)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, fn: Callable[[], Awaitable[T]], idempotent: bool = True, hedge: bool = True) -> T:
+        """
+        Call `fn()` (a coroutine factory, invoked once per attempt). Non-idempotent
+        calls get the timeout and the breaker but are never retried or hedged;
+        `hedge=False` keeps retries but never runs two attempts at once.
+        """
+        self._count("calls")
+        probe = self._admit()
+        attempts = 1 + (self.policy.retries if idempotent else 0)
+        try:
+            for attempt in range(attempts):
+                try:
+                    if idempotent and hedge and self.policy.hedge:
+                        result = await self._hedged_attempt(fn)
+                    else:
+                        result = await self._attempt(fn)
+                    self.breaker.record_success()
+                    return result
+                except asyncio.CancelledError:
+                    raise
+                except CircuitOpenError:
+                    # Raised by a call nested on this same breaker: says nothing about the upstream
+                    self._count("failures")
+                    raise
+                except Exception as e:
+                    retryable = is_retryable(e)
+                    if retryable:
+                        self.breaker.record_failure()
+                    elif _status_code(e) is not None:
+                        # A client error (4xx) is still an answer: the upstream is up
+                        self.breaker.record_success()
+                    if not retryable or attempt == attempts - 1:
+                        self._count("failures")
+                        raise
+                    self._count("retries")
+                    await asyncio.sleep(self._backoff(attempt))
+                    probe = self._admit()
+        finally:
+            # A probe that was cancelled (client disconnect) must not hold the breaker half-open forever
+            if probe:
+                self.breaker.abandon_probe()
+
+    def _admit(self) -> bool:
+        """breaker.before_call, counting rejections; True when this call is the half-open probe."""
+        try:
+            return self.breaker.before_call()
+        except CircuitOpenError:
+            self._count("rejected")
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open); failing fast")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        p50, p95 = self._percentile(0.5), self._percentile(0.95)
+        return {
+            **counters,
+            "circuit": self.breaker.state,
+            "latency_p50_s": round(p50, 3) if p50 is not None else None,
+            "latency_p95_s": round(p95, 3) if p95 is not None else None,
+            "policy": {
+                "timeout_s": self.policy.timeout_s,
+                "retries": self.policy.retries,
+                "hedge": self.policy.hedge
+            }
+        }
+
+
+_DEFAULT_POLICIES = {
+    "backboard": UpstreamPolicy(timeout_s=120.0, retries=2, hedge=False),
+}
+
+# Singleton instances, one per upstream name
+_upstreams: Dict[str, ResilientUpstream] = {}
+_upstreams_lock = threading.Lock()
+
+
+def _env(name: str, key: str, default: Any) -> Any:
+    return config(f"UPSTREAM_{name.upper()}_{key}", default=default, cast=type(default))
+
+
+def get_upstream(name: str) -> ResilientUpstream:
+    """Get or create the resilient wrapper for an upstream, with UPSTREAM_<NAME>_* overrides."""
+    with _upstreams_lock:
+        if name not in _upstreams:
+            base = _DEFAULT_POLICIES.get(name, UpstreamPolicy())
+            _upstreams[name] = ResilientUpstream(name, UpstreamPolicy(
+                timeout_s=_env(name, "TIMEOUT_S", base.timeout_s),
+                retries=_env(name, "RETRIES", base.retries),
+                backoff_base_s=_env(name, "BACKOFF_BASE_S", base.backoff_base_s),
+                backoff_max_s=_env(name, "BACKOFF_MAX_S", base.backoff_max_s),
+                hedge=_env(name, "HEDGE", base.hedge),
+                hedge_min_delay_s=_env(name, "HEDGE_MIN_DELAY_S", base.hedge_min_delay_s),
+                breaker_failures=_env(name, "BREAKER_FAILURES", base.breaker_failures),
+                breaker_reset_s=_env(name, "BREAKER_RESET_S", base.breaker_reset_s)
+            ))
+        return _upstreams[name]
+
+
+def upstream_status() -> Dict[str, Any]:
+    """Status of every upstream used so far in this process."""
+    with _upstreams_lock:
+        return {name: upstream.status() for name, upstream in _upstreams.items()}
@@ -1,18 +1,47 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from audiotext.router import router as transcription_router
+from audiotext.service import close_audio_transcription_service, get_audio_transcription_service
 from filtertext.router import router as filtertext_router
+from filtertext.model_registry import get_pii_model_registry
+from filtertext.executor import get_redaction_executor
+from jobs.router import JOB_HANDLERS, router as jobs_router
+from jobs.service import get_job_queue
 
 # Load environment variables
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up shared resources on startup."""
+    # Load the PII model in a worker thread so /health keeps answering during the load;
+    # /ready reports 503 until the model is warm.
+    warmup_task = asyncio.create_task(asyncio.to_thread(get_pii_model_registry().load))
+    # One Groq client and connection pool for the whole process
+    if os.getenv("GROQ_API_KEY"):
+        get_audio_transcription_service()
+    # Job workers; jobs left queued or running by the last process are picked up again
+    await get_job_queue().start(JOB_HANDLERS)
+    yield
+    await get_job_queue().stop()
+    if not warmup_task.done():
+        warmup_task.cancel()
+    get_redaction_executor().shutdown()
+    await close_audio_transcription_service()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="FinSight Audio Transcription and Processing API",
     description="API for transcribing audio files and processing transcripts with PII filtering and structured output generation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Get allowed origins from environment or default to localhost
@@ -30,6 +59,7 @@ app.add_middleware(
 # Mount routers
 app.include_router(transcription_router)
 app.include_router(filtertext_router)
+app.include_router(jobs_router)
 
 
 @app.get("/")
@@ -40,9 +70,15 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "transcribe": "/transcribe",
+            "transcription_status": "/transcribe/status",
             "process_transcript": "/filtertext/process",
             "process_transcript_file": "/filtertext/process-file",
-            "processing_status": "/filtertext/status"
+            "redact_transcript": "/filtertext/redact",
+            "processing_status": "/filtertext/status",
+            "transcribe_job": "/jobs/transcribe",
+            "process_transcript_job": "/jobs/filtertext/process",
+            "job_status": "/jobs/{job_id}",
+            "readiness": "/ready"
         }
     }
 
@@ -53,6 +89,15 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check endpoint. Ready once the PII model is warm."""
+    registry = get_pii_model_registry()
+    if not registry.is_ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready", "pii_model": registry.status()}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
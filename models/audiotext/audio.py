@@ -0,0 +1,231 @@
+"""
+Local audio handling for long recordings.
+
+Long calls are not sent to Whisper in one request. The upload is decoded to
+PCM WAV on disk (directly for PCM .wav files, through ffmpeg for anything
+else), an RMS energy envelope is computed in blocks, and the recording is cut
+into windows at the quietest point near each target boundary. Windows overlap
+slightly so a word clipped at a cut is heard in full by one of them; each
+window owns the span between its cuts, and stitch_segments keeps only the
+segments a window owns and drops text repeated across the join.
+
+Samples are streamed from disk block by block, so memory does not grow with
+the length of the recording.
+"""
+
+import io
+import re
+import shutil
+import subprocess
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Tuple
+
+import numpy as np
+
+FFMPEG = shutil.which("ffmpeg")
+
+# Energy envelope resolution and the block size used when scanning the file
+ENVELOPE_FRAME_S = 0.02
+_SCAN_BLOCK_S = 10.0
+_WORD_RE = re.compile(r"[\w']+")
+
+
+class AudioDecodeError(ValueError):
+    """The upload could not be decoded to PCM audio."""
+
+
+@dataclass
+class AudioWindow:
+    """One piece of the recording: audio spans [start_s, end_s], it owns [own_start_s, own_end_s)."""
+
+    index: int
+    start_s: float
+    end_s: float
+    own_start_s: float
+    own_end_s: float
+
+
+def pcm_to_mono(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """Interleaved PCM frames as float32 mono samples in [-1, 1]."""
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        samples = values.astype(np.float32) / float(1 << 23)
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise AudioDecodeError(f"unsupported sample width: {sample_width} bytes")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _is_pcm_wav(path: Path) -> bool:
+    try:
+        with wave.open(str(path), "rb"):
+            return True
+    except (wave.Error, EOFError):
+        return False
+
+
+def decode_to_wav(audio_file: BinaryIO, filename: str, work_dir: Path) -> Path:
+    """
+    Copy the upload into `work_dir` and return a PCM WAV path for it, converting
+    with ffmpeg when it is not already PCM WAV.
+    """
+    source = work_dir / f"source{Path(filename).suffix.lower() or '.bin'}"
+    audio_file.seek(0)
+    with open(source, "wb") as f:
+        shutil.copyfileobj(audio_file, f, 1024 * 1024)
+    if _is_pcm_wav(source):
+        return source
+    if FFMPEG is None:
+        raise AudioDecodeError("ffmpeg is required to split non-PCM audio (install ffmpeg or upload a PCM .wav)")
+
+    target = work_dir / "decoded.wav"
+    # 16 kHz mono is what Whisper works at; anything more is upload size for nothing
+    result = subprocess.run(
+        [FFMPEG, "-nostdin", "-v", "error", "-y", "-i", str(source), "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le", str(target)],
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise AudioDecodeError(f"ffmpeg could not decode the upload: {result.stderr.decode('utf-8', 'replace')[-300:]}")
+    return target
+
+
+def energy_envelope(wav_path: Path, frame_s: float = ENVELOPE_FRAME_S) -> Tuple[np.ndarray, float]:
+    """RMS energy per `frame_s` frame and the duration in seconds, reading the file in blocks."""
+    with wave.open(str(wav_path), "rb") as wav:
+        rate, width, channels, total = wav.getframerate(), wav.getsampwidth(), wav.getnchannels(), wav.getnframes()
+        frame_len = max(1, int(rate * frame_s))
+        block_frames = frame_len * max(1, int(_SCAN_BLOCK_S / frame_s))
+        envelope: List[np.ndarray] = []
+        while True:
+            raw = wav.readframes(block_frames)
+            if not raw:
+                break
+            samples = pcm_to_mono(raw, width, channels)
+            usable = len(samples) - len(samples) % frame_len
+            if usable:
+                frames = samples[:usable].reshape(-1, frame_len)
+                envelope.append(np.sqrt(np.mean(frames * frames, axis=1)))
+            if usable < len(samples):
+                tail = samples[usable:]
+                envelope.append(np.array([np.sqrt(np.mean(tail * tail))], dtype=np.float32))
+    energy = np.concatenate(envelope) if envelope else np.zeros(0, dtype=np.float32)
+    return energy, total / float(rate)
+
+
+def plan_windows(
+    envelope: np.ndarray,
+    duration_s: float,
+    window_s: float,
+    overlap_s: float,
+    search_s: float,
+    frame_s: float = ENVELOPE_FRAME_S
+) -> List[AudioWindow]:
+    """
+    Cut points at the quietest frame in the last `search_s` before each
+    `window_s` boundary; each window then extends `overlap_s` past its cuts.
+    """
+    cuts = [0.0]
+    while duration_s - cuts[-1] > window_s:
+        target = cuts[-1] + window_s
+        lo = max(cuts[-1] + window_s / 2, target - search_s)
+        first, last = int(lo / frame_s), int(target / frame_s)
+        region = envelope[first:last]
+        cut = (first + int(np.argmin(region))) * frame_s if len(region) else target
+        cuts.append(cut)
+    cuts.append(duration_s)
+
+    return [
+        AudioWindow(
+            index=i,
+            start_s=max(0.0, cuts[i] - overlap_s),
+            end_s=min(duration_s, cuts[i + 1] + overlap_s),
+            own_start_s=cuts[i],
+            own_end_s=cuts[i + 1]
+        )
+        for i in range(len(cuts) - 1)
+    ]
+
+
+def read_window(wav_path: Path, window: AudioWindow) -> bytes:
+    """The window's audio as a standalone WAV file, in the source format."""
+    with wave.open(str(wav_path), "rb") as wav:
+        rate = wav.getframerate()
+        start = int(window.start_s * rate)
+        wav.setpos(start)
+        raw = wav.readframes(int(window.end_s * rate) - start)
+        params = wav.getparams()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setparams(params)
+        out.writeframes(raw)
+    return buffer.getvalue()
+
+
+def wav_bytes_per_second(wav_path: Path) -> int:
+    with wave.open(str(wav_path), "rb") as wav:
+        return wav.getframerate() * wav.getsampwidth() * wav.getnchannels()
+
+
+def segment_field(segment: Any, name: str) -> Any:
+    return segment.get(name) if isinstance(segment, dict) else getattr(segment, name, None)
+
+
+def _words(text: str) -> List[str]:
+    return [w.lower() for w in _WORD_RE.findall(text)]
+
+
+def _drop_repeated_prefix(previous: str, text: str, max_words: int = 12) -> str:
+    """
+    Remove the words at the start of `text` that repeat the end of `previous`
+    (overlap echo). Needs at least two words, so a common word is never eaten.
+    """
+    before, after = _words(previous)[-max_words:], _words(text)
+    for k in range(min(len(before), len(after), max_words), 1, -1):
+        if before[-k:] == after[:k]:
+            last_repeated = list(_WORD_RE.finditer(text))[k - 1]
+            return text[last_repeated.end():].lstrip(" ,.;:-")
+    return text
+
+
+def stitch_segments(results: List[Tuple[AudioWindow, List[Any], str]]) -> Dict[str, Any]:
+    """
+    Merge per-window Whisper output into one transcript. A segment is kept by
+    the window that owns its midpoint; text repeated across a join is dropped.
+    Windows without segments contribute their whole text.
+    """
+    segments: List[Dict[str, Any]] = []
+    recording_end = max((r[0].own_end_s for r in results), default=0.0)
+    for window, window_segments, window_text in sorted(results, key=lambda r: r[0].index):
+        if not window_segments:
+            window_segments = [{"start": 0.0, "end": window.end_s - window.start_s, "text": window_text}]
+        for segment in window_segments:
+            start = window.start_s + float(segment_field(segment, "start") or 0.0)
+            end = window.start_s + float(segment_field(segment, "end") or 0.0)
+            text = (segment_field(segment, "text") or "").strip()
+            midpoint = (start + end) / 2
+            owned = window.own_start_s <= midpoint < window.own_end_s or (
+                window.own_end_s == recording_end and midpoint >= recording_end
+            )
+            if not text or not owned:
+                continue
+            if segments and segments[-1]["window"] != window.index:
+                text = _drop_repeated_prefix(segments[-1]["text"], text)
+                if not text:
+                    continue
+            segments.append({"start": round(start, 2), "end": round(end, 2), "text": text, "window": window.index})
+
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "segments": segments
+    }
@@ -0,0 +1,66 @@
+"""
+Content-hash cache for transcriptions.
+
+The same recording is often uploaded more than once (client retries, several
+analysts), and each upload is a full Whisper call. Results are keyed by the
+SHA-256 of the audio bytes plus the model and every setting that shapes the
+output, and stored with the same two-tier cache /filtertext uses: a memory LRU
+over one JSON file per key on disk, with concurrent uploads of the same file
+coalesced onto one in-flight transcription.
+"""
+
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from filtertext.cache import ProcessingCache
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / "cache"
+_HASH_CHUNK_BYTES = 1024 * 1024
+# Copies up to this size stay in memory, larger ones roll over to a temp file
+_SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+
+def spool_with_sha256(audio_file: BinaryIO) -> Tuple[BinaryIO, str]:
+    """
+    Copy the upload into a new spooled temp file while hashing it, in one pass.
+    Returns (copy, SHA-256); the copy is rewound and belongs to the caller, so a
+    transcription shared by coalesced requests never reads a request's upload,
+    which the framework closes when that request ends.
+    """
+    digest = hashlib.sha256()
+    copy = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES, prefix="finsight-upload-")
+    try:
+        audio_file.seek(0)
+        while True:
+            chunk = audio_file.read(_HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+            copy.write(chunk)
+        audio_file.seek(0)
+        copy.seek(0)
+    except BaseException:
+        copy.close()
+        raise
+    return copy, digest.hexdigest()
+
+
+# Singleton instance
+_transcription_cache = None
+
+
+def get_transcription_cache() -> Optional[ProcessingCache]:
+    """Get or create the transcription cache; None when disabled with TRANSCRIPTION_CACHE_ENABLED=false."""
+    global _transcription_cache
+    if os.getenv("TRANSCRIPTION_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _transcription_cache is None:
+        _transcription_cache = ProcessingCache(
+            max_entries=int(os.getenv("TRANSCRIPTION_CACHE_MAX_ENTRIES", "256")),
+            cache_dir=Path(os.getenv("TRANSCRIPTION_CACHE_DIR", str(DEFAULT_CACHE_DIR))),
+            max_disk_bytes=int(float(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        )
+    return _transcription_cache
@@ -0,0 +1,271 @@
+"""
+Audio normalization before upload.
+
+Whisper works at 16 kHz mono, so a 44.1/48 kHz stereo WAV spends most of its
+upload on samples the model throws away. normalize_for_upload downmixes and
+resamples with vectorized NumPy (windowed-sinc low-pass, then linear
+interpolation), block by block so memory stays flat, and re-encodes the
+result as FLAC when ffmpeg is available (16-bit WAV otherwise). The smaller
+of the original and the normalized file is sent, so already-compact uploads
+(e.g. low-bitrate MP3) are left alone. Silence and hold music can be trimmed
+on the way (see vad.py).
+"""
+
+import io
+import math
+import subprocess
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from .audio import FFMPEG, pcm_to_mono
+from .vad import TimeMap, trim_wav
+
+TARGET_RATE = 16000
+_BLOCK_S = 30.0
+
+
+def lowpass_taps(ratio: float) -> np.ndarray:
+    """Anti-aliasing FIR for downsampling by `ratio` (Hamming-windowed sinc, unity DC gain)."""
+    if ratio <= 1.0:
+        return np.ones(1, dtype=np.float64)
+    cutoff = 0.45 / ratio  # cycles per input sample, a little under the new Nyquist
+    half = int(math.ceil(8 * ratio))
+    n = np.arange(-half, half + 1)
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(2 * half + 1)
+    return taps / taps.sum()
+
+
+def resample_blocks(blocks: Iterator[np.ndarray], src_rate: int, dst_rate: int = TARGET_RATE) -> Iterator[np.ndarray]:
+    """
+    Resample a stream of mono float blocks. Output sample k sits at input
+    position k * src_rate / dst_rate; the filter's history is carried across
+    blocks, so the result matches resampling the whole signal at once.
+    """
+    ratio = src_rate / dst_rate
+    taps = lowpass_taps(ratio)
+    half = len(taps) // 2
+    # pending[0] is input sample `base`; the zeros stand in for samples before the start
+    pending = np.zeros(half, dtype=np.float64)
+    base = -half
+    next_k = 0
+    total_in = 0
+
+    def emit(final: bool) -> np.ndarray:
+        nonlocal pending, base, next_k
+        filtered = np.convolve(pending, taps, mode="valid")
+        first = base + half  # input index of filtered[0]
+        # Interpolation needs filtered[i + 1]; at the very end the last sample is repeated
+        last_k = int(math.floor((total_in - 1) / ratio)) if final else int(math.floor((first + len(filtered) - 2) / ratio))
+        if last_k < next_k or len(filtered) == 0:
+            return np.zeros(0, dtype=np.float64)
+        positions = np.arange(next_k, last_k + 1) * ratio
+        index = np.floor(positions).astype(np.int64) - first
+        frac = positions - np.floor(positions)
+        upper = np.minimum(index + 1, len(filtered) - 1)
+        out = filtered[index] * (1 - frac) + filtered[upper] * frac
+        next_k = last_k + 1
+        keep_from = int(math.floor(next_k * ratio)) - half
+        if keep_from > base:
+            pending = pending[keep_from - base:]
+            base = keep_from
+        return out
+
+    for block in blocks:
+        if not len(block):
+            continue
+        pending = np.concatenate((pending, block.astype(np.float64)))
+        total_in += len(block)
+        out = emit(final=False)
+        if len(out):
+            yield out
+    if total_in:
+        pending = np.concatenate((pending, np.zeros(half, dtype=np.float64)))
+        out = emit(final=True)
+        if len(out):
+            yield out
+
+
+def _to_int16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def normalize_wav(source: Union[Path, BinaryIO], target: Path, dst_rate: int = TARGET_RATE) -> Dict[str, Any]:
+    """Downmix and resample a PCM WAV to 16-bit mono `dst_rate` WAV at `target`."""
+    with wave.open(str(source) if isinstance(source, Path) else source, "rb") as wav:
+        rate, width, channels = wav.getframerate(), wav.getsampwidth(), wav.getnchannels()
+        block_frames = int(rate * _BLOCK_S)
+
+        def blocks() -> Iterator[np.ndarray]:
+            while True:
+                raw = wav.readframes(block_frames)
+                if not raw:
+                    return
+                yield pcm_to_mono(raw, width, channels)
+
+        with wave.open(str(target), "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(dst_rate)
+            if rate == dst_rate:
+                for block in blocks():
+                    out.writeframes(_to_int16(block))
+            else:
+                for block in resample_blocks(blocks(), rate, dst_rate):
+                    out.writeframes(_to_int16(block))
+    return {"source_rate": rate, "source_channels": channels, "source_sample_width": width}
+
+
+def is_normalized_wav(path: Path) -> bool:
+    with wave.open(str(path), "rb") as wav:
+        return wav.getframerate() == TARGET_RATE and wav.getnchannels() == 1 and wav.getsampwidth() == 2
+
+
+def _ffmpeg(args: list) -> bool:
+    """Run ffmpeg with its output going to a file; False when it is missing or fails (callers then fall back to WAV)."""
+    if FFMPEG is None:
+        return False
+    result = subprocess.run(
+        [FFMPEG, "-nostdin", "-v", "error", "-y", *args], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    return result.returncode == 0
+
+
+def encode_flac(wav_path: Path, target: Path) -> bool:
+    """Write a FLAC encoding of a WAV file to `target` via ffmpeg; False if unavailable."""
+    return _ffmpeg(["-i", str(wav_path), "-c:a", "flac", str(target)])
+
+
+def _is_pcm_wav(audio_file: BinaryIO) -> bool:
+    audio_file.seek(0)
+    try:
+        with wave.open(audio_file, "rb"):
+            return True
+    except (wave.Error, EOFError):
+        return False
+    finally:
+        audio_file.seek(0)
+
+
+def normalize_for_upload(
+    audio_file: BinaryIO,
+    filename: str,
+    work_dir: Path,
+    vad_options: Optional[Dict[str, Any]] = None
+) -> Tuple[Optional[Path], Dict[str, Any], Optional[TimeMap]]:
+    """
+    Produce a 16 kHz mono FLAC (or WAV) copy of the upload in `work_dir`, with
+    non-speech trimmed when `vad_options` is given. Returns (path_to_send,
+    report, time_map); path is None when the original should be sent, and
+    time_map is None when the audio sent was not trimmed.
+    """
+    started = time.perf_counter()
+    audio_file.seek(0, io.SEEK_END)
+    bytes_before = audio_file.tell()
+    audio_file.seek(0)
+    report: Dict[str, Any] = {"applied": False, "bytes_before": bytes_before}
+
+    wav_path: Optional[Path] = None
+    if _is_pcm_wav(audio_file):
+        wav_path = work_dir / "normalized.wav"
+        report.update(normalize_wav(audio_file, wav_path))
+    elif FFMPEG is not None:
+        source = work_dir / f"source{Path(filename).suffix.lower() or '.bin'}"
+        with open(source, "wb") as f:
+            while True:
+                chunk = audio_file.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+        # Trimming needs PCM; without it ffmpeg can go straight to FLAC
+        if vad_options is not None:
+            candidate = wav_path = work_dir / "normalized.wav"
+            codec = ["-c:a", "pcm_s16le"]
+        else:
+            candidate = work_dir / "normalized.flac"
+            codec = ["-c:a", "flac"]
+        if not _ffmpeg(["-i", str(source), "-ac", "1", "-ar", str(TARGET_RATE), *codec, str(candidate)]):
+            report["reason"] = "decode_failed"
+            return None, report, None
+    else:
+        report["reason"] = "ffmpeg_unavailable"
+        return None, report, None
+    audio_file.seek(0)
+
+    time_map = None
+    if wav_path is not None:
+        if vad_options is not None:
+            trimmed = work_dir / "trimmed.wav"
+            time_map, report["vad"] = trim_wav(wav_path, trimmed, **vad_options)
+            wav_path = trimmed
+        flac_path = work_dir / "normalized.flac"
+        candidate = flac_path if encode_flac(wav_path, flac_path) else wav_path
+
+    bytes_after = candidate.stat().st_size
+    report["normalize_s"] = round(time.perf_counter() - started, 3)
+    if bytes_after >= bytes_before:
+        report["reason"] = "original_smaller"
+        report.pop("vad", None)
+        return None, report, None
+    report.update({
+        "applied": True,
+        "format": candidate.suffix.lstrip("."),
+        "bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after
+    })
+    return candidate, report, time_map
+
+
+class NormalizationStats:
+    """Thread-safe running totals for /transcribe/status."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files = 0
+        self.normalized = 0
+        self.bytes_before = 0
+        self.bytes_sent = 0
+        self.upload_time_saved_s = 0.0
+        self.audio_s = 0.0
+        self.speech_s = 0.0
+
+    def record(self, report: Dict[str, Any]):
+        with self._lock:
+            self.files += 1
+            self.bytes_before += report["bytes_before"]
+            self.bytes_sent += report.get("bytes_after", report["bytes_before"])
+            if report["applied"]:
+                self.normalized += 1
+                self.upload_time_saved_s += report.get("upload_time_saved_s") or 0.0
+            if "vad" in report:
+                self.audio_s += report["vad"]["duration_s"]
+                self.speech_s += report["vad"]["kept_s"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "files": self.files,
+                "normalized": self.normalized,
+                "bytes_before": self.bytes_before,
+                "bytes_sent": self.bytes_sent,
+                "bytes_saved": self.bytes_before - self.bytes_sent,
+                "upload_time_saved_s": round(self.upload_time_saved_s, 3),
+                "vad_removed_fraction": round(1 - self.speech_s / self.audio_s, 4) if self.audio_s else 0.0,
+                "encoder": "flac" if FFMPEG else "wav"
+            }
+
+
+# Singleton instance
+_normalization_stats = None
+
+
+def get_normalization_stats() -> NormalizationStats:
+    """Get or create the process-wide normalization counters."""
+    global _normalization_stats
+    if _normalization_stats is None:
+        _normalization_stats = NormalizationStats()
+    return _normalization_stats
@@ -1,10 +1,19 @@
 import os
 import re
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from typing import Any, BinaryIO, Dict, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
-from .service import AudioTranscriptionService
+from .audio import AudioDecodeError
+from .service import (
+    AudioTranscriptionService,
+    UploadBudgetExceededError,
+    UploadTooLargeError,
+    get_audio_transcription_service,
+    upload_size
+)
+from resilience import CircuitOpenError
 
 # Load environment variables
 load_dotenv()
@@ -16,19 +25,21 @@ router = APIRouter(prefix="/transcribe", tags=["transcription"])
 TRANSCRIPTIONS_DIR = Path(__file__).parent / "transcriptions"
 TRANSCRIPTIONS_DIR.mkdir(exist_ok=True)
 
+# Uploads above this size use the chunked long-audio mode unless ?long_audio= says otherwise
+LONG_AUDIO_THRESHOLD_BYTES = int(os.getenv("LONG_AUDIO_THRESHOLD_BYTES", str(24 * 1024 * 1024)))
+
 
 def get_transcription_service() -> AudioTranscriptionService:
     """
     Dependency injection for transcription service.
-    Creates a new service instance with API key from environment.
+    Returns the process-wide service, so uploads share one connection pool.
     """
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
+    if not os.getenv("GROQ_API_KEY"):
         raise HTTPException(
             status_code=500,
             detail="Server configuration error: GROQ_API_KEY not configured"
         )
-    return AudioTranscriptionService(api_key=api_key)
+    return get_audio_transcription_service()
 
 
 def sanitize_filename(filename: str) -> str:
@@ -43,38 +54,52 @@ def sanitize_filename(filename: str) -> str:
     return sanitized
 
 
-@router.post("")
-async def transcribe_audio(
-    file: UploadFile = File(...),
-    service: AudioTranscriptionService = Depends(get_transcription_service)
-):
-    """
-    Transcribe audio file to text using Groq Whisper model.
-    
-    Accepts .wav or .mp3 files and returns transcription saved to a .txt file.
-    """
-    # Validate file format
-    if not file.filename:
+def validate_audio_filename(filename: Optional[str]):
+    """Reject uploads without a name or with an unsupported extension (400)."""
+    if not filename:
         raise HTTPException(status_code=400, detail="No filename provided")
     
-    file_extension = Path(file.filename).suffix.lower()
+    file_extension = Path(filename).suffix.lower()
     if file_extension not in [".wav", ".mp3"]:
         raise HTTPException(
             status_code=400,
             detail="Invalid file format. Only .wav and .mp3 files are supported."
         )
-    
+
+
+async def transcribe_upload(
+    audio_file: BinaryIO,
+    filename: str,
+    long_audio: Optional[bool],
+    service: AudioTranscriptionService
+) -> Dict[str, Any]:
+    """
+    Transcribe, save the .txt and build the response payload. Shared by
+    POST /transcribe and transcription jobs; errors are raised as HTTPException.
+    """
     try:
-        # Transcribe audio
-        transcription = service.transcribe_audio(
-            audio_file=file.file,
-            filename=file.filename
+        if long_audio is None:
+            long_audio = upload_size(audio_file) > LONG_AUDIO_THRESHOLD_BYTES
+
+        # Transcribe audio (served from the content-hash cache when this audio was seen before)
+        result, cache_hit, digest = await service.transcribe(
+            audio_file=audio_file,
+            filename=filename,
+            long_audio=long_audio
         )
+        details = {key: result[key] for key in ("segments", "windows", "duration_s") if key in result}
+        transcription = result["text"]
+        details["normalization"] = result["normalization"]
+        vad = result["normalization"].get("vad")
+        if vad is not None:
+            # How much of the call was cut before transcription, so a short transcript can be explained
+            details["vad"] = {key: vad[key] for key in ("duration_s", "kept_s", "trimmed_s", "removed_fraction")}
         
-        # Generate output filename with sanitization
-        base_name = Path(file.filename).stem
+        # Generate output filename with sanitization; the content hash keeps
+        # different recordings with the same name from overwriting each other
+        base_name = Path(filename).stem
         safe_base_name = sanitize_filename(base_name)
-        output_filename = f"{safe_base_name}_transcription.txt"
+        output_filename = f"{safe_base_name}_{digest[:12]}_transcription.txt"
         output_path = TRANSCRIPTIONS_DIR / output_filename
         
         # Save transcription to file
@@ -83,19 +108,38 @@ async def transcribe_audio(
             output_path=str(output_path)
         )
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "message": "Transcription completed successfully",
-                "transcription": transcription,
-                "output_file": str(output_path),
-                "filename": output_filename
-            }
-        )
+        return {
+            "message": "Transcription completed successfully",
+            "transcription": transcription,
+            "output_file": str(output_path),
+            "filename": output_filename,
+            "mode": "long_audio" if long_audio else "single",
+            "audio_sha256": digest,
+            "cache_hit": cache_hit,
+            **details
+        }
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=f"Audio file too large: {str(e)}")
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Could not decode audio: {str(e)}")
+    except UploadBudgetExceededError:
+        # Global in-flight byte limit reached: ask the client to come back shortly
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy: too many uploads in progress. Please retry shortly.",
+            headers={"Retry-After": "1"}
+        )
+    except CircuitOpenError:
+        # Groq keeps failing: fail fast and tell clients when to come back
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription service temporarily unavailable. Please retry later.",
+            headers={"Retry-After": str(int(os.getenv("UPSTREAM_GROQ_BREAKER_RESET_S", "30")))}
+        )
     except Exception as e:
         # Log the error server-side (in production, use proper logging)
         import traceback
@@ -105,3 +149,31 @@ async def transcribe_audio(
             status_code=500,
             detail="An error occurred during transcription. Please try again."
         )
+
+
+@router.post("")
+async def transcribe_audio(
+    file: UploadFile = File(...),
+    long_audio: Optional[bool] = Query(None, description="Split into windows and transcribe them concurrently (default: by size)"),
+    service: AudioTranscriptionService = Depends(get_transcription_service)
+):
+    """
+    Transcribe audio file to text using Groq Whisper model.
+    
+    Accepts .wav or .mp3 files and returns transcription saved to a .txt file.
+    Long recordings are split into windows and come back with segment timestamps.
+    For a job ID instead of holding the connection open, use POST /jobs/transcribe.
+    """
+    # Validate file format
+    validate_audio_filename(file.filename)
+    
+    return JSONResponse(
+        status_code=200,
+        content=await transcribe_upload(file.file, file.filename, long_audio, service)
+    )
+
+
+@router.get("/status")
+async def transcription_status(service: AudioTranscriptionService = Depends(get_transcription_service)):
+    """Groq client settings, cache and upstream counters."""
+    return service.status()
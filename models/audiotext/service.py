@@ -1,12 +1,141 @@
 import os
+import time
+import asyncio
+import tempfile
+import threading
 import httpx  # Import httpx directly
-from groq import Groq
-from typing import BinaryIO
+from groq import AsyncGroq
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from filtertext.cache import make_cache_key
+from resilience import RateLimiter, get_upstream
+from .cache import get_transcription_cache, spool_with_sha256
+from .audio import decode_to_wav, energy_envelope, plan_windows, read_window, segment_field, stitch_segments, wav_bytes_per_second
+from .normalize import encode_flac, get_normalization_stats, is_normalized_wav, normalize_for_upload, normalize_wav
+from .vad import trim_wav
+
+try:
+    import h2  # noqa: F401 (enables HTTP/2 in httpx)
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# Largest read handed to the multipart encoder (httpx asks for 64 KiB)
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """The upload exceeds TRANSCRIBE_MAX_UPLOAD_BYTES."""
+
+
+class UploadBudgetExceededError(RuntimeError):
+    """Accepting the upload would exceed TRANSCRIBE_MAX_INFLIGHT_BYTES."""
+
+
+class InflightByteBudget:
+    """
+    Global cap on upload bytes being sent to Groq at once. An upload larger than
+    the whole budget is still admitted when nothing else is in flight.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._uploads = 0
+        self._rejected = 0
+
+    def try_acquire(self, size: int) -> bool:
+        with self._lock:
+            if self._uploads and self._in_flight + size > self.max_bytes:
+                self._rejected += 1
+                return False
+            self._in_flight += size
+            self._uploads += 1
+            return True
+
+    def release(self, size: int):
+        with self._lock:
+            self._in_flight -= size
+            self._uploads -= 1
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "in_flight_bytes": self._in_flight,
+                "in_flight_uploads": self._uploads,
+                "rejected": self._rejected
+            }
+
+
+class UploadStream:
+    """
+    Read-only view of a spooled upload for the multipart encoder: the body is
+    read in chunks during the request instead of being loaded up front. It has
+    no fileno(), so measuring the length never forces a SpooledTemporaryFile
+    to roll over to disk.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        self.bytes_read = 0
+        # First read to end-of-file approximates the time spent uploading the body
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > UPLOAD_CHUNK_BYTES:
+            size = UPLOAD_CHUNK_BYTES
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+        chunk = self._file.read(size)
+        if not chunk:
+            self._finished_at = time.perf_counter()
+        self.bytes_read += len(chunk)
+        return chunk
+
+    @property
+    def upload_s(self) -> Optional[float]:
+        if self._started_at is None or self._finished_at is None:
+            return None
+        return self._finished_at - self._started_at
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+
+def upload_size(audio_file: BinaryIO) -> int:
+    """Size of a seekable upload without reading it."""
+    size = audio_file.seek(0, os.SEEK_END)
+    audio_file.seek(0)
+    return size
+
+
+def create_http_client(timeout_s: float) -> httpx.AsyncClient:
+    """
+    Process-lifetime connection pool for Groq: keep-alive connections are reused
+    across uploads, and HTTP/2 multiplexes them when `h2` is installed.
+    """
+    return httpx.AsyncClient(
+        http2=HAS_HTTP2,
+        timeout=timeout_s,
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "32")),
+            max_keepalive_connections=int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "16")),
+            keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_EXPIRY_S", "60"))
+        )
+    )
+
 
 class AudioTranscriptionService:
     """Service for transcribing audio files using Groq Whisper model."""
-    
-    def __init__(self, api_key: str = None):
+
+    def __init__(self, api_key: str = None, http_client: Optional[httpx.AsyncClient] = None):
         """
         Initialize the transcription service.
         If api_key is not provided, it will look for GROQ_API_KEY in environment variables.
@@ -14,39 +143,273 @@ class AudioTranscriptionService:
         self.api_key = api_key or os.environ.get("GROQ_API_KEY")
         if not self.api_key:
             raise ValueError("Groq API key is required")
-            
-        # FIX: Manually initialize http_client to bypass the 'proxies' argument bug
+
+        # Timeouts, retries and the circuit breaker are shared across requests
+        self.upstream = get_upstream("groq")
+
+        # Passing our own http_client also bypasses the 'proxies' argument bug
         # found in older groq versions running with new httpx versions.
-        self.client = Groq(
+        # The SDK's own retries are disabled; the upstream policy owns them.
+        self.http_client = http_client or create_http_client(self.upstream.policy.timeout_s)
+        self.client = AsyncGroq(
             api_key=self.api_key,
-            http_client=httpx.Client()
+            http_client=self.http_client,
+            max_retries=0
         )
         self.model = "whisper-large-v3"
-    
-    def transcribe_audio(self, audio_file: BinaryIO, filename: str) -> str:
+        # Per-request and global limits on upload bytes, so peak memory does not grow with file size
+        self.max_upload_bytes = int(os.getenv("TRANSCRIBE_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+        self.upload_budget = InflightByteBudget(int(os.getenv("TRANSCRIBE_MAX_INFLIGHT_BYTES", str(512 * 1024 * 1024))))
+        # Groq's per-key quota is shared by every request in the process
+        self.rate_limiter = RateLimiter(float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "20")))
+
+        # Long-audio mode: windows of LONG_AUDIO_WINDOW_S cut at quiet points, transcribed concurrently
+        self.long_audio_max_bytes = int(os.getenv("LONG_AUDIO_MAX_BYTES", str(1024 * 1024 * 1024)))
+        self.long_audio_window_s = float(os.getenv("LONG_AUDIO_WINDOW_S", "300"))
+        self.long_audio_overlap_s = float(os.getenv("LONG_AUDIO_OVERLAP_S", "1.5"))
+        self.long_audio_search_s = float(os.getenv("LONG_AUDIO_SEARCH_S", "15"))
+        # Keep each window's WAV under the upstream's file size limit
+        self.long_audio_max_window_bytes = int(os.getenv("LONG_AUDIO_MAX_WINDOW_BYTES", str(20 * 1024 * 1024)))
+        self.long_audio_max_concurrency = int(os.getenv("LONG_AUDIO_MAX_CONCURRENCY", "4"))
+        self.long_audio_semaphore = asyncio.Semaphore(self.long_audio_max_concurrency)
+        # Downmix/resample to 16 kHz mono (FLAC when ffmpeg is installed) before upload
+        self.normalize_audio = os.getenv("AUDIO_NORMALIZE", "true").lower() in ("1", "true", "yes")
+        # Trim silence and hold music while normalizing; segment times are mapped back to the call.
+        # Opt-in: the detector is a heuristic and a miss removes speech from the transcript
+        self.vad_options = None
+        if self.normalize_audio and os.getenv("AUDIO_VAD", "false").lower() in ("1", "true", "yes"):
+            self.vad_options = {
+                "margin_db": float(os.getenv("VAD_MARGIN_DB", "10")),
+                "min_silence_s": float(os.getenv("VAD_MIN_SILENCE_S", "0.5")),
+                "music_max_cv": float(os.getenv("VAD_MUSIC_MAX_CV", "0.3"))
+            }
+
+    async def _create_transcription(
+        self,
+        open_file: Callable[[], BinaryIO],
+        filename: str,
+        response_format: str,
+        hedge: bool = True
+    ) -> Tuple[Any, float]:
+        """One rate-limited, resilient Groq call; returns (result, upload seconds)."""
+        streams: List[UploadStream] = []
+
+        def request():
+            stream = UploadStream(open_file())
+            streams.append(stream)
+            return self.client.audio.transcriptions.create(
+                file=(filename, stream),
+                model=self.model,
+                response_format=response_format
+            )
+
+        await self.rate_limiter.acquire()
+        result = await self.upstream.call(request, hedge=hedge)
+        upload_times = [stream.upload_s for stream in streams if stream.upload_s is not None]
+        return result, min(upload_times) if upload_times else 0.0
+
+    @staticmethod
+    def _finish_report(report: Dict[str, Any], upload_s: float) -> Dict[str, Any]:
+        """Add upload time and the upload time saved, estimated from the measured upload rate."""
+        report["upload_s"] = round(upload_s, 3)
+        if report.get("applied") and report.get("bytes_after"):
+            report["upload_time_saved_s"] = round(upload_s * report["bytes_saved"] / report["bytes_after"], 3)
+        get_normalization_stats().record(report)
+        return report
+
+    def cache_key(self, audio_digest: str, long_audio: bool) -> str:
+        """Content address of a transcription: the audio bytes plus everything that shapes the output."""
+        return make_cache_key(
+            audio_sha256=audio_digest,
+            model=self.model,
+            mode="long_audio" if long_audio else "single",
+            normalize=self.normalize_audio,
+            vad=self.vad_options,
+            long_audio_windows=(self.long_audio_window_s, self.long_audio_overlap_s, self.long_audio_search_s) if long_audio else None
+        )
+
+    async def transcribe(self, audio_file: BinaryIO, filename: str, long_audio: bool) -> Tuple[Dict[str, Any], bool, str]:
         """
-        Transcribe audio file using Groq Whisper model.
+        Transcribe through the content-hash cache. Returns (result, cache_hit,
+        audio_sha256); concurrent uploads of the same audio share one call.
+        The shared call reads its own copy of the bytes, not this request's
+        upload, so it is unaffected when the request that started it goes away.
         """
+        owned_file, digest = await asyncio.to_thread(spool_with_sha256, audio_file)
+        started = False
+
+        async def compute() -> Dict[str, Any]:
+            nonlocal started
+            started = True
+            # The computation closes the copy once it is done with it
+            with owned_file:
+                if long_audio:
+                    return await self.transcribe_long_audio(owned_file, filename)
+                return await self.transcribe_audio(owned_file, filename)
+
         try:
-            # Ensure the file pointer is at the start
-            audio_file.seek(0)
-            
-            # Read file content
-            file_content = audio_file.read()
-            
-            # API Call
-            transcription = self.client.audio.transcriptions.create(
-                file=(filename, file_content),
-                model=self.model,
-                response_format="text"
-            )
-            
-            return transcription
-            
+            cache = get_transcription_cache()
+            if cache is None:
+                return await compute(), False, digest
+            result, cache_hit = await cache.get_or_compute(self.cache_key(digest, long_audio), compute)
+            return result, cache_hit, digest
+        finally:
+            # Cache hit or joined another request's call: the copy was never used
+            if not started:
+                owned_file.close()
+
+    async def transcribe_audio(self, audio_file: BinaryIO, filename: str) -> Dict[str, Any]:
+        """
+        Transcribe audio file using Groq Whisper model. The file is streamed into
+        the request body in chunks rather than read into memory, after optional
+        normalization. Returns {"text", "normalization"}, plus "segments" in
+        original-call time when silence was trimmed.
+        """
+        size = upload_size(audio_file)
+        if size > self.max_upload_bytes:
+            raise UploadTooLargeError(f"upload is {size} bytes, limit is {self.max_upload_bytes}")
+        if not self.upload_budget.try_acquire(size):
+            raise UploadBudgetExceededError("too many upload bytes in flight")
+
+        try:
+            with tempfile.TemporaryDirectory(prefix="finsight-audio-") as work_dir:
+                normalized_path, report, time_map = None, {"applied": False, "bytes_before": size, "reason": "disabled"}, None
+                if self.normalize_audio:
+                    normalized_path, report, time_map = await asyncio.to_thread(
+                        normalize_for_upload, audio_file, filename, Path(work_dir), self.vad_options
+                    )
+
+                if normalized_path is not None:
+                    # Trimmed audio needs segment timestamps to map back to the call
+                    response_format = "verbose_json" if time_map is not None else "text"
+                    with open(normalized_path, "rb") as normalized:
+                        result, upload_s = await self._create_transcription(
+                            lambda: normalized, f"{Path(filename).stem}{normalized_path.suffix}", response_format, hedge=False
+                        )
+                    if time_map is not None:
+                        segments = [
+                            {"start": float(segment_field(segment, "start") or 0.0), "end": float(segment_field(segment, "end") or 0.0),
+                             "text": (segment_field(segment, "text") or "").strip()}
+                            for segment in getattr(result, "segments", None) or []
+                        ]
+                        return {
+                            "text": (getattr(result, "text", "") or "").strip(),
+                            "segments": time_map.map_segments(segments),
+                            "normalization": self._finish_report(report, upload_s)
+                        }
+                else:
+                    # API Call (transcription is idempotent, so transient failures are retried;
+                    # the encoder rewinds the stream for each attempt). Not hedged: both
+                    # requests would read the same file object.
+                    result, upload_s = await self._create_transcription(
+                        lambda: audio_file, filename, "text", hedge=False
+                    )
+
+            return {"text": result, "normalization": self._finish_report(report, upload_s)}
+
         except Exception as e:
             print(f"Error during transcription: {str(e)}")
             raise e
-    
+        finally:
+            self.upload_budget.release(size)
+
+    async def transcribe_long_audio(self, audio_file: BinaryIO, filename: str) -> Dict[str, Any]:
+        """
+        Long-audio mode: decode locally, split into overlapping windows at quiet
+        points, transcribe the windows concurrently and stitch them back together.
+        Returns {"text", "segments", "windows", "duration_s", "normalization"};
+        segment times are relative to the start of the recording, including any
+        silence trimmed before windowing.
+        """
+        size = upload_size(audio_file)
+        if size > self.long_audio_max_bytes:
+            raise UploadTooLargeError(f"upload is {size} bytes, limit is {self.long_audio_max_bytes}")
+        # Charged for what the file keeps in flight: at most LONG_AUDIO_MAX_CONCURRENCY windows at once
+        budget = min(size, self.long_audio_max_concurrency * self.long_audio_max_window_bytes)
+        if not self.upload_budget.try_acquire(budget):
+            raise UploadBudgetExceededError("too many upload bytes in flight")
+
+        try:
+            with tempfile.TemporaryDirectory(prefix="finsight-audio-") as work_dir:
+                wav_path, windows, duration_s, time_map, vad_report = await asyncio.to_thread(
+                    self._plan_long_audio, audio_file, filename, Path(work_dir)
+                )
+                stem = Path(filename).stem
+                sent: List[Tuple[int, float]] = []
+
+                async def transcribe_window(window):
+                    async with self.long_audio_semaphore:
+                        path = await asyncio.to_thread(self._window_file, wav_path, window, Path(work_dir))
+                        # Each attempt opens its own handle, so retries and hedges are safe
+                        handles: List[BinaryIO] = []
+
+                        def open_window() -> BinaryIO:
+                            handles.append(open(path, "rb"))
+                            return handles[-1]
+
+                        try:
+                            result, upload_s = await self._create_transcription(
+                                open_window, f"{stem}_{window.index:03d}{path.suffix}", "verbose_json"
+                            )
+                        finally:
+                            for handle in handles:
+                                handle.close()
+                        sent.append((path.stat().st_size, upload_s))
+                        path.unlink()
+                    return window, getattr(result, "segments", None) or [], getattr(result, "text", "") or ""
+
+                results = await asyncio.gather(*(transcribe_window(window) for window in windows))
+        finally:
+            self.upload_budget.release(budget)
+
+        # Windows overlap, so bytes sent are compared with the upload as a whole
+        bytes_sent = sum(length for length, _ in sent)
+        report = {"applied": self.normalize_audio, "bytes_before": size, "bytes_after": bytes_sent,
+                  "bytes_saved": size - bytes_sent}
+        if not self.normalize_audio:
+            report["reason"] = "disabled"
+        if vad_report is not None:
+            report["vad"] = vad_report
+        stitched = stitch_segments(results)
+        if time_map is not None:
+            stitched["segments"] = time_map.map_segments(stitched["segments"])
+        stitched["windows"] = len(windows)
+        stitched["duration_s"] = round(duration_s, 2)
+        stitched["normalization"] = self._finish_report(report, sum(upload_s for _, upload_s in sent))
+        return stitched
+
+    def _window_file(self, wav_path: Path, window, work_dir: Path) -> Path:
+        """The window written to `work_dir`: FLAC when normalizing and ffmpeg is available, WAV otherwise."""
+        path = work_dir / f"window_{window.index:03d}.wav"
+        path.write_bytes(read_window(wav_path, window))
+        if self.normalize_audio:
+            flac_path = path.with_suffix(".flac")
+            if encode_flac(path, flac_path):
+                path.unlink()
+                return flac_path
+        return path
+
+    def _plan_long_audio(self, audio_file: BinaryIO, filename: str, work_dir: Path):
+        """Decode and cut points, in a worker thread (ffmpeg and the energy scan are blocking)."""
+        wav_path = decode_to_wav(audio_file, filename, work_dir)
+        if self.normalize_audio and not is_normalized_wav(wav_path):
+            normalized_path = work_dir / "normalized.wav"
+            normalize_wav(wav_path, normalized_path)
+            wav_path = normalized_path
+        time_map, vad_report = None, None
+        if self.vad_options is not None:
+            trimmed_path = work_dir / "trimmed.wav"
+            time_map, vad_report = trim_wav(wav_path, trimmed_path, **self.vad_options)
+            wav_path = trimmed_path
+        envelope, duration_s = energy_envelope(wav_path)
+        window_s = min(self.long_audio_window_s, self.long_audio_max_window_bytes / wav_bytes_per_second(wav_path))
+        # Overlap is added on both sides of a window, so leave room for it
+        window_s = max(1.0, window_s - 2 * self.long_audio_overlap_s)
+        windows = plan_windows(envelope, duration_s, window_s, self.long_audio_overlap_s, self.long_audio_search_s)
+        if vad_report is not None:
+            duration_s = vad_report["duration_s"]
+        return wav_path, windows, duration_s, time_map, vad_report
+
     def save_transcription(self, transcription: str, output_path: str) -> str:
         """Save transcription to a text file."""
         try:
@@ -55,4 +418,38 @@ class AudioTranscriptionService:
             return output_path
         except IOError as e:
             print(f"Failed to save transcription file: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def status(self) -> dict:
+        return {
+            "model": self.model,
+            "http2": HAS_HTTP2,
+            "max_upload_bytes": self.max_upload_bytes,
+            "upload_budget": self.upload_budget.status(),
+            "normalization": get_normalization_stats().snapshot(),
+            "cache": get_transcription_cache().stats() if get_transcription_cache() else {"enabled": False},
+            "upstream": self.upstream.status()
+        }
+
+    async def aclose(self):
+        await self.http_client.aclose()
+
+
+# Singleton instance
+_transcription_service = None
+
+
+def get_audio_transcription_service() -> AudioTranscriptionService:
+    """Get or create the process-wide service (one AsyncGroq client, one connection pool)."""
+    global _transcription_service
+    if _transcription_service is None:
+        _transcription_service = AudioTranscriptionService()
+    return _transcription_service
+
+
+async def close_audio_transcription_service():
+    """Close the shared connection pool (called on application shutdown)."""
+    global _transcription_service
+    if _transcription_service is not None:
+        await _transcription_service.aclose()
+        _transcription_service = None
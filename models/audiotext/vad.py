@@ -0,0 +1,194 @@
+"""
+Voice-activity trimming before transcription.
+
+Support calls carry long stretches of silence and hold music that cost upload
+time and Whisper processing for no text. trim_wav classifies 20 ms frames with
+vectorized frame energy and zero-crossing rate, smooths the decisions into
+speech regions, drops stretches with a steady envelope (hold music stays flat,
+speech dips between syllables) and writes only the speech to a new WAV.
+
+The returned TimeMap converts times in the trimmed audio back to times in the
+original call, so transcript segments keep their real timestamps.
+"""
+
+import bisect
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .audio import pcm_to_mono
+
+FRAME_S = 0.02
+_BLOCK_S = 30.0
+
+
+@dataclass
+class TimeMap:
+    """Kept spans as (trimmed_start_s, original_start_s, length_s), in order."""
+
+    spans: List[Tuple[float, float, float]]
+
+    def to_original(self, t: float) -> float:
+        """Original-call time for time `t` in the trimmed audio."""
+        if not self.spans:
+            return t
+        index = max(0, bisect.bisect_right([span[0] for span in self.spans], t) - 1)
+        trimmed_start, original_start, length = self.spans[index]
+        return original_start + min(max(t - trimmed_start, 0.0), length)
+
+    def map_segments(self, segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copies of `segments` with start/end moved to original-call time."""
+        return [
+            {**segment, "start": round(self.to_original(segment["start"]), 2),
+             "end": round(self.to_original(segment["end"]), 2)}
+            for segment in segments
+        ]
+
+    def as_list(self) -> List[List[float]]:
+        return [[round(a, 2), round(b, 2), round(c, 2)] for a, b, c in self.spans]
+
+
+def frame_features(wav_path: Path, frame_s: float = FRAME_S) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Per-frame energy (dBFS) and zero-crossing rate, and the duration in seconds."""
+    energy: List[np.ndarray] = []
+    zcr: List[np.ndarray] = []
+    with wave.open(str(wav_path), "rb") as wav:
+        rate, width, channels, total = wav.getframerate(), wav.getsampwidth(), wav.getnchannels(), wav.getnframes()
+        frame_len = max(1, int(rate * frame_s))
+        block_frames = frame_len * max(1, int(_BLOCK_S / frame_s))
+        while True:
+            raw = wav.readframes(block_frames)
+            if not raw:
+                break
+            samples = pcm_to_mono(raw, width, channels)
+            pad = (-len(samples)) % frame_len
+            frames = np.pad(samples, (0, pad)).reshape(-1, frame_len)
+            rms = np.sqrt(np.mean(frames * frames, axis=1))
+            energy.append(20 * np.log10(np.maximum(rms, 1e-6)))
+            signs = np.signbit(frames)
+            zcr.append(np.mean(signs[:, 1:] != signs[:, :-1], axis=1))
+    if not energy:
+        return np.zeros(0), np.zeros(0), 0.0
+    return np.concatenate(energy), np.concatenate(zcr), total / float(rate)
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """[start, end) frame index pairs of the True runs in `mask`."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)), axis=1)
+
+
+def steady_frames(energy_db: np.ndarray, window_s: float, max_cv: float, frame_s: float = FRAME_S) -> np.ndarray:
+    """
+    Frames whose surrounding `window_s` has a flat envelope: the coefficient of
+    variation of the frame levels is under `max_cv`. Speech dips between
+    syllables and words; sustained music does not.
+    """
+    width = int(round(window_s / frame_s))
+    if len(energy_db) < width:
+        return np.zeros(len(energy_db), dtype=bool)
+    level = 10 ** (energy_db / 20)
+    sums = np.concatenate(([0.0], np.cumsum(level)))
+    squares = np.concatenate(([0.0], np.cumsum(level * level)))
+    mean = (sums[width:] - sums[:-width]) / width
+    var = np.maximum((squares[width:] - squares[:-width]) / width - mean * mean, 0.0)
+    flat = np.sqrt(var) / np.maximum(mean, 1e-9) < max_cv
+    # Spread each flat window over every frame it covers
+    steady = np.zeros(len(energy_db) + 1, dtype=np.int64)
+    starts = np.flatnonzero(flat)
+    np.add.at(steady, starts, 1)
+    np.add.at(steady, starts + width, -1)
+    return np.cumsum(steady[:-1]) > 0
+
+
+def speech_regions(
+    energy_db: np.ndarray,
+    zcr: np.ndarray,
+    margin_db: float = 10.0,
+    min_speech_s: float = 0.25,
+    min_silence_s: float = 0.5,
+    pad_s: float = 0.2,
+    music_window_s: float = 3.0,
+    music_max_cv: float = 0.3,
+    frame_s: float = FRAME_S
+) -> List[Tuple[float, float]]:
+    """
+    Speech regions in seconds. A frame is speech when its energy is `margin_db`
+    over the noise floor, or a little less with a fricative-like zero-crossing
+    rate, and it is not inside `music_window_s` of steady envelope (music).
+    Gaps under `min_silence_s` are bridged and blips under `min_speech_s` dropped.
+    """
+    if not len(energy_db):
+        return []
+    floor = np.percentile(energy_db, 10)
+    # When most of the call is music the floor is the music; cap the threshold
+    # below the loud frames so the speech over it is still found
+    threshold = max(min(floor + margin_db, np.percentile(energy_db, 90) - 20.0), -60.0)
+    speech = (energy_db > threshold) | ((energy_db > threshold - margin_db / 2) & (zcr > 0.3))
+    speech &= ~steady_frames(energy_db, music_window_s, music_max_cv, frame_s)
+
+    min_gap = int(round(min_silence_s / frame_s))
+    for start, end in _runs(~speech):
+        if start > 0 and end < len(speech) and end - start < min_gap:
+            speech[start:end] = True
+
+    regions = [
+        (start * frame_s, end * frame_s)
+        for start, end in _runs(speech)
+        if (end - start) * frame_s >= min_speech_s
+    ]
+
+    # Pad, then merge regions the padding made touch
+    duration = len(energy_db) * frame_s
+    merged: List[Tuple[float, float]] = []
+    for start, end in regions:
+        start, end = max(0.0, start - pad_s), min(duration, end + pad_s)
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def trim_wav(source: Path, target: Path, **options) -> Tuple[TimeMap, Dict[str, Any]]:
+    """
+    Write the speech regions of `source` back to back into `target`. Returns the
+    time map and a report with the fraction of audio removed. When no speech is
+    found the whole file is kept, since a detector miss must not lose a call.
+    """
+    energy_db, zcr, duration_s = frame_features(source)
+    regions = speech_regions(energy_db, zcr, **options)
+    if not regions:
+        regions = [(0.0, duration_s)]
+
+    spans: List[Tuple[float, float, float]] = []
+    with wave.open(str(source), "rb") as wav, wave.open(str(target), "wb") as out:
+        rate = wav.getframerate()
+        out.setparams(wav.getparams())
+        written = 0
+        for start_s, end_s in regions:
+            first, last = int(start_s * rate), min(int(end_s * rate), wav.getnframes())
+            wav.setpos(first)
+            remaining = last - first
+            while remaining > 0:
+                raw = wav.readframes(min(remaining, int(rate * _BLOCK_S)))
+                if not raw:
+                    break
+                out.writeframes(raw)
+                remaining -= len(raw) // (wav.getsampwidth() * wav.getnchannels())
+            spans.append((written / float(rate), first / float(rate), (last - first) / float(rate)))
+            written += last - first
+
+    kept_s = written / float(rate)
+    report = {
+        "duration_s": round(duration_s, 2),
+        "kept_s": round(kept_s, 2),
+        "trimmed_s": round(duration_s - kept_s, 2),
+        "removed_fraction": round(1 - kept_s / duration_s, 4) if duration_s else 0.0,
+        "speech_regions": len(spans),
+        "time_map": TimeMap(spans).as_list()
+    }
+    return TimeMap(spans), report
@@ -0,0 +1,264 @@
+"""
+Long-lived Backboard analyzer assistant with a reusable thread pool.
+
+Creating an assistant and a thread for every transcript costs two extra
+round trips and resends the output schema each time. Here the schema lives
+in the assistant's system prompt, the assistant is created once (its ID is
+persisted across restarts), so a transcript costs a thread and one
+`add_message` call.
+
+Threads keep their history, so by default each transcript gets a fresh thread
+(BACKBOARD_THREAD_MAX_USES=1): no earlier transcript is billed again as context
+or seen next to another customer's call. Raising it returns threads to a pool
+for reuse, trading that isolation for one round trip per transcript.
+
+Every Backboard call goes through the shared "backboard" ResilientUpstream
+(timeouts, retries, optional hedging, circuit breaker). A retried or hedged
+analysis checks out its own thread, so duplicates never share history.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from backboard import BackboardClient
+
+from resilience import ResilientUpstream, get_upstream
+
+DEFAULT_BASE_URL = "https://app.backboard.io/api"
+ASSISTANT_STATE_PATH = Path(__file__).parent / ".backboard_assistant.json"
+ASSISTANT_NAME = "Transcript Analyzer"
+
+
+def build_system_prompt(output_format: Dict[str, Any]) -> str:
+    """System prompt carrying the output schema, so per-transcript messages don't resend it."""
+    return f"""You are an expert financial transcript analyst. Always return valid JSON.
+
+Every user message contains one transcript. Analyze only that transcript (ignore earlier
+messages in the thread) and extract structured information in the following JSON format:
+
+{json.dumps(output_format, indent=2)}
+
+Respond with valid JSON matching the format above and nothing else."""
+
+
+class BackboardAnalyzer:
+    """One assistant per process, a pool of reusable threads and round-trip counters."""
+
+    def __init__(
+        self,
+        client: BackboardClient,
+        system_prompt: str,
+        assistant_id: Optional[str] = None,
+        state_path: Optional[Path] = ASSISTANT_STATE_PATH,
+        thread_max_uses: int = 1,
+        pool_size: int = 8,
+        upstream: Optional[ResilientUpstream] = None
+    ):
+        self.client = client
+        self.upstream = upstream or get_upstream("backboard")
+        self.system_prompt = system_prompt
+        self.state_path = state_path
+        self.thread_max_uses = max(1, thread_max_uses)
+        self.pool_size = pool_size
+        self.fingerprint = hashlib.sha256(
+            f"{ASSISTANT_NAME}\n{getattr(client, 'base_url', '')}\n{system_prompt}".encode("utf-8")
+        ).hexdigest()[:16]
+
+        self._assistant_id = assistant_id or self._load_persisted_id()
+        self._assistant_lock = asyncio.Lock()
+        # Idle (thread_id, uses) pairs; a thread is never used by two requests at once
+        self._idle_threads: List[List[Any]] = []
+        self._counter_lock = threading.Lock()
+        self._round_trips: Dict[str, int] = {"create_assistant": 0, "create_thread": 0, "add_message": 0}
+        self._transcripts = 0
+
+    def _load_persisted_id(self) -> Optional[str]:
+        if self.state_path is None or not self.state_path.exists():
+            return None
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Only reuse an assistant created with the same prompt against the same server
+        return state.get(self.fingerprint)
+
+    def _persist_id(self, assistant_id: str):
+        if self.state_path is None:
+            return
+        try:
+            state = {}
+            if self.state_path.exists():
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+            state[self.fingerprint] = assistant_id
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Failed to persist Backboard assistant ID: {str(e)}")
+
+    def _count(self, call: str):
+        with self._counter_lock:
+            self._round_trips[call] += 1
+
+    async def _get_assistant_id(self) -> str:
+        if self._assistant_id is not None:
+            return self._assistant_id
+        async with self._assistant_lock:
+            if self._assistant_id is None:
+                self._count("create_assistant")
+                # Not idempotent: a retry after a lost response would leave a duplicate assistant
+                assistant = await self.upstream.call(
+                    lambda: self.client.create_assistant(name=ASSISTANT_NAME, system_prompt=self.system_prompt),
+                    idempotent=False
+                )
+                self._assistant_id = str(assistant.assistant_id)
+                self._persist_id(self._assistant_id)
+        return self._assistant_id
+
+    async def _new_thread(self, assistant_id: str, direct: bool = False) -> str:
+        """
+        Create a thread. `direct` skips the upstream wrapper, for callers already
+        inside an upstream.call: nesting a second call on the same breaker would
+        be rejected while that call is the half-open probe, and multiply retries.
+        """
+        self._count("create_thread")
+        try:
+            if direct:
+                thread = await self.client.create_thread(assistant_id)
+            else:
+                thread = await self.upstream.call(lambda: self.client.create_thread(assistant_id))
+        except Exception as e:
+            if getattr(e, "status_code", None) == 404 and self._assistant_id == assistant_id:
+                # Persisted assistant was deleted upstream; the next lookup creates a fresh one
+                self._assistant_id = None
+            raise
+        return str(thread.thread_id)
+
+    async def _create_thread(self) -> str:
+        assistant_id = await self._get_assistant_id()
+        try:
+            return await self._new_thread(assistant_id)
+        except Exception as e:
+            if getattr(e, "status_code", None) != 404 or self._assistant_id is not None:
+                raise
+            return await self._new_thread(await self._get_assistant_id())
+
+    async def _acquire_thread(self) -> List[Any]:
+        if self._idle_threads:
+            return self._idle_threads.pop()
+        return [await self._create_thread(), 0]
+
+    def _release_thread(self, entry: List[Any]):
+        entry[1] += 1
+        if entry[1] < self.thread_max_uses and len(self._idle_threads) < self.pool_size:
+            self._idle_threads.append(entry)
+
+    async def analyze(self, content: str, provider: str, model: str, **message_options: Any) -> Any:
+        """Send one transcript message on a pooled thread and return the Backboard response."""
+
+        async def attempt(assistant_id: str) -> Any:
+            # Thread and message share this attempt's timeout, retry and breaker verdict
+            entry = self._idle_threads.pop() if self._idle_threads else [await self._new_thread(assistant_id, direct=True), 0]
+            self._count("add_message")
+            # On failure or cancellation the thread may be in an unknown state, so it is not returned to the pool
+            response = await self.client.add_message(
+                thread_id=entry[0],
+                content=content,
+                llm_provider=provider,
+                model_name=model,
+                **message_options
+            )
+            self._release_thread(entry)
+            return response
+
+        # The assistant is resolved first, in its own upstream call, never nested in the attempt
+        assistant_id = await self._get_assistant_id()
+        try:
+            response = await self.upstream.call(lambda: attempt(assistant_id))
+        except Exception as e:
+            if getattr(e, "status_code", None) != 404 or self._assistant_id is not None:
+                raise
+            # The assistant was deleted upstream: recreate it once and try again
+            assistant_id = await self._get_assistant_id()
+            response = await self.upstream.call(lambda: attempt(assistant_id))
+        with self._counter_lock:
+            self._transcripts += 1
+        return response
+
+    async def analyze_stream(self, content: str, provider: str, model: str, **message_options: Any) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming counterpart of analyze: yields Backboard stream events. The thread
+        stays checked out until the stream is fully consumed. Tokens may already
+        have been forwarded when a stream fails, so streams are never retried.
+        """
+        entry = await self._acquire_thread()
+        self._count("add_message")
+        events = await self.upstream.call(
+            lambda: self.client.add_message(
+                thread_id=entry[0],
+                content=content,
+                llm_provider=provider,
+                model_name=model,
+                stream=True,
+                **message_options
+            ),
+            idempotent=False
+        )
+        async for event in events:
+            yield event
+        self._release_thread(entry)
+        with self._counter_lock:
+            self._transcripts += 1
+
+    def status(self) -> Dict[str, Any]:
+        """Round-trip counters for /filtertext/status."""
+        with self._counter_lock:
+            round_trips = dict(self._round_trips)
+            transcripts = self._transcripts
+        total = sum(round_trips.values())
+        return {
+            "base_url": getattr(self.client, "base_url", None),
+            "assistant_id": self._assistant_id,
+            "idle_threads": len(self._idle_threads),
+            "thread_max_uses": self.thread_max_uses,
+            "round_trips": round_trips,
+            "transcripts": transcripts,
+            "round_trips_per_transcript": round(total / transcripts, 3) if transcripts else None
+        }
+
+
+# Singleton instance
+_analyzer = None
+
+
+def get_backboard_analyzer(api_key: str, system_prompt: str) -> BackboardAnalyzer:
+    """Get or create the process-wide analyzer (one client, one assistant, one thread pool)."""
+    global _analyzer
+    if _analyzer is None:
+        upstream = get_upstream("backboard")
+        client = BackboardClient(
+            api_key=api_key,
+            base_url=os.getenv("BACKBOARD_BASE_URL", DEFAULT_BASE_URL),
+            # The upstream policy owns the per-attempt timeout
+            timeout=upstream.policy.timeout_s
+        )
+        _analyzer = BackboardAnalyzer(
+            client,
+            system_prompt,
+            assistant_id=os.getenv("BACKBOARD_ASSISTANT_ID") or None,
+            thread_max_uses=int(os.getenv("BACKBOARD_THREAD_MAX_USES", "1")),
+            pool_size=int(os.getenv("BACKBOARD_THREAD_POOL_SIZE", "8")),
+            upstream=upstream
+        )
+    return _analyzer
+
+
+def get_backboard_analyzer_status() -> Optional[Dict[str, Any]]:
+    """Status of the analyzer if one has been created in this process."""
+    return _analyzer.status() if _analyzer is not None else None
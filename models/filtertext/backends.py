@@ -0,0 +1,120 @@
+"""
+Inference backends for the PII NER model.
+
+- "torch": the Hugging Face PyTorch pipeline on CPU (default).
+- "onnx": the same model exported to ONNX and int8 dynamic-quantized, run
+  with ONNX Runtime. Requires `pip install "optimum[onnxruntime]"`.
+
+Both return a token-classification pipeline, so entity spans have the same
+format ({'entity_group', 'score', 'word', 'start', 'end'}) either way.
+"""
+
+import os
+import platform
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+# Conditional import for transformers
+try:
+    from transformers import AutoTokenizer, pipeline
+    HAS_TRANSFORMERS = True
+except ImportError:
+    HAS_TRANSFORMERS = False
+
+# Conditional import for ONNX Runtime via optimum
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForTokenClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    HAS_ONNX = True
+except ImportError:
+    HAS_ONNX = False
+
+VALID_BACKENDS = ("torch", "onnx")
+
+# Exported / quantized models are cached here between restarts
+ONNX_MODELS_DIR = Path(os.getenv("PII_ONNX_DIR", str(Path(__file__).parent / "onnx_models")))
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+
+def build_torch_pipeline(model_name: str) -> Tuple[Any, Optional[int], str]:
+    """PyTorch pipeline on CPU. Returns (pipeline, memory_bytes, device)."""
+    # We use 'aggregation_strategy="simple"' to auto-merge "Sam" + "##arth" -> "Samarth"
+    # device=-1 forces CPU (More stable for small models on Mac Air than MPS)
+    pii_pipeline = pipeline(
+        "token-classification",
+        model=model_name,
+        aggregation_strategy="simple",
+        device=-1
+    )
+    tensors = list(pii_pipeline.model.parameters()) + list(pii_pipeline.model.buffers())
+    memory_bytes = sum(t.numel() * t.element_size() for t in tensors)
+    return pii_pipeline, memory_bytes, str(pii_pipeline.device)
+
+
+def _quantization_config() -> Any:
+    """Dynamic int8 quantization tuned for the host CPU family."""
+    arch = os.getenv("PII_ONNX_QUANT_ARCH")
+    if not arch:
+        arch = "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2"
+    return getattr(AutoQuantizationConfig, arch)(is_static=False, per_channel=False)
+
+
+def export_quantized_onnx(model_name: str, output_dir: Optional[Path] = None) -> Path:
+    """
+    Export `model_name` to ONNX and apply int8 dynamic quantization.
+    Skipped when a quantized model is already cached in `output_dir`.
+    """
+    output_dir = output_dir or ONNX_MODELS_DIR / model_name.replace("/", "__")
+    quantized_dir = output_dir / "int8"
+    if (quantized_dir / QUANTIZED_FILE_NAME).exists():
+        return quantized_dir
+
+    export_dir = output_dir / "fp32"
+    print(f"Exporting {model_name} to ONNX at {export_dir}...")
+    ORTModelForTokenClassification.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+
+    print(f"Quantizing ONNX model (int8 dynamic) to {quantized_dir}...")
+    quantizer = ORTQuantizer.from_pretrained(export_dir)
+    quantizer.quantize(save_dir=quantized_dir, quantization_config=_quantization_config())
+    AutoTokenizer.from_pretrained(export_dir).save_pretrained(quantized_dir)
+    return quantized_dir
+
+
+def build_onnx_pipeline(model_name: str, intra_op_threads: Optional[int] = None) -> Tuple[Any, Optional[int], str]:
+    """Quantized ONNX Runtime pipeline. Returns (pipeline, memory_bytes, device)."""
+    if not HAS_ONNX:
+        raise ImportError('ONNX backend requires: pip install "optimum[onnxruntime]"')
+
+    quantized_dir = export_quantized_onnx(model_name)
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = intra_op_threads or os.cpu_count() or 1
+    session_options.inter_op_num_threads = 1
+
+    model = ORTModelForTokenClassification.from_pretrained(
+        quantized_dir,
+        file_name=QUANTIZED_FILE_NAME,
+        session_options=session_options,
+        provider="CPUExecutionProvider"
+    )
+    tokenizer = AutoTokenizer.from_pretrained(quantized_dir, use_fast=True)
+    pii_pipeline = pipeline(
+        "token-classification",
+        model=model,
+        tokenizer=tokenizer,
+        aggregation_strategy="simple"
+    )
+    memory_bytes = (quantized_dir / QUANTIZED_FILE_NAME).stat().st_size
+    return pii_pipeline, memory_bytes, f"cpu (onnxruntime int8, {session_options.intra_op_num_threads} threads)"
+
+
+def build_pipeline(backend: str, model_name: str, intra_op_threads: Optional[int] = None) -> Tuple[Any, Optional[int], str]:
+    """Build the NER pipeline for `backend`. Returns (pipeline, memory_bytes, device)."""
+    if backend == "onnx":
+        return build_onnx_pipeline(model_name, intra_op_threads)
+    if backend == "torch":
+        return build_torch_pipeline(model_name)
+    raise ValueError(f"Invalid PII inference backend '{backend}', expected one of {VALID_BACKENDS}")
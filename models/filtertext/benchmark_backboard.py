@@ -0,0 +1,174 @@
+"""
+Count Backboard round trips per transcript against a local fake server.
+
+    cd models
+    python -m filtertext.benchmark_backboard --transcripts 20
+
+Starts a stub of the three Backboard endpoints the analyzer uses on
+localhost, then runs the same transcripts through the per-request flow
+(create_assistant + create_thread + add_message, the old behaviour) and
+through the pooled analyzer, and reports requests per transcript and
+prompt bytes sent for each.
+
+_FakeBackboard can also inject latency and errors into add_message (see
+benchmark_resilience.py).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict
+
+from backboard import BackboardClient
+
+from .analyzer import BackboardAnalyzer, build_system_prompt
+from .service import TranscriptProcessingService
+
+SAMPLE_TRANSCRIPT = (
+    "Thanks for calling, this is [PER_REDACTED] from the advisory desk. We reviewed the portfolio and "
+    "recommend moving $25,000 into the bond fund before the end of the quarter."
+)
+FAKE_RESPONSE = {
+    "summary": "Advisor recommends a bond allocation.",
+    "key_points": [], "entities": {"people": [], "organizations": [], "dates": [], "amounts": ["$25,000"]},
+    "sentiment": "neutral", "action_items": [], "topics": ["portfolio"]
+}
+
+
+class _FakeBackboard(BaseHTTPRequestHandler):
+    counts: Dict[str, int] = {}
+    request_bytes = 0
+    lock = threading.Lock()
+    # Fault injection for add_message: base latency, a slow tail, and 503 responses
+    latency_s = 0.0
+    slow_fraction = 0.0
+    slow_latency_s = 0.0
+    error_rate = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body: Dict, status: int = 200):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _reply_stream(self, content: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for i in range(0, len(content), 16):
+            event = {"type": "content_streaming", "content": content[i:i + 16]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        self.wfile.write(f"data: {json.dumps({'type': 'run_ended', 'status': 'completed'})}\n\n".encode("utf-8"))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        now = datetime.now(timezone.utc).isoformat()
+        if self.path.endswith("/threads/messages") and b"stream=true" in body:
+            with self.lock:
+                self.counts["add_message"] = self.counts.get("add_message", 0) + 1
+                type(self).request_bytes += length
+            self._reply_stream(json.dumps(FAKE_RESPONSE))
+            return
+        if self.path.endswith("/threads/messages"):
+            kind, body = "add_message", {"messages": [{"role": "assistant", "content": json.dumps(FAKE_RESPONSE)}]}
+            if self._inject_faults():
+                with self.lock:
+                    self.counts["injected_errors"] = self.counts.get("injected_errors", 0) + 1
+                self._reply({"detail": "injected failure"}, status=503)
+                return
+        elif self.path.endswith("/threads"):
+            kind, body = "create_thread", {"thread_id": str(uuid.uuid4()), "created_at": now}
+        else:
+            kind, body = "create_assistant", {"assistant_id": str(uuid.uuid4()), "name": "fake", "created_at": now}
+        with self.lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            type(self).request_bytes += length
+        self._reply(body)
+
+    def _inject_faults(self) -> bool:
+        """Sleep for the configured latency; return True when this request should fail."""
+        delay = self.slow_latency_s if random.random() < self.slow_fraction else self.latency_s
+        if delay:
+            time.sleep(delay)
+        return random.random() < self.error_rate
+
+
+def _reset_counts():
+    with _FakeBackboard.lock:
+        _FakeBackboard.counts = {}
+        _FakeBackboard.request_bytes = 0
+
+
+async def _per_request_flow(client: BackboardClient, system_prompt: str, transcripts: int):
+    # The old flow: schema inlined in every message, new assistant and thread each time
+    schema = json.dumps(TranscriptProcessingService.STRUCTURED_OUTPUT_FORMAT, indent=2)
+    for _ in range(transcripts):
+        assistant = await client.create_assistant(
+            name="Transcript Analyzer",
+            system_prompt="You are an expert financial transcript analyst. Always return valid JSON."
+        )
+        thread = await client.create_thread(assistant.assistant_id)
+        await client.add_message(
+            thread_id=thread.thread_id,
+            content=f"Analyze the following transcript and extract structured information in the following "
+                    f"JSON format:\n\n{schema}\n\nTranscript:\n{SAMPLE_TRANSCRIPT}\n\n"
+                    f"Please provide your response as valid JSON matching the format above."
+        )
+
+
+async def _pooled_flow(client: BackboardClient, system_prompt: str, transcripts: int):
+    analyzer = BackboardAnalyzer(client, system_prompt, state_path=Path(tempfile.mkdtemp()) / "assistant.json")
+    for _ in range(transcripts):
+        await analyzer.analyze(f"Transcript:\n{SAMPLE_TRANSCRIPT}", provider="google", model="gemini-2.5-pro")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backboard round trips per transcript, per-request vs pooled")
+    parser.add_argument("--transcripts", type=int, default=20, help="Transcripts to send per mode")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeBackboard)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    system_prompt = build_system_prompt(TranscriptProcessingService.STRUCTURED_OUTPUT_FORMAT)
+
+    report = {}
+    for mode, flow in (("per_request", _per_request_flow), ("pooled", _pooled_flow)):
+        _reset_counts()
+
+        async def run():
+            client = BackboardClient(api_key="fake", base_url=base_url)
+            try:
+                await flow(client, system_prompt, args.transcripts)
+            finally:
+                await client.aclose()
+
+        asyncio.run(run())
+        total = sum(_FakeBackboard.counts.values())
+        report[mode] = {
+            "requests": dict(_FakeBackboard.counts),
+            "round_trips_per_transcript": round(total / args.transcripts, 3),
+            "request_bytes_per_transcript": round(_FakeBackboard.request_bytes / args.transcripts)
+        }
+
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark the PII NER inference backends against each other.
+
+Compares latency, throughput, resident memory and redaction agreement of the
+ONNX Runtime int8 backend against the PyTorch reference:
+
+    cd models
+    python -m filtertext.benchmark_pii --input audiotext/transcriptions --backends torch onnx
+
+Each backend runs in its own process so memory numbers are not mixed up.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+
+SAMPLE_TEXTS = [
+    "Hi, this is Sarah Johnson calling from Goldman Sachs about the Henderson account.",
+    "Thanks Michael. As discussed with Dr. Patel in Chicago, we will rebalance the portfolio by March 15th.",
+    "My name is David Chen, I live at 42 Elm Street in Springfield and my advisor is Emma Clarke at Vanguard.",
+    "Okay so the client, Mr. Robert Williams, wants to move two hundred thousand into the Fidelity bond fund.",
+]
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_backend(backend: str, model_name: str, texts: List[str], repeat: int, result_queue: Any):
+    """Load one backend, time it on `texts` and report back (runs in a child process)."""
+    from .backends import build_pipeline
+    from .chunking import detect_entities
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    pii_pipeline, memory_bytes, device = build_pipeline(backend, model_name)
+    load_time = time.perf_counter() - started
+    rss_loaded = _rss_mb()
+    tokenizer = pii_pipeline.tokenizer
+
+    # Warm-up pass so one-off graph/kernels setup is not counted
+    detect_entities(pii_pipeline, texts[0], tokenizer=tokenizer)
+
+    latencies = []
+    spans: List[List[Tuple[int, int, str]]] = []
+    total_started = time.perf_counter()
+    for run in range(repeat):
+        for text in texts:
+            t0 = time.perf_counter()
+            entities = detect_entities(pii_pipeline, text, tokenizer=tokenizer)
+            latencies.append(time.perf_counter() - t0)
+            if run == 0:
+                spans.append([(int(e["start"]), int(e["end"]), e["entity_group"]) for e in entities])
+    total_time = time.perf_counter() - total_started
+
+    latencies.sort()
+    result_queue.put({
+        "backend": backend,
+        "device": device,
+        "load_time_s": round(load_time, 2),
+        "model_memory_mb": round(memory_bytes / (1024 * 1024), 1) if memory_bytes else None,
+        "rss_loaded_mb": round(rss_loaded - rss_before, 1),
+        "rss_peak_mb": round(_rss_mb() - rss_before, 1),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "latency_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+        "throughput_docs_s": round(len(latencies) / total_time, 2),
+        "spans": spans
+    })
+
+
+def _span_agreement(reference: List[List[Tuple]], candidate: List[List[Tuple]]) -> Dict[str, float]:
+    """Span-level precision/recall/F1 of `candidate` against `reference`, plus identical-document rate."""
+    true_positive = false_positive = false_negative = identical = 0
+    for ref_doc, cand_doc in zip(reference, candidate):
+        ref: Set[Tuple] = set(map(tuple, ref_doc))
+        cand: Set[Tuple] = set(map(tuple, cand_doc))
+        true_positive += len(ref & cand)
+        false_positive += len(cand - ref)
+        false_negative += len(ref - cand)
+        identical += ref == cand
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 1.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "identical_docs": round(identical / len(reference), 4) if reference else 1.0
+    }
+
+
+def load_texts(input_path: str) -> List[str]:
+    """Read .txt files from a directory, a single .txt file, or a JSONL file with a 'text' field."""
+    path = Path(input_path)
+    if path.is_dir():
+        return [p.read_text(encoding="utf-8") for p in sorted(path.glob("*.txt"))]
+    if path.suffix == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line)["text"] for line in f if line.strip()]
+    return [path.read_text(encoding="utf-8")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PII NER inference backends")
+    parser.add_argument("--input", help="Directory of .txt transcripts, a .txt file or a .jsonl file (default: built-in samples)")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=["torch", "onnx"])
+    parser.add_argument("--model", default="obi/deid_roberta_i2b2")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the input set")
+    args = parser.parse_args()
+
+    texts = load_texts(args.input) if args.input else SAMPLE_TEXTS
+    texts = [t for t in texts if t.strip()]
+    if not texts:
+        print("No input texts found.")
+        return
+    print(f"Benchmarking {args.backends} on {len(texts)} texts x {args.repeat} passes "
+          f"({sum(len(t) for t in texts) / 1024:.1f} KB), {os.cpu_count()} CPUs")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in args.backends:
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=_run_backend, args=(backend, args.model, texts, args.repeat, result_queue))
+        process.start()
+        try:
+            while True:
+                try:
+                    results[backend] = result_queue.get(timeout=1)
+                    break
+                except queue.Empty:
+                    if not process.is_alive():
+                        print(f"Backend '{backend}' failed (exit code {process.exitcode}), skipping.")
+                        break
+        except KeyboardInterrupt:
+            process.terminate()
+            raise
+        process.join()
+
+    spans = {backend: result.pop("spans") for backend, result in results.items()}
+    if "torch" in spans:
+        for backend, result in results.items():
+            if backend != "torch":
+                result["agreement_vs_torch"] = _span_agreement(spans["torch"], spans[backend])
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
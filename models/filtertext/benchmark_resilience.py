@@ -0,0 +1,135 @@
+"""
+Tail latency and failures with and without the resilient-call layer.
+
+    cd models
+    python -m filtertext.benchmark_resilience --transcripts 200 --slow-fraction 0.05 --error-rate 0.05
+
+Runs the pooled analyzer against the fake Backboard server from
+benchmark_backboard.py with injected latency (a slow tail) and 503 errors,
+once with a bare policy (no retries, no hedging) and once with retries and
+hedging, and reports p50/p95/p99 latency and failed transcripts for each.
+A final outage phase (every call fails) shows the circuit breaker failing
+fast instead of waiting on the upstream.
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+from backboard import BackboardClient
+
+from resilience import CircuitOpenError, ResilientUpstream, UpstreamPolicy
+from .analyzer import BackboardAnalyzer, build_system_prompt
+from .benchmark_backboard import SAMPLE_TRANSCRIPT, _FakeBackboard, _reset_counts
+from .service import TranscriptProcessingService
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Cancelled hedges close their connection before the reply is written
+        pass
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def _run_mode(
+    base_url: str, policy: UpstreamPolicy, transcripts: int, concurrency: int, error_rate: float
+) -> Dict[str, Any]:
+    upstream = ResilientUpstream("backboard", policy)
+    client = BackboardClient(api_key="fake", base_url=base_url, timeout=policy.timeout_s)
+    analyzer = BackboardAnalyzer(
+        client,
+        build_system_prompt(TranscriptProcessingService.STRUCTURED_OUTPUT_FORMAT),
+        state_path=Path(tempfile.mkdtemp()) / "assistant.json",
+        upstream=upstream
+    )
+    # Create the assistant and warm the latency tracker (without injected errors) before measuring
+    _FakeBackboard.error_rate = 0.0
+    await analyzer.analyze("warm-up", provider="google", model="gemini-2.5-pro")
+    _reset_counts()
+    _FakeBackboard.error_rate = error_rate
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+    fast_failures = 0
+
+    async def one():
+        nonlocal failures, fast_failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await analyzer.analyze(f"Transcript:\n{SAMPLE_TRANSCRIPT}", provider="google", model="gemini-2.5-pro")
+                latencies.append(time.perf_counter() - started)
+            except CircuitOpenError:
+                fast_failures += 1
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one() for _ in range(transcripts)))
+    finally:
+        await client.aclose()
+    return {
+        "wall_s": round(time.perf_counter() - started, 3),
+        "latency_p50_s": round(_percentile(latencies, 0.50), 3),
+        "latency_p95_s": round(_percentile(latencies, 0.95), 3),
+        "latency_p99_s": round(_percentile(latencies, 0.99), 3),
+        "failed": failures,
+        "failed_fast": fast_failures,
+        "upstream": upstream.status()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backboard tail latency and failures, bare vs resilient")
+    parser.add_argument("--transcripts", type=int, default=200, help="Transcripts to send per mode")
+    parser.add_argument("--concurrency", type=int, default=16, help="Transcripts in flight at once")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Normal add_message latency")
+    parser.add_argument("--slow-fraction", type=float, default=0.05, help="Share of add_message calls that are slow")
+    parser.add_argument("--slow-latency-ms", type=float, default=1500, help="Latency of the slow calls")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of add_message calls answered with 503")
+    args = parser.parse_args()
+
+    server = _QuietServer(("127.0.0.1", 0), _FakeBackboard)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    _FakeBackboard.latency_s = args.latency_ms / 1000
+    _FakeBackboard.slow_fraction = args.slow_fraction
+    _FakeBackboard.slow_latency_s = args.slow_latency_ms / 1000
+
+    policies = {
+        "bare": UpstreamPolicy(timeout_s=30.0, retries=0, hedge=False, breaker_failures=10 ** 9),
+        "resilient": UpstreamPolicy(
+            timeout_s=30.0, retries=2, backoff_base_s=0.05, hedge=True,
+            hedge_min_delay_s=2 * args.latency_ms / 1000, breaker_failures=10 ** 9
+        ),
+    }
+    report = {}
+    for mode, policy in policies.items():
+        report[mode] = asyncio.run(_run_mode(base_url, policy, args.transcripts, args.concurrency, args.error_rate))
+        report[mode]["requests"] = dict(_FakeBackboard.counts)
+
+    # Outage: every call fails; the breaker opens and later calls fail without a round trip
+    _FakeBackboard.slow_fraction = 0.0
+    outage_policy = UpstreamPolicy(timeout_s=30.0, retries=1, backoff_base_s=0.05, breaker_failures=5, breaker_reset_s=60.0)
+    report["outage"] = asyncio.run(_run_mode(base_url, outage_policy, args.transcripts, args.concurrency, 1.0))
+    report["outage"]["requests"] = dict(_FakeBackboard.counts)
+
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Offline bulk PII redaction.
+
+Redacts a directory of transcripts (*.txt) or a JSONL file ({"id": ..., "text": ...}
+per line) using all cores, without going through the HTTP API:
+
+    cd models
+    python -m filtertext.bulk_redact --input audiotext/transcriptions --output redacted/
+    python -m filtertext.bulk_redact --input backfill.jsonl --output redacted/ --workers 8
+
+Each worker process runs the same detect_pii pipeline as /filtertext/process,
+over batches of --batch-size documents so their flagged regions go through the
+NER model together (detect_pii_many). With a local model every worker loads
+its own copy, so the default is a few workers that split PII_TORCH_THREADS (all
+cores by default) between them instead of one per core each spawning a thread
+per core. Set PII_INFERENCE_ADDRESS to have the workers share one batched NER
+model (see inference_server.py) instead; they then default to one per core.
+
+Completed document IDs are appended to a checkpoint file in the output
+directory, so an interrupted run resumes where it stopped. A batch whose NER
+call fails is neither written nor checkpointed (never a regex-only redaction),
+so re-running the same command retries it.
+"""
+
+import argparse
+import json
+import os
+import time
+from contextlib import ExitStack
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .spans import apply_redactions
+
+CHECKPOINT_FILE_NAME = ".bulk_redact_checkpoint"
+JSONL_OUTPUT_FILE_NAME = "redacted.jsonl"
+
+# Workers with a local model; each holds a full copy of it
+DEFAULT_MODEL_WORKERS = 4
+
+# Per-process service, created by the pool initializer
+_worker_service = None
+
+Job = Tuple[str, Optional[str], Optional[str]]
+
+
+def default_workers(use_model: bool) -> int:
+    """One worker per core, except with a local model: each one loads its own copy."""
+    cores = os.cpu_count() or 1
+    if use_model and not os.getenv("PII_INFERENCE_ADDRESS"):
+        return max(1, min(DEFAULT_MODEL_WORKERS, cores // 2))
+    return cores
+
+
+def _init_worker(use_model: bool, intra_op_threads: int):
+    global _worker_service
+    # Read by the model registry when it loads the model; without this every
+    # worker's torch/ONNX pool would claim all cores
+    os.environ["PII_TORCH_THREADS"] = str(intra_op_threads)
+    os.environ["PII_ONNX_THREADS"] = str(intra_op_threads)
+    from .service import TranscriptProcessingService
+    _worker_service = TranscriptProcessingService(backboard_api_key=None)
+    if not use_model:
+        # Regex only: mark the model as resolved so it is never loaded
+        _worker_service._pii_model_loaded = True
+
+
+def _redact_documents(jobs: List[Job]) -> List[Dict[str, object]]:
+    """
+    Worker entry point. Each job is (doc_id, text, path); text is read from path when not given.
+    When the NER model fails, every document of the batch comes back with an `error` instead.
+    """
+    from .service import PIIModelError
+
+    texts: List[str] = []
+    for doc_id, text, path in jobs:
+        if text is None:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        texts.append(text)
+    try:
+        spans_per_text = _worker_service.detect_pii_many(texts)
+    except PIIModelError as e:
+        return [{"id": doc_id, "error": str(e)} for doc_id, _, _ in jobs]
+    return [
+        {
+            "id": doc_id,
+            "pii_cleaned": apply_redactions(text, spans),
+            "pii_spans": [span.to_dict() for span in spans],
+            "input_bytes": len(text.encode("utf-8"))
+        }
+        for (doc_id, _, _), text, spans in zip(jobs, texts, spans_per_text)
+    ]
+
+
+def iter_batches(jobs: Iterator[Job], size: int) -> Iterator[List[Job]]:
+    batch: List[Job] = []
+    for job in jobs:
+        batch.append(job)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_jobs(input_path: Path, done: Set[str]) -> Iterator[Job]:
+    """Yield (doc_id, text, path) for every document not yet in the checkpoint."""
+    if input_path.is_dir():
+        for path in sorted(input_path.glob("*.txt")):
+            if path.name not in done:
+                yield path.name, None, str(path)
+        return
+
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            doc_id = str(record.get("id", line_number))
+            if doc_id not in done:
+                yield doc_id, record["text"], None
+
+
+def load_checkpoint(checkpoint_path: Path) -> Set[str]:
+    if not checkpoint_path.exists():
+        return set()
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk PII redaction over a transcript directory or JSONL file")
+    parser.add_argument("--input", required=True, help="Directory of .txt transcripts or a .jsonl file")
+    parser.add_argument("--output", required=True, help="Output directory")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"Worker processes (default: all cores, or up to {DEFAULT_MODEL_WORKERS} with a local model)")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("PII_NER_BATCH_SIZE", "8")),
+                        help="Documents per detect_pii_many call")
+    parser.add_argument("--regex-only", action="store_true", help="Skip the NER model")
+    parser.add_argument("--spans", action="store_true", help="Also write span lists for .txt inputs")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+    workers = args.workers or default_workers(not args.regex_only)
+    intra_op_threads = max(1, int(os.getenv("PII_TORCH_THREADS", str(os.cpu_count() or 1))) // workers)
+
+    input_path = Path(args.input)
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = output_dir / CHECKPOINT_FILE_NAME
+    if args.restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+    done = load_checkpoint(checkpoint_path)
+    if done:
+        print(f"Resuming: {len(done)} documents already redacted.")
+
+    jsonl_input = not input_path.is_dir()
+    documents = 0
+    failed = 0
+    total_bytes = 0
+    started = time.perf_counter()
+
+    with ExitStack() as stack:
+        checkpoint = stack.enter_context(open(checkpoint_path, "a", encoding="utf-8"))
+        if jsonl_input:
+            jsonl_out = stack.enter_context(open(output_dir / JSONL_OUTPUT_FILE_NAME, "a", encoding="utf-8"))
+        pool = stack.enter_context(
+            Pool(processes=workers, initializer=_init_worker, initargs=(not args.regex_only, intra_op_threads))
+        )
+        batches = iter_batches(iter_jobs(input_path, done), max(1, args.batch_size))
+        try:
+            for result in (r for batch in pool.imap_unordered(_redact_documents, batches) for r in batch):
+                doc_id = result["id"]
+                if "error" in result:
+                    # Not checkpointed, so the next run picks it up again
+                    failed += 1
+                    print(f"  {doc_id}: {result['error']}")
+                    continue
+                if jsonl_input:
+                    jsonl_out.write(json.dumps({
+                        "id": doc_id,
+                        "pii_cleaned": result["pii_cleaned"],
+                        "pii_spans": result["pii_spans"]
+                    }, ensure_ascii=False) + "\n")
+                    jsonl_out.flush()
+                else:
+                    stem = Path(doc_id).stem.replace("_transcription", "")
+                    with open(output_dir / f"{stem}_pii_cleaned.txt", "w", encoding="utf-8") as f:
+                        f.write(result["pii_cleaned"])
+                    if args.spans:
+                        with open(output_dir / f"{stem}_pii_spans.json", "w", encoding="utf-8") as f:
+                            json.dump(result["pii_spans"], f)
+
+                # Output first, then checkpoint: a crash in between re-does one document, never skips one
+                checkpoint.write(doc_id + "\n")
+                checkpoint.flush()
+                documents += 1
+                total_bytes += result["input_bytes"]
+                if documents % 100 == 0:
+                    print(f"  {documents} documents redacted...")
+        except KeyboardInterrupt:
+            pool.terminate()
+            print("Interrupted; re-run the same command to resume from the checkpoint.")
+
+    elapsed = time.perf_counter() - started
+    print(f"Redacted {documents} documents ({total_bytes / (1024 * 1024):.2f} MB) in {elapsed:.1f}s "
+          f"with {workers} workers: {documents / elapsed if elapsed else 0:.1f} docs/s, "
+          f"{total_bytes / (1024 * 1024) / elapsed if elapsed else 0:.2f} MB/s")
+    if failed:
+        print(f"{failed} documents failed PII detection and were not written; re-run the same command to retry them.")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
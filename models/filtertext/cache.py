@@ -0,0 +1,216 @@
+"""
+Content-addressed cache for processed transcripts.
+
+Entries (PII-cleaned text, spans and structured output) are keyed by a hash
+of everything that determines them: input text, PII model version, regex set
+version, LLM model name and output format. Two tiers:
+
+- a bounded in-memory LRU,
+- a persistent on-disk tier (one JSON file per key) evicted oldest-first
+  once it exceeds its size budget.
+
+Concurrent requests for the same key are coalesced so only one computation
+(NER pass + paid LLM call) runs. The computation is a task owned by the cache,
+so it keeps going for the remaining callers when the one that started it is
+cancelled, and is cancelled only once every caller has gone.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / "cache"
+
+
+def make_cache_key(**components: Any) -> str:
+    """SHA-256 over the sorted, JSON-encoded key components."""
+    payload = json.dumps(components, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Inflight:
+    """A computation in progress and how many callers are waiting for it."""
+
+    def __init__(self, task: "asyncio.Task[Dict[str, Any]]"):
+        self.task = task
+        self.waiters = 0
+
+
+class ProcessingCache:
+    """Two-tier (memory LRU + disk) cache with in-flight request coalescing."""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+        max_disk_bytes: int = 256 * 1024 * 1024
+    ):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, _Inflight] = {}
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0}
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*.json"))
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up memory, then disk (promoting disk hits to memory)."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return value
+
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            # Touch so eviction treats it as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        self._counters["disk_hits"] += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store in both tiers."""
+        self._remember(key, value)
+        if self.cache_dir is None:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            previous_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._disk_bytes += path.stat().st_size - previous_size
+        except OSError as e:
+            print(f"Warning: Failed to write cache entry: {str(e)}")
+            return
+
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete the least recently used files until the tier fits its budget again."""
+        files = sorted(self.cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for path in files:
+            if total <= self.max_disk_bytes * 0.9:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
+        with self._lock:
+            self._disk_bytes = total
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Return (value, cache_hit). On a miss, `compute` runs once; concurrent
+        callers with the same key wait for that result instead of recomputing.
+        Failures are propagated to every waiter and never cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+
+        inflight = self._inflight.get(key)
+        cache_hit = inflight is not None
+        if cache_hit:
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["misses"] += 1
+            inflight = _Inflight(asyncio.create_task(self._compute_and_store(key, compute)))
+            self._inflight[key] = inflight
+            inflight.task.add_done_callback(lambda task: self._finish_inflight(key, inflight))
+
+        inflight.waiters += 1
+        try:
+            return await asyncio.shield(inflight.task), cache_hit
+        except asyncio.CancelledError:
+            # Only stop the computation when nobody is waiting for it any more
+            if inflight.waiters == 1:
+                inflight.task.cancel()
+            raise
+        finally:
+            inflight.waiters -= 1
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        value = await compute()
+        self.put(key, value)
+        return value
+
+    def _finish_inflight(self, key: str, inflight: _Inflight):
+        if self._inflight.get(key) is inflight:
+            del self._inflight[key]
+        if not inflight.task.cancelled():
+            # Mark retrieved so a failure nobody awaited does not log a warning
+            inflight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes for the status endpoint."""
+        lookups = sum(self._counters.values())
+        hits = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["coalesced"]
+        return {
+            **self._counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "disk_mb": round(self._disk_bytes / (1024 * 1024), 2),
+            "max_disk_mb": round(self.max_disk_bytes / (1024 * 1024), 2),
+            "inflight": len(self._inflight)
+        }
+
+
+# Singleton instance
+_processing_cache = None
+
+
+def get_processing_cache() -> Optional[ProcessingCache]:
+    """Get or create the processing cache; None when disabled with PROCESSING_CACHE_ENABLED=false."""
+    global _processing_cache
+    if os.getenv("PROCESSING_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _processing_cache is None:
+        _processing_cache = ProcessingCache(
+            max_entries=int(os.getenv("PROCESSING_CACHE_MAX_ENTRIES", "256")),
+            cache_dir=Path(os.getenv("PROCESSING_CACHE_DIR", str(DEFAULT_CACHE_DIR))),
+            max_disk_bytes=int(float(os.getenv("PROCESSING_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        )
+    return _processing_cache
@@ -0,0 +1,186 @@
+"""
+Tiered PII detection cascade.
+
+Tier 1: regex engine (structured identifiers, always runs).
+Tier 2: cheap capitalisation / gazetteer pass that flags segments which may
+        contain person, organisation or location names, dates or ages.
+Tier 3: the deid_roberta_i2b2 NER model, run only on flagged segments.
+
+Segments the cheap tier does not flag never reach the model. CascadeStats
+keeps per-tier hit counts and timings so the saved model time is visible
+in /filtertext/status.
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+
+# Sentence-ish segments: break after terminal punctuation followed by whitespace, or on line breaks
+_BOUNDARY_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+# A segment ending like this continues into the next one ("Dr. Patel", "J. Smith")
+_ABBREVIATION_END_RE = re.compile(r"\b(?:mr|mrs|ms|dr|prof|st|jr|sr|inc|co|corp|ltd|no|vs|[A-Za-z])\.$", re.IGNORECASE)
+
+# Capitalised word; a name candidate unless it is a stop word
+_CAPITALISED_RE = re.compile(r"\b[A-Z][a-zA-Z'\-]+")
+
+_CUE_WORDS = (
+    # Honorifics and introductions
+    r"mr|mrs|ms|miss|dr|prof|sir|madam|mister|my name is|this is|speaking with|calling from|"
+    r"i'm|i am|spoke (?:to|with)|ask for|"
+    # Organisation suffixes
+    # (generic finance words like "fund" or "capital" are left out: they appear in
+    # nearly every segment, and real organisation names are capitalised anyway)
+    r"inc|llc|ltd|corp|corporation|bank|partners|holdings|securities|"
+    r"associates|advisors|hospital|clinic|university|"
+    # Location cues
+    r"street|st|avenue|ave|road|rd|boulevard|blvd|lane|suite|apartment|apt|city|county|"
+    r"zip|postcode|"
+    # Dates and ages (the i2b2 model also tags these)
+    r"january|february|march|april|may\s+\d|june|july|august|september|october|november|december|"
+    r"jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|years old|year old|aged|born"
+)
+_GAZETTEER_RE = re.compile(rf"\b(?:{_CUE_WORDS})\b", re.IGNORECASE)
+_DATE_LIKE_RE = re.compile(r"\b\d{1,4}[/-]\d{1,2}[/-]\d{1,4}\b")
+
+# Capitalised words that are not names on their own (mostly common sentence openers,
+# since a sentence-initial capital is otherwise treated as a possible name)
+_STOP_WORDS = frozenset("""
+I I'm I've I'll I'd Okay OK Ok Yes Yeah Yep Nope No Not So And But Or The A An This That These Those
+It It's Its There There's Here Here's We We're We've We'll Our Us You You're You've You'll Your He
+He's She She's They They're Their Them My Me Mine Hi Hello Hey Thanks Thank Please Sorry Excuse Well
+Um Uh Hmm Mhm Oh Right Sure Also Just Now Then What What's When Where Why How Which Who If Is Are
+Was Were Be Been Do Does Did Don't Doesn't Didn't Can Can't Could Would Should Will Won't Let Let's
+Alright Great Good Perfect Fine Cool Awesome Absolutely Actually Basically Definitely Certainly
+Exactly Correct Understood Got Maybe Probably Anyway Otherwise Again Once After Before Since Because
+Although While As For In On At To With From Of By About Into Over Under All Any Some Every Each One
+Two Three First Second Third Next Last Bye Goodbye Have Has Had Get Go Going Make See Look
+Q1 Q2 Q3 Q4 CEO CFO USD EUR GBP ETF IRA
+""".split())
+
+# Below this share of capitalised words the text is treated as unreliably cased
+# (e.g. an all-lowercase ASR output) and every segment is escalated.
+MIN_CASED_RATIO = 0.02
+
+
+class CascadeStats:
+    """Thread-safe counters for the detection tiers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.documents = 0
+            self.segments = 0
+            self.segments_escalated = 0
+            self.chars = 0
+            self.chars_escalated = 0
+            self.regex_hits = 0
+            self.ner_hits = 0
+            self.regex_time_s = 0.0
+            self.gazetteer_time_s = 0.0
+            self.ner_time_s = 0.0
+
+    def record(
+        self,
+        segments: int,
+        segments_escalated: int,
+        chars: int,
+        chars_escalated: int,
+        regex_hits: int,
+        ner_hits: int,
+        regex_time_s: float,
+        gazetteer_time_s: float,
+        ner_time_s: float
+    ):
+        with self._lock:
+            self.documents += 1
+            self.segments += segments
+            self.segments_escalated += segments_escalated
+            self.chars += chars
+            self.chars_escalated += chars_escalated
+            self.regex_hits += regex_hits
+            self.ner_hits += ner_hits
+            self.regex_time_s += regex_time_s
+            self.gazetteer_time_s += gazetteer_time_s
+            self.ner_time_s += ner_time_s
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "segments": self.segments,
+                "segments_escalated": self.segments_escalated,
+                "escalation_rate": round(self.segments_escalated / self.segments, 4) if self.segments else None,
+                "model_chars_skipped_ratio": round(1 - self.chars_escalated / self.chars, 4) if self.chars else None,
+                "hits": {"regex": self.regex_hits, "ner": self.ner_hits},
+                "time_s": {
+                    "regex": round(self.regex_time_s, 3),
+                    "gazetteer": round(self.gazetteer_time_s, 3),
+                    "ner": round(self.ner_time_s, 3)
+                }
+            }
+
+
+def split_segments(text: str) -> List[Tuple[int, int]]:
+    """Split text into sentence-like (start, end) segments covering all non-blank text."""
+    segments: List[Tuple[int, int]] = []
+    start = 0
+    for boundary in _BOUNDARY_RE.finditer(text):
+        end = boundary.start()
+        if text[start:end].strip() and not _ABBREVIATION_END_RE.search(text[start:end]):
+            segments.append((start, end))
+            start = boundary.end()
+    if text[start:].strip():
+        segments.append((start, len(text)))
+    return segments
+
+
+def _segment_may_contain_names(segment: str) -> bool:
+    """Cheap tier: capitalised words outside the stop list, cue words or date-like numbers."""
+    if _GAZETTEER_RE.search(segment) or _DATE_LIKE_RE.search(segment):
+        return True
+    return any(match.group() not in _STOP_WORDS for match in _CAPITALISED_RE.finditer(segment))
+
+
+def flag_name_regions(text: str) -> Tuple[List[Tuple[int, int]], int, int]:
+    """
+    Return (regions, segment_count, flagged_count). Regions are the (start, end)
+    ranges the NER model should see; adjacent flagged segments are coalesced
+    so the model keeps local context.
+    """
+    segments = split_segments(text)
+    words = re.findall(r"[A-Za-z]+", text)
+    if words and sum(w[0].isupper() for w in words) / len(words) < MIN_CASED_RATIO:
+        # Casing is not trustworthy: escalate everything
+        regions = [(segments[0][0], segments[-1][1])] if segments else []
+        return regions, len(segments), len(segments)
+
+    regions: List[Tuple[int, int]] = []
+    flagged = 0
+    previous_flagged = False
+    for start, end in segments:
+        if not _segment_may_contain_names(text[start:end]):
+            previous_flagged = False
+            continue
+        flagged += 1
+        if previous_flagged:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+        previous_flagged = True
+    return regions, len(segments), flagged
+
+
+# Singleton instance
+_cascade_stats = None
+
+
+def get_cascade_stats() -> CascadeStats:
+    """Get or create the process-wide cascade counters."""
+    global _cascade_stats
+    if _cascade_stats is None:
+        _cascade_stats = CascadeStats()
+    return _cascade_stats
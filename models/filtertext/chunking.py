@@ -0,0 +1,145 @@
+"""
+Token-window chunking for long transcripts.
+
+RoBERTa only sees 512 tokens at a time. Long transcripts are split into
+overlapping windows using the fast tokenizer's character offsets, all windows
+are inferred as one batch, and entity spans are mapped back to the original
+text and de-duplicated across the overlaps.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# Tokens reserved below the model limit: BPE can split a word differently when
+# a window starts mid-sentence, so leave a little headroom.
+WINDOW_SAFETY_MARGIN = 8
+
+
+def window_token_limit(tokenizer: Any) -> int:
+    """Largest number of content tokens that fits in one model window."""
+    model_max = getattr(tokenizer, "model_max_length", 512)
+    if not model_max or model_max > 100_000:
+        # Some tokenizers report a sentinel "infinite" length
+        model_max = 512
+    return model_max - tokenizer.num_special_tokens_to_add() - WINDOW_SAFETY_MARGIN
+
+
+def split_into_windows(
+    text: str,
+    tokenizer: Any,
+    max_tokens: Optional[int] = None,
+    stride: int = 64
+) -> List[Tuple[int, int]]:
+    """
+    Split `text` into overlapping (char_start, char_end) windows of at most
+    `max_tokens` tokens, consecutive windows sharing `stride` tokens.
+    The text is tokenized once, so cost is linear in its length.
+    """
+    max_tokens = max_tokens or window_token_limit(tokenizer)
+    if stride >= max_tokens:
+        raise ValueError("stride must be smaller than the window size")
+
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    if len(offsets) <= max_tokens:
+        return [(0, len(text))]
+
+    windows = []
+    step = max_tokens - stride
+    start = 0
+    while True:
+        end = min(start + max_tokens, len(offsets))
+        windows.append((offsets[start][0], offsets[end - 1][1]))
+        if end == len(offsets):
+            break
+        start += step
+    return windows
+
+
+def _owned_ranges(windows: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Give every character to exactly one window: overlaps are split at their
+    midpoint, so an entity cut off at a window edge is taken from the
+    neighbouring window that sees it whole.
+    """
+    owned = []
+    for i, (start, end) in enumerate(windows):
+        own_start = 0 if i == 0 else (start + windows[i - 1][1]) // 2
+        own_end = float("inf") if i == len(windows) - 1 else (windows[i + 1][0] + end) // 2
+        owned.append((own_start, own_end))
+    return owned
+
+
+def merge_entities(entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse duplicate or overlapping spans with the same label into one."""
+    merged: List[Dict[str, Any]] = []
+    for entity in sorted(entities, key=lambda e: (e["start"], -e["end"])):
+        previous = merged[-1] if merged else None
+        if previous and entity["start"] < previous["end"] and entity["entity_group"] == previous["entity_group"]:
+            previous["end"] = max(previous["end"], entity["end"])
+            previous["score"] = max(previous["score"], entity["score"])
+            continue
+        merged.append(dict(entity))
+    return merged
+
+
+def detect_entities_many(
+    pii_pipeline: Any,
+    texts: List[str],
+    tokenizer: Optional[Any] = None,
+    stride: int = 64,
+    batch_size: int = 8
+) -> List[List[Dict[str, Any]]]:
+    """
+    Run the token-classification pipeline over several texts of any length.
+    The windows of all texts go through the model as one batch. Returns one
+    entity list per text, with `start`/`end` relative to that text.
+    Without a tokenizer each text is passed through whole.
+    """
+    results: List[List[Dict[str, Any]]] = [[] for _ in texts]
+    jobs = [(i, text) for i, text in enumerate(texts) if text]
+    if not jobs:
+        return results
+
+    if tokenizer is None:
+        outputs = pii_pipeline([text for _, text in jobs], batch_size=batch_size)
+        for (i, _), entities in zip(jobs, outputs):
+            results[i] = list(entities)
+        return results
+
+    # (text index, window start, owned range) for every window, in batch order
+    plan: List[Tuple[int, int, Tuple[int, float]]] = []
+    window_texts: List[str] = []
+    for i, text in jobs:
+        windows = split_into_windows(text, tokenizer, stride=stride)
+        for (start, end), owned in zip(windows, _owned_ranges(windows)):
+            plan.append((i, start, owned))
+            window_texts.append(text[start:end])
+
+    outputs = pii_pipeline(window_texts, batch_size=batch_size)
+
+    for (i, window_start, (own_start, own_end)), window_entities in zip(plan, outputs):
+        text = texts[i]
+        for entity in window_entities:
+            start = window_start + int(entity["start"])
+            if not own_start <= start < own_end:
+                continue
+            shifted = dict(entity)
+            shifted["start"] = start
+            shifted["end"] = window_start + int(entity["end"])
+            shifted["word"] = text[start:shifted["end"]]
+            results[i].append(shifted)
+
+    return [merge_entities(entities) for entities in results]
+
+
+def detect_entities(
+    pii_pipeline: Any,
+    text: str,
+    tokenizer: Optional[Any] = None,
+    stride: int = 64,
+    batch_size: int = 8
+) -> List[Dict[str, Any]]:
+    """
+    Run the token-classification pipeline over `text` of any length.
+    Returns entities with `start`/`end` relative to `text`.
+    """
+    return detect_entities_many(pii_pipeline, [text], tokenizer, stride=stride, batch_size=batch_size)[0]
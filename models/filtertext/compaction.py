@@ -0,0 +1,119 @@
+"""
+Transcript compaction between redaction and the LLM call.
+
+Whisper output carries filler words, stutters ("I I I think") and, after
+redaction, runs of identical `[..._REDACTED]` tags, all billed as prompt
+tokens. compact_transcript removes them and normalises whitespace without
+touching numbers or content words: only single filler and function words
+are collapsed when repeated, since a repeated number ("twenty twenty",
+"four four one one") is content; the saved PII-cleaned file is not
+affected, only the text sent to the LLM.
+"""
+
+import re
+import threading
+from typing import Any, Dict, Tuple
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+    TOKENIZER_NAME = "tiktoken/cl100k_base"
+except Exception:
+    # Optional dependency: fall back to the usual ~4 characters per token estimate
+    _ENCODING = None
+    TOKENIZER_NAME = "estimate/4-chars"
+
+# "[PER_REDACTED] [PER_REDACTED], [PER_REDACTED]" -> "[PER_REDACTED]"
+_REPEATED_TAG_RE = re.compile(r"(\[[A-Z_]+_REDACTED\])(?:[\s,;-]*\1)+")
+# Standalone fillers, with the comma that usually follows them
+# Case-sensitive: lowercase, or capitalised at the start of a sentence ("Um, so").
+# All-caps "MM", "ERM", "HMM" and "UM" are finance tokens, and after a number
+# ("$5 mm", "10 mm") the word is a unit, so neither is ever a filler
+_FILLER_RE = re.compile(
+    r"(?<![\w'-])(?<!\d )(?:[Uu]u*m+|[Uu]u*h+|[Ee]e*r+m+|[Aa]a*h+|[Hh]h*m+|[Mm]m*h*m+|[Uu]h-huh)(?![\w'-])[,.]?\s*"
+)
+_YOU_KNOW_RE = re.compile(r",\s*(?:you know|i mean)\s*,", re.IGNORECASE)
+# Stutters: one word repeated back to back ("I I I think")
+_REPEAT_RE = re.compile(r"\b([A-Za-z']+)(?:[\s,]+\1\b)+", re.IGNORECASE)
+# The only words a stutter collapses; everything else (numbers, names, "had had") is kept
+_STUTTER_WORDS = frozenset({
+    "uh", "um", "like", "so", "well", "and", "but", "i", "i'm", "we", "you", "it", "the", "a", "an", "to", "okay", "yeah"
+})
+_SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+([,.;:!?])")
+_DUPLICATE_PUNCT_RE = re.compile(r"([,;])(?:\s*[,;])+")
+_SPACES_RE = re.compile(r"[ \t]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+
+def _collapse_repeat(match: "re.Match") -> str:
+    word = match.group(1)
+    return word if word.lower() in _STUTTER_WORDS else match.group()
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, otherwise a chars/4 estimate."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text) + 3) // 4
+
+
+def compact_transcript(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Return (compacted_text, report) with character and token counts before and after."""
+    compacted = _REPEATED_TAG_RE.sub(r"\1", text)
+    compacted = _YOU_KNOW_RE.sub(",", compacted)
+    compacted = _FILLER_RE.sub("", compacted)
+    compacted = _REPEAT_RE.sub(_collapse_repeat, compacted)
+    compacted = _SPACE_BEFORE_PUNCT_RE.sub(r"\1", compacted)
+    compacted = _DUPLICATE_PUNCT_RE.sub(r"\1", compacted)
+    compacted = _SPACES_RE.sub(" ", compacted)
+    compacted = _BLANK_LINES_RE.sub("\n\n", compacted)
+    compacted = "\n".join(line.strip() for line in compacted.split("\n")).strip()
+
+    tokens_before = count_tokens(text)
+    tokens_after = count_tokens(compacted)
+    return compacted, {
+        "chars_before": len(text),
+        "chars_after": len(compacted),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "token_reduction": round(1 - tokens_after / tokens_before, 4) if tokens_before else 0.0,
+        "tokenizer": TOKENIZER_NAME
+    }
+
+
+class CompactionStats:
+    """Thread-safe running totals for /filtertext/status."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.transcripts = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def record(self, report: Dict[str, Any]):
+        with self._lock:
+            self.transcripts += 1
+            self.tokens_before += report["tokens_before"]
+            self.tokens_after += report["tokens_after"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "transcripts": self.transcripts,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "token_reduction": round(1 - self.tokens_after / self.tokens_before, 4) if self.tokens_before else None,
+                "tokenizer": TOKENIZER_NAME
+            }
+
+
+# Singleton instance
+_compaction_stats = None
+
+
+def get_compaction_stats() -> CompactionStats:
+    """Get or create the process-wide compaction counters."""
+    global _compaction_stats
+    if _compaction_stats is None:
+        _compaction_stats = CompactionStats()
+    return _compaction_stats
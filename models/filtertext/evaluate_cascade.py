@@ -0,0 +1,85 @@
+"""
+Check that the detection cascade keeps recall on a labelled set.
+
+Input is JSONL, one transcript per line:
+
+    {"text": "...", "spans": [{"start": 10, "end": 17, "label": "PER"}, ...]}
+
+Every document is redacted twice, with the NER model on the full text and
+with the cascade (model only on flagged segments), and both are scored
+against the gold spans:
+
+    cd models
+    python -m filtertext.evaluate_cascade --input labelled.jsonl
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Tuple
+
+from .cascade import flag_name_regions
+from .chunking import detect_entities_many
+from .model_registry import PIIModelRegistry
+from .regex_engine import get_regex_engine
+
+
+def _overlaps(span: Tuple[int, int], predicted: List[Tuple[int, int]]) -> bool:
+    return any(start < span[1] and span[0] < end for start, end in predicted)
+
+
+def _predict(pii_pipeline: Any, tokenizer: Any, text: str, regions: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    predicted = [(s.start, s.end) for s in get_regex_engine().find_spans(text)]
+    outputs = detect_entities_many(pii_pipeline, [text[start:end] for start, end in regions], tokenizer=tokenizer)
+    for (offset, _), entities in zip(regions, outputs):
+        predicted.extend((offset + int(e["start"]), offset + int(e["end"])) for e in entities)
+    return predicted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PII recall with and without the detection cascade")
+    parser.add_argument("--input", required=True, help="Labelled JSONL file")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        documents: List[Dict[str, Any]] = [json.loads(line) for line in f if line.strip()]
+
+    registry = PIIModelRegistry()
+    pii_pipeline = registry.load()
+    if pii_pipeline is None:
+        print(f"PII model unavailable: {registry.status()['error']}")
+        return
+    tokenizer = registry.get_tokenizer()
+
+    results = {mode: {"found": 0, "time_s": 0.0, "model_chars": 0} for mode in ("full", "cascade")}
+    gold_total = 0
+    total_chars = 0
+    for document in documents:
+        text = document["text"]
+        gold = [(int(s["start"]), int(s["end"])) for s in document.get("spans", [])]
+        gold_total += len(gold)
+        total_chars += len(text)
+
+        for mode in ("full", "cascade"):
+            started = time.perf_counter()
+            regions = flag_name_regions(text)[0] if mode == "cascade" else [(0, len(text))]
+            predicted = _predict(pii_pipeline, tokenizer, text, regions)
+            results[mode]["time_s"] += time.perf_counter() - started
+            results[mode]["model_chars"] += sum(end - start for start, end in regions)
+            results[mode]["found"] += sum(_overlaps(span, predicted) for span in gold)
+
+    report = {
+        mode: {
+            "recall": round(r["found"] / gold_total, 4) if gold_total else None,
+            "time_s": round(r["time_s"], 2),
+            "model_chars_ratio": round(r["model_chars"] / total_chars, 4) if total_chars else None
+        }
+        for mode, r in results.items()
+    }
+    report["documents"] = len(documents)
+    report["gold_spans"] = gold_total
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Off-event-loop executor for CPU-bound PII redaction.
+
+Redaction (regex + RoBERTa NER) is CPU heavy; running it inline in an
+`async def` route stalls every other request served by the same worker.
+"""
+
+import os
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when too many redaction jobs are already queued or running."""
+
+
+class RedactionExecutor:
+    """
+    Bounded dispatcher for redaction work.
+
+    - "thread": thread pool, used for the torch NER path (torch releases the GIL
+      and the shared model stays in this process).
+    - "process": process pool, used for the regex-only path (pure Python, GIL bound).
+      Jobs there run regex only, so while the NER model is available "process"
+      is not honoured and they go to the thread pool instead.
+    - "auto": picks per call, thread pool when the NER model is loaded, otherwise process pool.
+
+    At most `max_pending` jobs may be queued or running; further submissions
+    raise ExecutorSaturatedError so callers can shed load with a 503.
+    """
+
+    VALID_KINDS = ("auto", "thread", "process")
+
+    def __init__(self, kind: str = "auto", max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        if kind not in self.VALID_KINDS:
+            raise ValueError(f"Invalid executor kind '{kind}', expected one of {self.VALID_KINDS}")
+        self.kind = kind
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or self.max_workers * 4
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        # Only touched from the event loop thread, so no lock is needed
+        self._pending = 0
+        self._rejected = 0
+        self._completed = 0
+        self._process_refused = False
+
+    def resolve_kind(self, model_available: bool) -> str:
+        """Decide which pool a job should run on."""
+        if self.kind == "process" and model_available:
+            # The process pool has no model; running there would silently skip NER
+            if not self._process_refused:
+                self._process_refused = True
+                logger.warning("PII_EXECUTOR=process ignored while the NER model is available; using the thread pool")
+            return "thread"
+        if self.kind != "auto":
+            return self.kind
+        return "thread" if model_available else "process"
+
+    def _get_pool(self, kind: str) -> Executor:
+        if kind == "process":
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pii-redact")
+        return self._thread_pool
+
+    async def run(self, kind: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run `fn(*args)` on the requested pool without blocking the event loop.
+        Functions sent to the process pool must be picklable (module or class level).
+        """
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise ExecutorSaturatedError(
+                f"Redaction queue is full ({self._pending}/{self.max_pending} jobs pending)"
+            )
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(kind), fn, *args)
+            self._completed += 1
+            return result
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        """Stop the worker pools."""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot of the executor state for the status endpoint."""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected
+        }
+
+
+# Singleton instance
+_redaction_executor = None
+
+
+def get_redaction_executor() -> RedactionExecutor:
+    """Get or create the redaction executor configured from the environment."""
+    global _redaction_executor
+    if _redaction_executor is None:
+        max_workers = os.getenv("PII_EXECUTOR_WORKERS")
+        max_pending = os.getenv("PII_EXECUTOR_MAX_PENDING")
+        _redaction_executor = RedactionExecutor(
+            kind=os.getenv("PII_EXECUTOR", "auto"),
+            max_workers=int(max_workers) if max_workers else None,
+            max_pending=int(max_pending) if max_pending else None
+        )
+    return _redaction_executor
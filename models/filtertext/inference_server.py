@@ -0,0 +1,321 @@
+"""
+Dedicated PII inference worker with dynamic micro-batching.
+
+Run one per host next to the API workers:
+
+    cd models
+    python -m filtertext.inference_server
+
+API workers started with PII_INFERENCE_ADDRESS set no longer load the RoBERTa
+model themselves; they send texts to this process over local IPC. Requests
+from all workers are grouped into micro-batches (up to PII_BATCH_MAX_SIZE texts,
+waiting at most PII_BATCH_MAX_WAIT_MS for a batch to fill) and run through a
+single shared model.
+
+The IPC handshake uses PII_INFERENCE_AUTHKEY. A TCP address requires it; on a
+Unix socket without it, the server generates a random key and writes it to
+`<socket>.key` (mode 0600), which workers running as the same user read.
+"""
+
+import os
+import secrets
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+DEFAULT_INFERENCE_ADDRESS = "/tmp/finsight-pii-inference.sock"
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """'host:port' becomes a TCP address, anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return (host, int(port))
+    return address
+
+
+def authkey_path(socket_path: str) -> str:
+    """Where the server keeps the generated key for a Unix socket."""
+    return socket_path + ".key"
+
+
+def get_authkey(address: str) -> bytes:
+    """
+    Shared secret for the IPC handshake: PII_INFERENCE_AUTHKEY, or else the key
+    the server generated next to its Unix socket. Connections unpickle what the
+    peer sends, so there is no default key and TCP needs an explicit one.
+    """
+    key = os.getenv("PII_INFERENCE_AUTHKEY")
+    if key:
+        return key.encode("utf-8")
+    parsed = parse_address(address)
+    if not isinstance(parsed, str):
+        raise RuntimeError("PII_INFERENCE_AUTHKEY must be set to use a TCP inference address")
+    path = authkey_path(parsed)
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW)
+    except FileNotFoundError:
+        raise RuntimeError(f"No inference server key at {path}; start the server or set PII_INFERENCE_AUTHKEY")
+    with os.fdopen(fd, "rb") as f:
+        info = os.fstat(f.fileno())
+        if info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise RuntimeError(f"Refusing inference server key {path}: not owned by this user or readable by others")
+        return f.read().strip()
+
+
+def _create_authkey(socket_path: str) -> bytes:
+    """Generate a random key and write it to a fresh 0600 file next to the socket."""
+    path = authkey_path(socket_path)
+    if os.path.lexists(path):
+        os.unlink(path)
+    key = secrets.token_hex(32).encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _to_plain_entities(entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Strip numpy scalars so results pickle cheaply and identically across versions."""
+    return [
+        {
+            "entity_group": entity["entity_group"],
+            "score": float(entity["score"]),
+            "word": entity.get("word", ""),
+            "start": int(entity["start"]),
+            "end": int(entity["end"])
+        }
+        for entity in entities
+    ]
+
+
+class _PendingRequest:
+    """One client request waiting to be batched."""
+
+    def __init__(self, conn: Connection, send_lock: threading.Lock, request_id: int, texts: List[str]):
+        self.conn = conn
+        self.send_lock = send_lock
+        self.request_id = request_id
+        self.texts = texts
+
+    def reply(self, ok: bool, payload: Any):
+        try:
+            with self.send_lock:
+                self.conn.send((self.request_id, ok, payload))
+        except (OSError, EOFError):
+            # Client went away; nothing to deliver
+            pass
+
+
+class PIIInferenceServer:
+    """Accepts redaction requests over IPC and serves them in micro-batches."""
+
+    def __init__(
+        self,
+        address: str = DEFAULT_INFERENCE_ADDRESS,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        registry: Optional[Any] = None
+    ):
+        # Imported here: model_registry imports this module for the client side
+        from .model_registry import PIIModelRegistry
+
+        self.address = parse_address(address)
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.registry = registry or PIIModelRegistry(
+            inference_address=None,
+            backend=os.getenv("PII_INFERENCE_BACKEND", "torch")
+        )
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+        self._batches = 0
+        self._texts = 0
+
+    def serve_forever(self):
+        """Load the model, then accept connections until interrupted."""
+        pipeline = self.registry.load()
+        if pipeline is None:
+            raise RuntimeError(f"PII model could not be loaded: {self.registry.status()['error']}")
+
+        unix_socket = isinstance(self.address, str)
+        if os.getenv("PII_INFERENCE_AUTHKEY"):
+            authkey = os.getenv("PII_INFERENCE_AUTHKEY").encode("utf-8")
+        elif unix_socket:
+            authkey = _create_authkey(self.address)
+        else:
+            raise RuntimeError("PII_INFERENCE_AUTHKEY must be set to listen on a TCP address")
+
+        if unix_socket and os.path.lexists(self.address):
+            os.unlink(self.address)
+
+        # Create the socket owner-only; umask covers the window before chmod
+        previous_umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, authkey=authkey)
+        finally:
+            os.umask(previous_umask)
+        if unix_socket:
+            os.chmod(self.address, 0o600)
+
+        threading.Thread(target=self._batch_loop, args=(pipeline,), daemon=True, name="pii-batcher").start()
+
+        with listener:
+            print(f"PII inference server listening on {self.address} "
+                  f"(max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_s * 1000:.0f})")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"Rejected inference client: {str(e)}")
+                    continue
+                threading.Thread(target=self._read_loop, args=(conn,), daemon=True).start()
+
+    def _read_loop(self, conn: Connection):
+        """Receive requests from one API worker and queue them for batching."""
+        send_lock = threading.Lock()
+        try:
+            while True:
+                op, request_id, texts = conn.recv()
+                request = _PendingRequest(conn, send_lock, request_id, texts or [])
+                if op == "ping":
+                    request.reply(True, dict(self.registry.status(), batches=self._batches, texts=self._texts))
+                elif op == "predict":
+                    self._queue.put(request)
+                else:
+                    request.reply(False, f"Unknown operation: {op}")
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _collect_batch(self) -> List[_PendingRequest]:
+        """Block for the first request, then gather more until the batch is full or the wait expires."""
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait_s
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _batch_loop(self, pipeline: Any):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                outputs = pipeline(texts, batch_size=min(len(texts), self.max_batch_size)) if texts else []
+            except Exception as e:
+                for request in batch:
+                    request.reply(False, str(e))
+                continue
+
+            self._batches += 1
+            self._texts += len(texts)
+            offset = 0
+            for request in batch:
+                results = outputs[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+                request.reply(True, [_to_plain_entities(entities) for entities in results])
+
+
+class PIIInferenceClient:
+    """
+    Client used by API workers. Callable like a token-classification pipeline:
+    `client(text)` returns a list of entities, `client([texts])` a list of lists.
+
+    Requests are multiplexed over one connection so concurrent redactions from the
+    same worker can land in the same micro-batch on the server.
+    """
+
+    def __init__(self, address: str = DEFAULT_INFERENCE_ADDRESS, timeout: float = 60.0):
+        self.address = address
+        self.timeout = timeout
+        self._conn: Optional[Connection] = None
+        self._connect_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._waiters: Dict[int, Future] = {}
+        self._ids = itertools.count()
+
+    def _ensure_connected(self) -> Connection:
+        with self._connect_lock:
+            if self._conn is None:
+                self._conn = Client(parse_address(self.address), authkey=get_authkey(self.address))
+                threading.Thread(target=self._reader, args=(self._conn,), daemon=True).start()
+            return self._conn
+
+    def _reader(self, conn: Connection):
+        """Dispatch responses to the callers waiting on them."""
+        try:
+            while True:
+                request_id, ok, payload = conn.recv()
+                waiter = self._waiters.pop(request_id, None)
+                if waiter is None:
+                    continue
+                if ok:
+                    waiter.set_result(payload)
+                else:
+                    waiter.set_exception(RuntimeError(f"PII inference server error: {payload}"))
+        except (EOFError, OSError) as e:
+            with self._connect_lock:
+                if self._conn is conn:
+                    self._conn = None
+            for request_id in list(self._waiters):
+                waiter = self._waiters.pop(request_id, None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_exception(ConnectionError(f"PII inference server disconnected: {str(e)}"))
+
+    def _request(self, op: str, texts: Optional[List[str]]) -> Any:
+        conn = self._ensure_connected()
+        request_id = next(self._ids)
+        waiter: Future = Future()
+        self._waiters[request_id] = waiter
+        try:
+            with self._send_lock:
+                conn.send((op, request_id, texts))
+            return waiter.result(timeout=self.timeout)
+        finally:
+            self._waiters.pop(request_id, None)
+
+    def ping(self) -> Dict[str, Any]:
+        """Return the server's model status."""
+        return self._request("ping", None)
+
+    def predict(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """Run NER on a list of texts; returns one entity list per text."""
+        if not texts:
+            return []
+        return self._request("predict", list(texts))
+
+    def __call__(self, inputs: Union[str, List[str]], **kwargs: Any):
+        if isinstance(inputs, str):
+            return self.predict([inputs])[0]
+        return self.predict(inputs)
+
+
+def main():
+    server = PIIInferenceServer(
+        address=os.getenv("PII_INFERENCE_ADDRESS", DEFAULT_INFERENCE_ADDRESS),
+        max_batch_size=int(os.getenv("PII_BATCH_MAX_SIZE", "16")),
+        max_wait_ms=float(os.getenv("PII_BATCH_MAX_WAIT_MS", "10"))
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("PII inference server stopped.")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
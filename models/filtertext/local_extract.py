@@ -0,0 +1,201 @@
+"""
+Local, deterministic extraction of amounts, percentages and dates.
+
+Compiled patterns pull these out of the PII-cleaned text and normalise them
+(amounts to a number plus currency, dates to ISO 8601), so the LLM does not
+have to spend tokens on them. Used by TranscriptProcessingService in the
+`fill` and `skip_llm` modes of LOCAL_EXTRACTION.
+"""
+
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cascade import split_segments
+
+_CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY", "₹": "INR"}
+_CURRENCY_WORDS = {
+    "dollar": "USD", "dollars": "USD", "usd": "USD", "bucks": "USD",
+    "euro": "EUR", "euros": "EUR", "eur": "EUR",
+    "pound": "GBP", "pounds": "GBP", "gbp": "GBP",
+    "yen": "JPY", "jpy": "JPY", "rupee": "INR", "rupees": "INR", "inr": "INR"
+}
+_MULTIPLIERS = {
+    "k": 1e3, "thousand": 1e3, "m": 1e6, "mm": 1e6, "mn": 1e6, "million": 1e6,
+    "b": 1e9, "bn": 1e9, "billion": 1e9, "t": 1e12, "trillion": 1e12
+}
+_MONTHS = {
+    name: number
+    for number, names in enumerate((
+        ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",),
+        ("june", "jun"), ("july", "jul"), ("august", "aug"), ("september", "sep", "sept"),
+        ("october", "oct"), ("november", "nov"), ("december", "dec")
+    ), start=1)
+    for name in names
+}
+
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+_SCALE = r"(?:\s*(?P<scale>thousand|million|billion|trillion|bn|mm|mn|[kmbt])\b)?"
+_MONTH = r"(?P<month>" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?"
+_DAY = r"(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?P<year>(?:19|20)\d{2})"
+
+_AMOUNT_RE = re.compile(
+    rf"(?P<symbol>[$€£¥₹])\s?(?P<number>{_NUMBER}){_SCALE}"
+    rf"|\b(?P<code>USD|EUR|GBP|JPY|INR)\s?(?P<number2>{_NUMBER}){_SCALE.replace('scale', 'scale2')}"
+    rf"|\b(?P<number3>{_NUMBER}){_SCALE.replace('scale', 'scale3')}\s+(?P<word>dollars?|usd|bucks|euros?|eur|pounds?|gbp|yen|jpy|rupees?|inr)\b",
+    re.IGNORECASE
+)
+_PERCENT_RE = re.compile(rf"\b(?P<number>{_NUMBER})\s?(?:%|percent\b|per\s+cent\b)", re.IGNORECASE)
+_DATE_RES = (
+    # 2024-03-15
+    re.compile(r"\b(?P<year>(?:19|20)\d{2})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b"),
+    # 03/15/2024 (US order, as spoken in these calls)
+    re.compile(r"\b(?P<month>\d{1,2})/(?P<day>\d{1,2})/(?P<year>(?:19|20)?\d{2})\b"),
+    # March 15, 2024 / March 15th / March 2024
+    re.compile(rf"\b{_MONTH}\s+(?:{_DAY}(?:,?\s+{_YEAR})?|{_YEAR.replace('year', 'year2')})\b", re.IGNORECASE),
+    # 15 March 2024 / the 15th of March
+    re.compile(rf"\b{_DAY}\s+(?:of\s+)?{_MONTH}(?:,?\s+{_YEAR})?\b", re.IGNORECASE),
+)
+
+_POSITIVE_WORDS = frozenset(
+    "good great excellent happy pleased glad growth gain gains profit profitable strong up outperform "
+    "benefit positive optimistic confident thanks thank appreciate perfect wonderful".split()
+)
+_NEGATIVE_WORDS = frozenset(
+    "bad poor loss losses lost down decline declined drop dropped weak worried concern concerned risk "
+    "risky negative unhappy disappointed problem issue complaint fraud late penalty debt".split()
+)
+_ACTION_CUE_RE = re.compile(
+    r"\b(?:will|i'll|we'll|need to|needs to|going to|follow up|send|schedule|call back|remind|set up|review)\b",
+    re.IGNORECASE
+)
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def _to_number(raw: str) -> float:
+    return float(raw.replace(",", ""))
+
+
+def _scaled(number: str, scale: Optional[str]) -> float:
+    value = _to_number(number)
+    if scale:
+        value *= _MULTIPLIERS[scale.lower()]
+    # Whole numbers read better as ints in JSON
+    return int(value) if value.is_integer() else round(value, 2)
+
+
+def extract_amounts(text: str) -> List[Dict[str, Any]]:
+    """Currency amounts with their normalised value and ISO currency code."""
+    amounts = []
+    for match in _AMOUNT_RE.finditer(text):
+        groups = match.groupdict()
+        if groups["symbol"]:
+            currency, number, scale = _CURRENCY_SYMBOLS[groups["symbol"]], groups["number"], groups["scale"]
+        elif groups["code"]:
+            currency, number, scale = groups["code"].upper(), groups["number2"], groups["scale2"]
+        else:
+            currency, number, scale = _CURRENCY_WORDS[groups["word"].lower()], groups["number3"], groups["scale3"]
+        amounts.append({
+            "text": match.group().strip(),
+            "value": _scaled(number, scale),
+            "currency": currency,
+            "start": match.start(),
+            "end": match.end()
+        })
+    return amounts
+
+
+def extract_percentages(text: str) -> List[Dict[str, Any]]:
+    return [
+        {"text": m.group(), "value": _scaled(m.group("number"), None), "start": m.start(), "end": m.end()}
+        for m in _PERCENT_RE.finditer(text)
+    ]
+
+
+def _iso_date(groups: Dict[str, Optional[str]]) -> Optional[str]:
+    """ISO date (or year-month) from matched groups; None when the parts are not a real date."""
+    year = groups.get("year") or groups.get("year2")
+    month_raw = groups["month"]
+    # Lowercase "may" is nearly always the verb ("option 1 may be", "it may 2x");
+    # the month is transcribed capitalized, or comes with a year
+    if month_raw.lower() == "may" and month_raw != "May" and not year:
+        return None
+    month = int(month_raw) if month_raw.isdigit() else _MONTHS[month_raw.lower().rstrip(".")]
+    day = groups.get("day")
+    if year and len(year) == 2:
+        year = "20" + year
+    try:
+        if day is None:
+            return f"{int(year):04d}-{month:02d}" if year and 1 <= month <= 12 else None
+        if year is None:
+            # No year spoken: validate against a leap year and report month-day only
+            date(2000, month, int(day))
+            return f"--{month:02d}-{int(day):02d}"
+        return date(int(year), month, int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def extract_dates(text: str) -> List[Dict[str, Any]]:
+    """Dates normalised to ISO 8601 (`YYYY-MM-DD`, `YYYY-MM`, or `--MM-DD` without a year)."""
+    candidates: List[Tuple[int, int, str]] = []
+    for pattern in _DATE_RES:
+        for match in pattern.finditer(text):
+            iso = _iso_date(match.groupdict())
+            if iso:
+                candidates.append((match.start(), match.end(), iso))
+    # Longest first, so "1 May 2024" wins over the "May 2024" inside it
+    found: List[Tuple[int, int, str]] = []
+    for start, end, iso in sorted(candidates, key=lambda c: (c[0] - c[1], c[0])):
+        if not any(start < other_end and other_start < end for other_start, other_end, _ in found):
+            found.append((start, end, iso))
+    return [
+        {"text": text[start:end], "iso": iso, "start": start, "end": end}
+        for start, end, iso in sorted(found)
+    ]
+
+
+def extract_entities(text: str) -> Dict[str, Any]:
+    """`amounts` (currency amounts and percentages) and `dates`, as surface strings plus normalised values."""
+    amounts = extract_amounts(text)
+    percentages = extract_percentages(text)
+    dates = extract_dates(text)
+    mentions = sorted(amounts + percentages, key=lambda item: item["start"])
+    return {
+        "amounts": list(dict.fromkeys(item["text"] for item in mentions)),
+        "dates": list(dict.fromkeys(item["text"] for item in dates)),
+        "normalized": {
+            "amounts": [{k: item[k] for k in ("text", "value", "currency")} for item in amounts],
+            "percentages": [{k: item[k] for k in ("text", "value")} for item in percentages],
+            "dates": [{k: item[k] for k in ("text", "iso")} for item in dates]
+        }
+    }
+
+
+def _sentiment(text: str) -> str:
+    words = _WORD_RE.findall(text.lower())
+    score = sum(w in _POSITIVE_WORDS for w in words) - sum(w in _NEGATIVE_WORDS for w in words)
+    return "positive" if score > 0 else "negative" if score < 0 else "neutral"
+
+
+def local_structured_output(text: str, output_format: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Full structured output without the LLM, for short transcripts: extractive
+    summary, lexicon sentiment, sentences with figures as key points and
+    sentences with commitment cues as action items.
+    """
+    sentences = [text[start:end].strip() for start, end in split_segments(text)]
+    local = extract_entities(text)
+    output: Dict[str, Any] = {
+        field: ([] if isinstance(template, list) else {k: [] for k in template} if isinstance(template, dict) else None)
+        for field, template in output_format.items()
+    }
+    output["summary"] = " ".join(sentences[:2])[:300]
+    output["key_points"] = [s for s in sentences if _AMOUNT_RE.search(s) or _PERCENT_RE.search(s)][:5]
+    output["action_items"] = [s for s in sentences if _ACTION_CUE_RE.search(s)][:5]
+    output["sentiment"] = _sentiment(text)
+    output["entities"]["amounts"] = local["amounts"]
+    output["entities"]["dates"] = local["dates"]
+    output["entities_normalized"] = local["normalized"]
+    return output
@@ -0,0 +1,120 @@
+"""
+Map-reduce structured extraction for very long transcripts.
+
+A two-hour call in one prompt is slow, risks the context limit and gets no
+parallelism. Here the transcript is split at sentence boundaries into
+segments, each segment is extracted concurrently into the normal output
+schema (map), and the partial outputs are merged locally: list fields are
+concatenated and de-duplicated, sentiment is voted. Only the summary needs
+the LLM again, and that reduce call sees the segment summaries, not the
+transcript. Wall-clock time follows the slowest segment.
+"""
+
+import asyncio
+import re
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cascade import split_segments
+
+Extractor = Callable[[str], Awaitable[Dict[str, Any]]]
+
+_NORMALISE_RE = re.compile(r"[^\w$%.]+")
+
+
+def split_for_extraction(text: str, max_chars: int) -> List[Tuple[int, int]]:
+    """Pack sentence-like segments into (start, end) ranges of at most ~max_chars."""
+    ranges: List[Tuple[int, int]] = []
+    for start, end in split_segments(text):
+        # Oversized "sentences" (unpunctuated ASR output) are cut at whitespace
+        while end - start > max_chars:
+            cut = text.rfind(" ", start, start + max_chars)
+            cut = cut if cut > start else start + max_chars
+            ranges.append((start, cut))
+            start = cut
+        if ranges and end - ranges[-1][0] <= max_chars:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def _dedupe_key(item: Any) -> str:
+    return _NORMALISE_RE.sub(" ", str(item).casefold()).strip().rstrip(".")
+
+
+def merge_list(parts: List[Any]) -> List[Any]:
+    """Concatenate in order, dropping items that differ only in case, spacing or punctuation."""
+    seen = set()
+    merged = []
+    for item in parts:
+        key = _dedupe_key(item)
+        if key and key not in seen:
+            seen.add(key)
+            merged.append(item)
+    return merged
+
+
+def merge_outputs(outputs: List[Dict[str, Any]], output_format: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge per-segment outputs into one object shaped like `output_format` (summary left to the caller)."""
+    merged: Dict[str, Any] = {}
+    for field, template in output_format.items():
+        if isinstance(template, list):
+            merged[field] = merge_list([item for out in outputs for item in (out.get(field) or [])])
+        elif isinstance(template, dict):
+            merged[field] = {
+                key: merge_list([item for out in outputs for item in ((out.get(field) or {}).get(key) or [])])
+                for key in template
+            }
+        else:
+            merged[field] = None
+
+    votes = Counter(str(out.get("sentiment", "")).strip().lower() for out in outputs if out.get("sentiment"))
+    ranked = votes.most_common()
+    # A tie between different sentiments means the call moved between them; that is
+    # reported as "neutral" so the merged output stays within the single-call schema
+    tied = len(ranked) > 1 and ranked[0][1] == ranked[1][1]
+    merged["sentiment"] = "neutral" if not ranked or tied else ranked[0][0]
+    return merged
+
+
+async def map_reduce_extract(
+    text: str,
+    extract: Extractor,
+    output_format: Dict[str, Any],
+    segment_chars: int,
+    max_concurrency: int = 4
+) -> Dict[str, Any]:
+    """
+    Extract each segment concurrently with `extract(message)`, merge the results
+    and ask for one combined summary from the segment summaries.
+    """
+    ranges = split_for_extraction(text, segment_chars)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def extract_segment(i: int, start: int, end: int) -> Dict[str, Any]:
+        async with semaphore:
+            return await extract(f"Transcript (part {i + 1} of {len(ranges)}):\n{text[start:end]}")
+
+    outputs = await asyncio.gather(*(extract_segment(i, start, end) for i, (start, end) in enumerate(ranges)))
+    merged = merge_outputs(outputs, output_format)
+
+    summaries = [str(out["summary"]).strip() for out in outputs if out.get("summary")]
+    merged["summary"] = await _reduce_summary(summaries, extract)
+    return merged
+
+
+async def _reduce_summary(summaries: List[str], extract: Extractor) -> Optional[str]:
+    if len(summaries) <= 1:
+        return summaries[0] if summaries else None
+    parts = "\n".join(f"- Part {i + 1}: {summary}" for i, summary in enumerate(summaries))
+    try:
+        reduced = await extract(
+            "Transcript (summaries of consecutive parts of one call; "
+            f"fill in `summary` for the whole call):\n{parts}"
+        )
+        if reduced.get("summary"):
+            return reduced["summary"]
+    except Exception as e:
+        print(f"Summary reduce step failed (joining part summaries): {str(e)}")
+    return " ".join(summaries)
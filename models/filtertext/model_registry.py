@@ -0,0 +1,185 @@
+"""
+Process-wide registry for the local PII NER model.
+
+The ~480MB `obi/deid_roberta_i2b2` weights are loaded once per process
+(normally during application startup) and shared by every request. When
+PII_INFERENCE_ADDRESS is set, the registry connects to the shared inference
+server instead (see inference_server.py) and no weights are loaded locally.
+PII_INFERENCE_BACKEND picks the torch pipeline or a quantized ONNX Runtime
+session of the same model (see backends.py).
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .backends import VALID_BACKENDS, build_pipeline
+
+# Conditional import for transformers
+try:
+    from transformers import AutoTokenizer
+    import torch
+    HAS_TRANSFORMERS = True
+except ImportError:
+    HAS_TRANSFORMERS = False
+
+
+class PIIModelRegistry:
+    """
+    Thread-safe, load-once holder for the PII token-classification pipeline.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "obi/deid_roberta_i2b2",
+        inference_address: Optional[str] = None,
+        backend: str = "torch"
+    ):
+        if backend not in VALID_BACKENDS:
+            raise ValueError(f"Invalid PII inference backend '{backend}', expected one of {VALID_BACKENDS}")
+        self.model_name = model_name
+        self.inference_address = inference_address
+        self.backend = backend
+        self._pipeline: Optional[Any] = None
+        self._tokenizer: Optional[Any] = None
+        self._tokenizer_failed = False
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._load_error: Optional[str] = None
+        self._load_time_s: Optional[float] = None
+        self._memory_bytes: Optional[int] = None
+        self._device: Optional[str] = None
+
+    @property
+    def is_ready(self) -> bool:
+        """True once loading has finished (successfully or with regex fallback)."""
+        return self._loaded
+
+    @property
+    def model_available(self) -> bool:
+        """True unless the NER model is known to be unusable (missing library or failed load)."""
+        if self.inference_address:
+            return not self._loaded or self._pipeline is not None
+        return HAS_TRANSFORMERS and (not self._loaded or self._pipeline is not None)
+
+    @property
+    def version(self) -> str:
+        """Identifies the model output for cache keys."""
+        return f"{self.model_name}@{self.backend}"
+
+    def get_pipeline(self) -> Optional[Any]:
+        """Return the shared pipeline, loading it on first use."""
+        if not self._loaded:
+            self.load()
+        return self._pipeline
+
+    def load(self) -> Optional[Any]:
+        """
+        Load the NER pipeline exactly once.
+        Concurrent callers block on the lock until the first load completes.
+        """
+        if self._loaded:
+            return self._pipeline
+
+        with self._lock:
+            if self._loaded:
+                return self._pipeline
+
+            if self.inference_address:
+                return self._connect_remote()
+
+            if not HAS_TRANSFORMERS:
+                print("Warning: transformers library not installed. Using Regex only.")
+                self._loaded = True
+                return None
+
+            started = time.perf_counter()
+            try:
+                torch_threads = os.getenv("PII_TORCH_THREADS")
+                if torch_threads:
+                    torch.set_num_threads(int(torch_threads))
+                onnx_threads = os.getenv("PII_ONNX_THREADS")
+                print(f"Loading PII model: {self.model_name} ({self.backend} backend)...")
+                self._pipeline, self._memory_bytes, self._device = build_pipeline(
+                    self.backend,
+                    self.model_name,
+                    intra_op_threads=int(onnx_threads) if onnx_threads else None
+                )
+                self._tokenizer = self._pipeline.tokenizer
+                print("PII model loaded successfully.")
+            except Exception as e:
+                self._load_error = str(e)
+                print(f"Warning: Failed to load PII model: {str(e)}. Falling back to regex.")
+
+            self._load_time_s = time.perf_counter() - started
+            self._loaded = True
+            return self._pipeline
+
+    def get_tokenizer(self) -> Optional[Any]:
+        """
+        Fast tokenizer used to split long texts into model-sized windows.
+        In remote mode only the tokenizer (a few MB) is loaded locally.
+        """
+        if self._tokenizer is None and self.inference_address and HAS_TRANSFORMERS and not self._tokenizer_failed:
+            with self._lock:
+                if self._tokenizer is None and not self._tokenizer_failed:
+                    try:
+                        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
+                    except Exception as e:
+                        self._tokenizer_failed = True
+                        print(f"Warning: Failed to load PII tokenizer: {str(e)}. Long texts will not be chunked.")
+        if self._tokenizer is not None and not getattr(self._tokenizer, "is_fast", False):
+            return None
+        return self._tokenizer
+
+    def _connect_remote(self) -> Optional[Any]:
+        """Use the shared inference server; called with the lock held."""
+        from .inference_server import PIIInferenceClient
+
+        started = time.perf_counter()
+        client = PIIInferenceClient(self.inference_address)
+        try:
+            server_status = client.ping()
+            self._memory_bytes = None
+            self._device = f"remote:{self.inference_address} ({server_status.get('device')})"
+            print(f"Connected to PII inference server at {self.inference_address}.")
+        except Exception as e:
+            # Keep the client: it reconnects on the next call once the server is up
+            self._load_error = f"Inference server not reachable yet: {str(e)}"
+            self._device = f"remote:{self.inference_address}"
+            print(f"Warning: {self._load_error}")
+
+        self._pipeline = client
+        self._load_time_s = time.perf_counter() - started
+        self._loaded = True
+        return self._pipeline
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot of the model state for the status endpoint."""
+        return {
+            "model": self.model_name,
+            "backend": "remote" if self.inference_address else self.backend,
+            "ready": self._loaded,
+            "loaded": self._pipeline is not None,
+            "device": self._device,
+            "torch_threads": torch.get_num_threads() if HAS_TRANSFORMERS else None,
+            "load_time_s": round(self._load_time_s, 3) if self._load_time_s is not None else None,
+            "memory_mb": round(self._memory_bytes / (1024 * 1024), 1) if self._memory_bytes else None,
+            "error": self._load_error
+        }
+
+
+# Singleton instance
+_pii_model_registry = None
+
+
+def get_pii_model_registry() -> PIIModelRegistry:
+    """Get or create the process-wide PII model registry."""
+    global _pii_model_registry
+    if _pii_model_registry is None:
+        _pii_model_registry = PIIModelRegistry(
+            inference_address=os.getenv("PII_INFERENCE_ADDRESS"),
+            backend=os.getenv("PII_INFERENCE_BACKEND", "torch")
+        )
+    return _pii_model_registry
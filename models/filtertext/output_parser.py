@@ -0,0 +1,266 @@
+"""
+Parsing and validation of the LLM's structured output.
+
+Replaces "strip the markdown fence and json.loads": the JSON object is located
+in the reply, parsed with orjson when installed, and truncated replies are
+repaired by closing the open string, arrays and objects. The result is then
+checked against a validator compiled once from STRUCTURED_OUTPUT_FORMAT, which
+coerces minor type mismatches. A reply that cannot be parsed, lacks a required
+top-level field or has a value outside an allowed set (sentiment) raises
+OutputParseError, and the service then makes a single targeted re-ask.
+"""
+
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+class OutputParseError(ValueError):
+    """The reply contains no recoverable JSON object, or the object fails validation."""
+
+
+def _loads(payload: str) -> Any:
+    if HAS_ORJSON:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def extract_json_payload(content: str) -> str:
+    """The JSON object in a reply: inside a ```json fence if there is one, from the first `{` on."""
+    fence = content.find("```")
+    if fence != -1:
+        body_start = content.find("\n", fence)
+        body_start = body_start + 1 if body_start != -1 else fence + 3
+        body_end = content.find("```", body_start)
+        content = content[body_start:body_end if body_end != -1 else len(content)]
+    start = content.find("{")
+    if start == -1:
+        raise OutputParseError("no JSON object in reply")
+    end = content.rfind("}")
+    # Keep everything after `{` when the reply was cut off before its closing brace
+    return content[start:] if end < start else content[start:end + 1] + _tail_after(content, end)
+
+
+def _tail_after(content: str, end: int) -> str:
+    """Text after the last `}` matters only if the object is still open there (truncated reply)."""
+    return content[end + 1:].rstrip() if _open_brackets(content[:end + 1]) else ""
+
+
+def _open_brackets(payload: str) -> List[str]:
+    """Closing characters still owed at the end of `payload`, innermost last."""
+    stack: List[str] = []
+    in_string = escaped = False
+    for char in payload:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        stack.append('"')
+    return stack
+
+
+def _last_string_start(payload: str) -> int:
+    """Index of the opening quote of the string literal that ends `payload`."""
+    quote = payload.rfind('"', 0, len(payload) - 1)
+    while quote > 0 and payload[quote - 1] == "\\":
+        quote = payload.rfind('"', 0, quote - 1)
+    return quote
+
+
+def _strip_trailing_commas(payload: str) -> str:
+    """Remove commas directly before a closing bracket (outside strings)."""
+    out: List[str] = []
+    in_string = escaped = False
+    for char in payload:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+        out.append(char)
+    return "".join(out)
+
+
+def repair_json(payload: str) -> str:
+    """Fix the usual LLM JSON breakage: trailing commas and truncation."""
+    return repair_truncated(_strip_trailing_commas(payload))
+
+
+def repair_truncated(payload: str) -> str:
+    """Close an unterminated string, drop a dangling key or comma, and close open arrays/objects."""
+    owed = _open_brackets(payload)
+    if not owed:
+        return payload
+    repaired = payload
+    if owed[-1] == '"':
+        repaired += '"'
+        owed.pop()
+    repaired = repaired.rstrip().rstrip(",").rstrip()
+    # A reply cut after `"key":` or `"key"` inside an object cannot be completed; drop the key
+    if repaired.endswith(":"):
+        repaired = repaired[:-1].rstrip()
+        repaired = repaired[:_last_string_start(repaired)].rstrip().rstrip(",").rstrip()
+    elif repaired.endswith('"') and owed and owed[-1] == "}":
+        before = repaired[:_last_string_start(repaired)].rstrip()
+        if before.endswith(("{", ",")):
+            repaired = before.rstrip(",").rstrip()
+    return repaired + "".join(reversed(owed))
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, list):
+        return "; ".join(_as_text(item) for item in value if item is not None)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else str(value)
+
+
+def _as_text_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [_as_text(item) for item in value if item not in (None, "")]
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return [_as_text(value)]
+
+
+def compile_validator(
+    template: Dict[str, Any],
+    enums: Optional[Dict[str, Sequence[str]]] = None,
+    required: bool = True
+) -> Callable[..., Tuple[Dict[str, Any], List[str], List[str]]]:
+    """
+    Build a validator for objects shaped like `template` (strings, string lists
+    and nested objects). It returns (coerced_object, fixes, errors); unknown
+    keys are kept. Fixes are minor coercions. Errors are a missing field (when
+    `required`; nested fields are filled with blanks instead) or a value of an
+    `enums` field outside its allowed values, compared case-insensitively.
+    """
+    enums = {key: tuple(values) for key, values in (enums or {}).items()}
+    fields: List[Tuple[str, bool, Callable]] = []
+    for key, spec in template.items():
+        if isinstance(spec, dict):
+            fields.append((key, True, compile_validator(spec, required=False)))
+        else:
+            fields.append((key, False, _as_text_list if isinstance(spec, list) else _as_text))
+
+    def validate(obj: Any, path: str = "") -> Tuple[Dict[str, Any], List[str], List[str]]:
+        fixes: List[str] = []
+        errors: List[str] = []
+        if not isinstance(obj, dict):
+            fixes.append(f"{path or 'root'}: expected object")
+            obj = {}
+        result = dict(obj)
+        for key, nested, coerce in fields:
+            value = obj.get(key)
+            if key not in obj:
+                (errors if required else fixes).append(f"{path}{key}: missing")
+            if nested:
+                result[key], nested_fixes, nested_errors = coerce(value if value is not None else {}, f"{path}{key}.")
+                fixes.extend(nested_fixes)
+                errors.extend(nested_errors)
+                continue
+            coerced = coerce(value)
+            if key in obj and coerced != value:
+                fixes.append(f"{path}{key}: coerced {type(value).__name__}")
+            if key in enums and key in obj:
+                normalized = coerced.strip().lower()
+                if normalized not in enums[key]:
+                    errors.append(f"{path}{key}: {coerced!r} is not one of {'/'.join(enums[key])}")
+                elif normalized != coerced:
+                    fixes.append(f"{path}{key}: normalized case")
+                coerced = normalized
+            result[key] = coerced
+        return result, fixes, errors
+
+    return validate
+
+
+class StructuredOutputParser:
+    """Parse, repair and validate replies against one output format; keeps outcome counters."""
+
+    def __init__(self, output_format: Dict[str, Any], enums: Optional[Dict[str, Sequence[str]]] = None):
+        self._validate = compile_validator(output_format, enums)
+        self._lock = threading.Lock()
+        self._counters = {"clean": 0, "repaired": 0, "coerced": 0, "reasked": 0, "failed": 0}
+
+    def record(self, outcome: str):
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def parse(self, content: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return (output, report); raise OutputParseError when no valid object can be recovered."""
+        payload = extract_json_payload(content or "")
+        repaired = False
+        try:
+            parsed = _loads(payload)
+        except ValueError:
+            try:
+                parsed = _loads(repair_json(payload))
+                repaired = True
+            except ValueError as e:
+                raise OutputParseError(f"invalid JSON: {str(e)}")
+        if not isinstance(parsed, dict):
+            raise OutputParseError("reply is not a JSON object")
+
+        output, fixes, errors = self._validate(parsed)
+        if errors:
+            raise OutputParseError("; ".join(errors))
+        self.record("repaired" if repaired else "coerced" if fixes else "clean")
+        return output, {"repaired": repaired, "fixes": fixes}
+
+    def validate(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate an already-built object (e.g. a merged long-document output); no counters."""
+        output, _, errors = self._validate(obj)
+        if errors:
+            raise OutputParseError("; ".join(errors))
+        return output
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "json_library": "orjson" if HAS_ORJSON else "json"}
+
+
+# Singleton instance
+_output_parser = None
+
+
+def get_output_parser(
+    output_format: Dict[str, Any],
+    enums: Optional[Dict[str, Sequence[str]]] = None
+) -> StructuredOutputParser:
+    """Get or create the process-wide parser (the validator is compiled once)."""
+    global _output_parser
+    if _output_parser is None:
+        _output_parser = StructuredOutputParser(output_format, enums)
+    return _output_parser
+
+
+def get_output_parser_stats() -> Dict[str, Any]:
+    return _output_parser.stats() if _output_parser is not None else None
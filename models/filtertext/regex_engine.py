@@ -0,0 +1,162 @@
+"""
+Single-pass regex PII engine.
+
+All patterns are compiled into one named-group alternation and the text is
+scanned once, producing labelled spans. A cheap character-class prefilter
+drops patterns that cannot match (no '@' means no email alternative), so
+adding patterns does not add another full pass over the transcript.
+"""
+
+import os
+import re
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from .spans import PIISpan, apply_redactions
+
+
+@dataclass(frozen=True)
+class PIIPattern:
+    """
+    One redaction rule.
+
+    `prefilter` is a regex (usually a character class) that must occur somewhere
+    in the text for the pattern to be considered at all. If the pattern contains
+    a `(?P<value>...)` group, only that group is redacted (useful when a keyword
+    such as "account number" anchors the match but should stay readable).
+    """
+    label: str
+    pattern: str
+    prefilter: Optional[str] = None
+    ignore_case: bool = False
+    _prefilter_re: Optional[Pattern] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.prefilter:
+            object.__setattr__(self, "_prefilter_re", re.compile(self.prefilter))
+
+    def may_match(self, text: str) -> bool:
+        return self._prefilter_re is None or self._prefilter_re.search(text) is not None
+
+
+DIGIT = r"[0-9]"
+
+# Order matters: when two patterns match at the same position, the earlier one wins.
+DEFAULT_PATTERNS = [
+    # 1. Credit Card Numbers (Visa, MasterCard, Amex, Discover)
+    PIIPattern(
+        "CREDIT_CARD",
+        r'\b(?:4[0-9]{12}(?:[0-9]{3})?|5[1-5][0-9]{14}|3[47][0-9]{13}|3(?:0[0-5]|[68][0-9])[0-9]{11}|6(?:011|5[0-9]{2})[0-9]{12}|(?:2131|1800|35\d{3})\d{11})\b',
+        prefilter=DIGIT
+    ),
+    # 2. International Bank Account Numbers (IBAN) - Generic format
+    PIIPattern("IBAN", r'\b[A-Z]{2}[0-9]{2}[A-Z0-9]{4}[0-9]{7}(?:[A-Z0-9]?){0,16}\b', prefilter=DIGIT),
+    # 3. Emails (Case insensitive)
+    PIIPattern("EMAIL", r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', prefilter="@", ignore_case=True),
+    # 4. US Social Security Numbers (SSN)
+    PIIPattern("SSN", r'\b\d{3}-\d{2}-\d{4}\b', prefilter="-"),
+    # 5. IPv4 Addresses
+    PIIPattern("IP", r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', prefilter=r"\."),
+    # 6. Phone Numbers (US & International formats): +1-555-555-5555, (555) 555-5555, 555.555.5555
+    PIIPattern("PHONE", r'\b(?:\+\d{1,2}\s?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}\b', prefilter=DIGIT),
+]
+
+# Opt-in rules, enabled with PII_REGEX_EXTRA=ACCOUNT_NUMBER,ROUTING_NUMBER
+OPTIONAL_PATTERNS = {
+    "ACCOUNT_NUMBER": PIIPattern(
+        "ACCOUNT_NUMBER",
+        r'\bacc(?:oun)?t(?:\s+(?:number|no\.?|num|#))?(?:\s+is)?[\s:#]*(?P<value>\d[\d -]{4,20}\d)\b',
+        prefilter=DIGIT,
+        ignore_case=True
+    ),
+    "ROUTING_NUMBER": PIIPattern(
+        "ROUTING_NUMBER",
+        r'\b(?:routing|aba|transit)(?:\s+(?:number|no\.?|num|#))?(?:\s+is)?[\s:#]*(?P<value>\d{9})\b',
+        prefilter=DIGIT,
+        ignore_case=True
+    ),
+}
+
+
+class RegexPIIEngine:
+    """Compiles the registered patterns into one scanner and returns labelled spans."""
+
+    def __init__(self, patterns: Optional[List[PIIPattern]] = None):
+        self._patterns: List[PIIPattern] = list(DEFAULT_PATTERNS if patterns is None else patterns)
+        self._compiled: Dict[Tuple[int, ...], Pattern] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def patterns(self) -> List[PIIPattern]:
+        return list(self._patterns)
+
+    @property
+    def version(self) -> str:
+        """Stable fingerprint of the rule set (changes whenever a pattern changes)."""
+        digest = hashlib.sha256()
+        for p in self._patterns:
+            digest.update(f"{p.label}\0{p.pattern}\0{p.ignore_case}\n".encode("utf-8"))
+        return digest.hexdigest()[:12]
+
+    def register(self, pattern: PIIPattern):
+        """Add a rule. It joins the existing single scan instead of adding a pass."""
+        with self._lock:
+            self._patterns.append(pattern)
+            self._compiled.clear()
+
+    def _scanner(self, active: Tuple[int, ...]) -> Pattern:
+        """Combined alternation for the given pattern subset, compiled once and cached."""
+        scanner = self._compiled.get(active)
+        if scanner is None:
+            alternatives = []
+            for i in active:
+                p = self._patterns[i]
+                body = p.pattern.replace("(?P<value>", f"(?P<v{i}>")
+                if p.ignore_case:
+                    body = f"(?i:{body})"
+                alternatives.append(f"(?P<p{i}>{body})")
+            scanner = re.compile("|".join(alternatives))
+            with self._lock:
+                self._compiled[active] = scanner
+        return scanner
+
+    def find_spans(self, text: str) -> List[PIISpan]:
+        """Scan `text` once and return non-overlapping spans in order."""
+        active = tuple(i for i, p in enumerate(self._patterns) if p.may_match(text))
+        if not active:
+            return []
+
+        spans = []
+        for match in self._scanner(active).finditer(text):
+            index = int(match.lastgroup[1:])
+            value_group = f"v{index}"
+            if value_group in match.re.groupindex and match.group(value_group) is not None:
+                start, end = match.span(value_group)
+            else:
+                start, end = match.span()
+            spans.append(PIISpan(start, end, self._patterns[index].label, source="regex"))
+        return spans
+
+    def redact(self, text: str) -> str:
+        """Replace every match with its redaction tag."""
+        return apply_redactions(text, self.find_spans(text))
+
+
+# Singleton instance
+_regex_engine = None
+
+
+def get_regex_engine() -> RegexPIIEngine:
+    """Get or create the regex engine, including any opt-in patterns from PII_REGEX_EXTRA."""
+    global _regex_engine
+    if _regex_engine is None:
+        engine = RegexPIIEngine()
+        for name in filter(None, (n.strip().upper() for n in os.getenv("PII_REGEX_EXTRA", "").split(","))):
+            if name not in OPTIONAL_PATTERNS:
+                print(f"Warning: Unknown PII_REGEX_EXTRA pattern '{name}' ignored.")
+                continue
+            engine.register(OPTIONAL_PATTERNS[name])
+        _regex_engine = engine
+    return _regex_engine
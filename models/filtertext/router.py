@@ -4,16 +4,27 @@ API routes for transcript post-processing.
 
 import os
 import re
+import json
+import time
 import traceback
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # Ensure we import the updated service
-from .service import TranscriptProcessingService
+from .service import PIIModelError, TranscriptProcessingService
+from .model_registry import get_pii_model_registry
+from .executor import ExecutorSaturatedError, get_redaction_executor
+from .spans import apply_redactions
+from .cascade import get_cascade_stats
+from .cache import get_processing_cache
+from .analyzer import get_backboard_analyzer_status
+from .compaction import get_compaction_stats
+from .output_parser import get_output_parser_stats
+from resilience import CircuitOpenError, upstream_status
 
 # Load environment variables
 load_dotenv()
@@ -41,6 +52,18 @@ class TranscriptFileProcessRequest(BaseModel):
     transcript_filename: str
 
 
+class TranscriptBatchProcessRequest(BaseModel):
+    """Request model for processing many transcripts (inline text and/or transcript files)."""
+    transcripts: List[TranscriptProcessRequest] = []
+    transcript_filenames: List[str] = []
+
+
+# Upper bounds for /filtertext/process-batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BACKBOARD_MAX_CONCURRENCY = int(os.getenv("BACKBOARD_MAX_CONCURRENCY", "8"))
+BATCH_PII_SIZE = int(os.getenv("BATCH_PII_SIZE", "16"))
+
+
 def get_processing_service():
     """
     Dependency injection for transcript processing service.
@@ -54,6 +77,33 @@ def get_processing_service():
     return TranscriptProcessingService(backboard_api_key=api_key)
 
 
+def saturated_response(error: ExecutorSaturatedError) -> HTTPException:
+    """503 with Retry-After so clients back off while the redaction queue drains."""
+    return HTTPException(
+        status_code=503,
+        detail=f"Server busy: {str(error)}. Please retry shortly.",
+        headers={"Retry-After": "1"}
+    )
+
+
+def upstream_unavailable_response(error: CircuitOpenError) -> HTTPException:
+    """503 while the Backboard circuit is open, instead of a 500 per request."""
+    return HTTPException(
+        status_code=503,
+        detail=f"{str(error)}. Please retry later.",
+        headers={"Retry-After": str(int(os.getenv("UPSTREAM_BACKBOARD_BREAKER_RESET_S", "30")))}
+    )
+
+
+def pii_model_unavailable_response(error: PIIModelError) -> HTTPException:
+    """503 when NER fails, rather than answering with a regex-only redaction."""
+    return HTTPException(
+        status_code=503,
+        detail=f"{str(error)}. Please retry shortly.",
+        headers={"Retry-After": "5"}
+    )
+
+
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename to prevent path traversal attacks."""
     base_name = Path(filename).name
@@ -61,13 +111,26 @@ def sanitize_filename(filename: str) -> str:
     return sanitized
 
 
-@router.post("/process")
-async def process_transcript_text(
+def resolve_transcript_path(safe_filename: str) -> Optional[Path]:
+    """Find a transcript in TRANSCRIPTIONS_DIR, falling back to the working directory (handy in testing)."""
+    transcript_path = TRANSCRIPTIONS_DIR / safe_filename
+    if transcript_path.exists():
+        return transcript_path
+    local_path = Path(safe_filename)
+    return local_path if local_path.exists() else None
+
+
+def transcript_base_filename(safe_filename: str) -> str:
+    return safe_filename.replace('_transcription.txt', '').replace('.txt', '')
+
+
+async def process_text(
     request: TranscriptProcessRequest,
-    service: TranscriptProcessingService = Depends(get_processing_service)
-):
+    service: TranscriptProcessingService
+) -> Dict[str, Any]:
     """
-    Process transcript text through the complete pipeline.
+    Run the pipeline and build the response payload. Shared by /process and
+    processing jobs; errors are raised as HTTPException.
     """
     try:
         safe_filename = sanitize_filename(request.filename)
@@ -79,18 +142,24 @@ async def process_transcript_text(
             output_dir=PROCESSED_OUTPUTS_DIR
         )
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "message": "Transcript processed successfully",
-                "files": {
-                    "pii_cleaned": result["pii_cleaned_path"],
-                    "structured_output": result["structured_output_path"]
-                },
-                "data": result["structured_output"]
-            }
-        )
+        return {
+            "message": "Transcript processed successfully",
+            "files": {
+                "pii_cleaned": result["pii_cleaned_path"],
+                "structured_output": result["structured_output_path"]
+            },
+            "data": result["structured_output"],
+            "pii_spans": result["pii_spans"],
+            "compaction": result["compaction"],
+            "cache_hit": result["cache_hit"]
+        }
         
+    except ExecutorSaturatedError as e:
+        raise saturated_response(e)
+    except PIIModelError as e:
+        raise pii_model_unavailable_response(e)
+    except CircuitOpenError as e:
+        raise upstream_unavailable_response(e)
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(
@@ -99,6 +168,45 @@ async def process_transcript_text(
         )
 
 
+@router.post("/process")
+async def process_transcript_text(
+    request: TranscriptProcessRequest,
+    service: TranscriptProcessingService = Depends(get_processing_service)
+):
+    """
+    Process transcript text through the complete pipeline.
+    For a job ID instead of holding the connection open, use POST /jobs/filtertext/process.
+    """
+    return JSONResponse(status_code=200, content=await process_text(request, service))
+
+
+@router.post("/redact")
+async def redact_transcript_text(
+    request: TranscriptProcessRequest,
+    service: TranscriptProcessingService = Depends(get_processing_service)
+):
+    """
+    Run PII detection only and return the redacted text with its span list.
+    Spans carry offsets into the submitted text, so callers can audit or re-apply them.
+    """
+    try:
+        pii_spans = await service.detect_pii_async(request.text)
+        return {
+            "pii_cleaned": apply_redactions(request.text, pii_spans),
+            "pii_spans": [span.to_dict() for span in pii_spans]
+        }
+    except ExecutorSaturatedError as e:
+        raise saturated_response(e)
+    except PIIModelError as e:
+        raise pii_model_unavailable_response(e)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred during redaction: {str(e)}"
+        )
+
+
 @router.post("/process-file")
 async def process_transcript_file(
     request: TranscriptFileProcessRequest,
@@ -107,65 +215,175 @@ async def process_transcript_file(
     """
     Process an existing transcript file from the audiotext/transcriptions directory.
     """
+    safe_filename = sanitize_filename(request.transcript_filename)
+    transcript_path = resolve_transcript_path(safe_filename)
+    if transcript_path is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Transcript file not found at: {TRANSCRIPTIONS_DIR / safe_filename}"
+        )
+
     try:
-        safe_filename = sanitize_filename(request.transcript_filename)
-        transcript_path = TRANSCRIPTIONS_DIR / safe_filename
-        
-        if not transcript_path.exists():
-            # Try looking in the local directory if not found in ../audiotext/transcriptions
-            # This is helpful during testing
-            local_path = Path(safe_filename)
-            if local_path.exists():
-                transcript_path = local_path
-            else:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Transcript file not found at: {transcript_path}"
-                )
-        
-        # Read the transcript
         with open(transcript_path, 'r', encoding='utf-8') as f:
             transcript_text = f.read()
-        
-        # Generate base filename
-        base_filename = safe_filename.replace('_transcription.txt', '').replace('.txt', '')
-        
-        # CHANGED: Added 'await' here as well
-        result = await service.process_transcript(
-            transcript_text=transcript_text,
-            base_filename=base_filename,
-            output_dir=PROCESSED_OUTPUTS_DIR
-        )
-        
-        return JSONResponse(
-            status_code=200,
-            content={
-                "message": "File processed successfully",
-                "source": str(transcript_path),
-                "files": {
-                    "pii_cleaned": result["pii_cleaned_path"],
-                    "structured_output": result["structured_output_path"]
-                },
-                "data": result["structured_output"]
-            }
+    except (OSError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=500, detail=f"Could not read transcript file: {str(e)}")
+
+    result = await process_text(
+        TranscriptProcessRequest(text=transcript_text, filename=transcript_base_filename(safe_filename)),
+        service
+    )
+    return JSONResponse(
+        status_code=200,
+        content={**result, "message": "File processed successfully", "source": str(transcript_path)}
+    )
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_processing(service: TranscriptProcessingService, transcript_text: str, base_filename: str) -> StreamingResponse:
+    """
+    SSE response for the streaming endpoints: `pii_cleaned`, then `token` events,
+    then `result` (or `error`, after which the stream ends).
+    """
+    async def events():
+        try:
+            async for event, data in service.stream_transcript(transcript_text, base_filename, PROCESSED_OUTPUTS_DIR):
+                yield sse_event(event, data)
+        except ExecutorSaturatedError as e:
+            yield sse_event("error", {"status_code": 503, "detail": f"Server busy: {str(e)}. Please retry shortly."})
+        except CircuitOpenError as e:
+            yield sse_event("error", {"status_code": 503, "detail": f"{str(e)}. Please retry later."})
+        except PIIModelError as e:
+            yield sse_event("error", {"status_code": 503, "detail": f"{str(e)}. Please retry shortly."})
+        except Exception as e:
+            traceback.print_exc()
+            yield sse_event("error", {"status_code": 500, "detail": f"An error occurred during processing: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/process/stream")
+async def process_transcript_text_stream(
+    request: TranscriptProcessRequest,
+    service: TranscriptProcessingService = Depends(get_processing_service)
+):
+    """
+    Streaming variant of /process over Server-Sent Events.
+    """
+    return stream_processing(service, request.text, sanitize_filename(request.filename))
+
+
+@router.post("/process-file/stream")
+async def process_transcript_file_stream(
+    request: TranscriptFileProcessRequest,
+    service: TranscriptProcessingService = Depends(get_processing_service)
+):
+    """
+    Streaming variant of /process-file over Server-Sent Events.
+    """
+    safe_filename = sanitize_filename(request.transcript_filename)
+    transcript_path = resolve_transcript_path(safe_filename)
+    if transcript_path is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Transcript file not found at: {TRANSCRIPTIONS_DIR / safe_filename}"
         )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        traceback.print_exc()
+    with open(transcript_path, 'r', encoding='utf-8') as f:
+        transcript_text = f.read()
+    return stream_processing(service, transcript_text, transcript_base_filename(safe_filename))
+
+
+@router.post("/process-batch")
+async def process_transcript_batch(
+    request: TranscriptBatchProcessRequest,
+    service: TranscriptProcessingService = Depends(get_processing_service)
+):
+    """
+    Process many transcripts in one request and stream results back as NDJSON,
+    one line per item in completion order (each tagged with its `index`),
+    followed by a summary line. PII detection runs in batches; Backboard calls
+    run concurrently up to BACKBOARD_MAX_CONCURRENCY.
+    """
+    total = len(request.transcripts) + len(request.transcript_filenames)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="No transcripts provided")
+    if total > BATCH_MAX_ITEMS:
         raise HTTPException(
-            status_code=500,
-            detail=f"An error occurred during file processing: {str(e)}"
+            status_code=413,
+            detail=f"Batch too large: {total} items (maximum {BATCH_MAX_ITEMS})"
         )
 
+    # Inline transcripts first, then files; `positions` maps items back to request order
+    items = [(sanitize_filename(t.filename), t.text) for t in request.transcripts]
+    positions = list(range(len(items)))
+    missing = []
+    for position, filename in enumerate(request.transcript_filenames, start=len(items)):
+        safe_filename = sanitize_filename(filename)
+        transcript_path = resolve_transcript_path(safe_filename)
+        if transcript_path is None:
+            missing.append((position, safe_filename))
+            continue
+        with open(transcript_path, 'r', encoding='utf-8') as f:
+            items.append((transcript_base_filename(safe_filename), f.read()))
+        positions.append(position)
+
+    async def stream():
+        started = time.perf_counter()
+        failed = 0
+        for index, safe_filename in missing:
+            failed += 1
+            yield json.dumps({
+                "index": index,
+                "filename": safe_filename,
+                "success": False,
+                "error": "Transcript file not found"
+            }) + "\n"
+
+        async for result in service.process_batch(
+            items,
+            PROCESSED_OUTPUTS_DIR,
+            max_concurrency=BACKBOARD_MAX_CONCURRENCY,
+            pii_batch_size=BATCH_PII_SIZE
+        ):
+            result["index"] = positions[result["index"]]
+            failed += not result["success"]
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+        yield json.dumps({
+            "done": True,
+            "total": total,
+            "succeeded": total - failed,
+            "failed": failed,
+            "elapsed_s": round(time.perf_counter() - started, 3)
+        }) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 
 @router.get("/status")
 async def get_processing_status():
     """Get status of the transcript processing service."""
+    pii_model = get_pii_model_registry().status()
     return {
         "service": "Transcript Post-Processing",
-        "status": "operational",
+        "status": "operational" if pii_model["ready"] else "warming_up",
+        "pii_model": pii_model,
+        "redaction_executor": get_redaction_executor().status(),
+        "pii_cascade": get_cascade_stats().snapshot(),
+        "cache": get_processing_cache().stats() if get_processing_cache() else {"enabled": False},
+        "backboard": get_backboard_analyzer_status(),
+        "compaction": get_compaction_stats().snapshot(),
+        "output_parser": get_output_parser_stats(),
+        "upstreams": upstream_status(),
         "configuration": {
             "backboard_api": bool(os.getenv("BACKBOARD_API_KEY")),
             "output_dir": str(PROCESSED_OUTPUTS_DIR),
@@ -1,18 +1,33 @@
 import os
 import json
 import asyncio
-import re
-from typing import Dict, Any, Optional, List, Union
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from pathlib import Path
-from backboard import BackboardClient
 
-# Conditional import for transformers
-try:
-    from transformers import pipeline
-    import torch
-    HAS_TRANSFORMERS = True
-except ImportError:
-    HAS_TRANSFORMERS = False
+from .model_registry import get_pii_model_registry
+from .executor import get_redaction_executor
+from .chunking import detect_entities_many
+from .cascade import flag_name_regions, get_cascade_stats
+from .regex_engine import get_regex_engine
+from .spans import PIISpan, apply_redactions, merge_spans
+from .cache import get_processing_cache, make_cache_key
+from .analyzer import build_system_prompt, get_backboard_analyzer
+from .long_document import map_reduce_extract
+from .local_extract import extract_entities, local_structured_output
+from .compaction import compact_transcript, get_compaction_stats
+from .output_parser import OutputParseError, get_output_parser
+
+logger = logging.getLogger(__name__)
+
+
+class PIIModelError(RuntimeError):
+    """
+    The NER model (local or on the inference server) failed on a request it should
+    have served. Raised instead of returning the regex-only spans, which would
+    under-redact and then be cached under the model's version.
+    """
 
 
 class TranscriptProcessingService:
@@ -34,192 +49,529 @@ class TranscriptProcessingService:
         "action_items": ["List of action items or next steps"],
         "topics": ["Main topics covered"]
     }
+    # Fields whose value must be one of a fixed set; anything else triggers the re-ask
+    STRUCTURED_OUTPUT_ENUMS = {"sentiment": ("positive", "negative", "neutral")}
     
-    def __init__(self, backboard_api_key: str):
-        """Initialize the client and set model parameters."""
-        self.client = BackboardClient(api_key=backboard_api_key)
+    def __init__(self, backboard_api_key: Optional[str]):
+        """
+        Initialize the client and set model parameters.
+        Without a Backboard key only the PII stage is usable (e.g. for bulk redaction).
+        """
+        # Shared across requests: one client, one long-lived assistant and a pool of threads
+        self.analyzer = (
+            get_backboard_analyzer(backboard_api_key, build_system_prompt(self.STRUCTURED_OUTPUT_FORMAT))
+            if backboard_api_key else None
+        )
+        self.client = self.analyzer.client if self.analyzer else None
         self.provider = "google"
         self.model = "gemini-2.5-pro"
         
         # PII Model: "obi/deid_roberta_i2b2"
         # A 480MB BERT model fine-tuned on the i2b2 dataset (Gold standard for de-identification)
-        self.pii_model_name = "obi/deid_roberta_i2b2"
+        # The weights live in a process-wide registry so they are loaded once, not per request.
+        self._pii_registry = get_pii_model_registry()
+        self.pii_model_name = self._pii_registry.model_name
         self._pii_pipeline: Optional[Any] = None
         self._pii_model_loaded = False
+        # Long transcripts are split into overlapping token windows inferred as one batch
+        self.pii_window_stride = int(os.getenv("PII_WINDOW_STRIDE", "64"))
+        self.pii_batch_size = int(os.getenv("PII_NER_BATCH_SIZE", "8"))
+        # Only segments the cheap capitalisation/gazetteer tier flags are sent to the NER model
+        self.pii_cascade_enabled = os.getenv("PII_CASCADE", "true").lower() in ("1", "true", "yes")
+        # Long-document (map-reduce) extraction for transcripts beyond one comfortable prompt
+        self.long_doc_threshold_chars = int(os.getenv("LONG_DOC_THRESHOLD_CHARS", "24000"))
+        self.long_doc_segment_chars = int(os.getenv("LONG_DOC_SEGMENT_CHARS", "12000"))
+        self.long_doc_max_concurrency = int(os.getenv("LONG_DOC_MAX_CONCURRENCY", "4"))
+        # Local amounts/dates extraction: off | fill (LLM skips those fields) | skip_llm (short transcripts are fully local)
+        self.local_extraction = os.getenv("LOCAL_EXTRACTION", "off").lower()
+        if self.local_extraction not in ("off", "fill", "skip_llm"):
+            raise ValueError(f"Unknown LOCAL_EXTRACTION mode: {self.local_extraction}")
+        self.local_only_max_chars = int(os.getenv("LOCAL_ONLY_MAX_CHARS", "2000"))
+        # Strip fillers, stutters and repeated redaction tags from the text sent to the LLM
+        self.compaction_enabled = os.getenv("TRANSCRIPT_COMPACTION", "true").lower() in ("1", "true", "yes")
+        # Longest broken reply echoed back in the single re-ask
+        self.reask_max_chars = int(os.getenv("LLM_REASK_MAX_CHARS", "16000"))
         
-    async def generate_structured_output(self, pii_cleaned_text: str) -> Dict[str, Any]:
+    async def _extract(self, content: str) -> Dict[str, Any]:
+        """One analyzer call: send `content`, parse the JSON reply."""
+        # The output schema lives in the analyzer's system prompt; a warm call is one add_message
+        response = await self.analyzer.analyze(
+            content,
+            provider=self.provider,
+            model=self.model,
+            stream=False
+        )
+        
+        return await self._parse_reply(response.content)
+
+    async def _parse_reply(self, reply: str) -> Dict[str, Any]:
         """
-        Generate structured output using Gemini-2.5-pro via Backboard SDK.
+        Parse, repair and validate a reply (see output_parser.py). Only an
+        unrecoverable or invalid reply costs another round trip: one targeted
+        re-ask that sends back the broken reply, not the transcript.
         """
-        prompt = f"""Analyze the following transcript and extract structured information in the following JSON format:
+        parser = get_output_parser(self.STRUCTURED_OUTPUT_FORMAT, self.STRUCTURED_OUTPUT_ENUMS)
+        try:
+            return parser.parse(reply)[0]
+        except OutputParseError as e:
+            error = e
+        
+        parser.record("reasked")
+        response = await self.analyzer.analyze(
+            f"Your previous reply could not be used ({str(error)}). Return it as one valid JSON object "
+            f"in the required format and nothing else:\n\n{reply[:self.reask_max_chars]}",
+            provider=self.provider,
+            model=self.model,
+            stream=False
+        )
+        try:
+            return parser.parse(response.content)[0]
+        except OutputParseError:
+            parser.record("failed")
+            raise
 
-{json.dumps(self.STRUCTURED_OUTPUT_FORMAT, indent=2)}
+    def _skips_llm(self, pii_cleaned_text: str) -> bool:
+        """skip_llm mode: short transcripts are answered entirely by the local extractor."""
+        return self.local_extraction == "skip_llm" and len(pii_cleaned_text) <= self.local_only_max_chars
 
-Transcript:
-{pii_cleaned_text}
+    def _transcript_message(self, pii_cleaned_text: str) -> str:
+        """Per-transcript message; when amounts/dates are filled locally the LLM is told to skip them."""
+        if self.local_extraction == "off":
+            return f"Transcript:\n{pii_cleaned_text}"
+        return (
+            "Leave entities.amounts and entities.dates as empty lists; they are extracted separately.\n\n"
+            f"Transcript:\n{pii_cleaned_text}"
+        )
 
-Please provide your response as valid JSON matching the format above."""
+    def _fill_local(self, structured_output: Dict[str, Any], pii_cleaned_text: str) -> Dict[str, Any]:
+        """Overwrite amounts/dates with the local extractor's result (fill and skip_llm modes)."""
+        if self.local_extraction == "off":
+            return structured_output
+        local = extract_entities(pii_cleaned_text)
+        entities = structured_output.setdefault("entities", {})
+        entities["amounts"] = local["amounts"]
+        entities["dates"] = local["dates"]
+        structured_output["entities_normalized"] = local["normalized"]
+        return structured_output
+
+    async def generate_structured_output(self, pii_cleaned_text: str, source_text: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generate structured output using Gemini-2.5-pro via Backboard SDK.
+        Transcripts longer than LONG_DOC_THRESHOLD_CHARS are extracted segment by
+        segment in parallel and merged (see long_document.py).
+        With LOCAL_EXTRACTION=fill amounts and dates come from local patterns;
+        with skip_llm short transcripts never reach the LLM (see local_extract.py).
+        `source_text` is the redacted text before compaction, which local
+        extraction reads so compaction can never change an amount or date.
+        """
+        source_text = source_text if source_text is not None else pii_cleaned_text
+        if self._skips_llm(pii_cleaned_text):
+            return local_structured_output(source_text, self.STRUCTURED_OUTPUT_FORMAT)
+
+        if self.analyzer is None:
+            raise RuntimeError("Backboard SDK Error: BACKBOARD_API_KEY not configured")
 
         try:
-            # 1. Create an assistant 
-            assistant = await self.client.create_assistant(
-                name="Transcript Analyzer",
-                system_prompt="You are an expert financial transcript analyst. Always return valid JSON."
-            )
-            
-            # 2. Create a thread
-            thread = await self.client.create_thread(assistant.assistant_id)
-            
-            # 3. Send message
-            response = await self.client.add_message(
-                thread_id=thread.thread_id,
-                content=prompt,
-                llm_provider=self.provider,
-                model_name=self.model,
-                stream=False
-            )
-            
-            content = response.content
-            
-            # Clean potential markdown
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.replace("```", "").strip()
-            
-            return json.loads(content)
+            if len(pii_cleaned_text) > self.long_doc_threshold_chars:
+                structured_output = await map_reduce_extract(
+                    pii_cleaned_text,
+                    self._extract,
+                    self.STRUCTURED_OUTPUT_FORMAT,
+                    segment_chars=self.long_doc_segment_chars,
+                    max_concurrency=self.long_doc_max_concurrency
+                )
+                structured_output = get_output_parser(
+                    self.STRUCTURED_OUTPUT_FORMAT, self.STRUCTURED_OUTPUT_ENUMS
+                ).validate(structured_output)
+            else:
+                structured_output = await self._extract(self._transcript_message(pii_cleaned_text))
                 
         except Exception as e:
             raise RuntimeError(f"Backboard SDK Error: {str(e)}")
+        return self._fill_local(structured_output, source_text)
 
     def _load_pii_model(self):
-        """Lazy load the lightweight NER model."""
+        """Fetch the shared NER pipeline from the registry (loads it on first use)."""
         if self._pii_model_loaded:
             return
         
-        if not HAS_TRANSFORMERS:
-            print("Warning: transformers library not installed. Using Regex only.")
-            self._pii_model_loaded = True
-            return
-        
-        try:
-            print(f"Loading PII model: {self.pii_model_name}...")
-            # We use 'aggregation_strategy="simple"' to auto-merge "Sam" + "##arth" -> "Samarth"
-            # device=-1 forces CPU (More stable for small models on Mac Air than MPS)
-            self._pii_pipeline = pipeline(
-                "token-classification",
-                model=self.pii_model_name,
-                aggregation_strategy="simple", 
-                device=-1 
-            )
-            print("PII model loaded successfully.")
-        except Exception as e:
-            print(f"Warning: Failed to load PII model: {str(e)}. Falling back to regex.")
-        
+        self._pii_pipeline = self._pii_registry.get_pipeline()
         self._pii_model_loaded = True
     
-    def _remove_pii_with_regex(self, text: str) -> str:
+    @staticmethod
+    def _detect_pii_with_regex(text: str) -> List[PIISpan]:
         """
-        Advanced Regex Redaction for cases the model might miss.
-        Includes patterns for: Credit Cards, SSNs, IPs, IBANs, Emails, Phones.
+        Advanced Regex detection for cases the model might miss.
+        Includes patterns for: Credit Cards, SSNs, IPs, IBANs, Emails, Phones
+        (plus any opt-in patterns), applied in a single scan by the regex engine.
         """
-        # 1. Credit Card Numbers (Visa, MasterCard, Amex, Discover)
-        # Matches 13-19 digits with optional dashes/spaces
-        cc_pattern = r'\b(?:4[0-9]{12}(?:[0-9]{3})?|5[1-5][0-9]{14}|3[47][0-9]{13}|3(?:0[0-5]|[68][0-9])[0-9]{11}|6(?:011|5[0-9]{2})[0-9]{12}|(?:2131|1800|35\d{3})\d{11})\b'
-        text = re.sub(cc_pattern, '[CREDIT_CARD_REDACTED]', text)
-        
-        # 2. International Bank Account Numbers (IBAN) - Generic format
-        iban_pattern = r'\b[A-Z]{2}[0-9]{2}[A-Z0-9]{4}[0-9]{7}([A-Z0-9]?){0,16}\b'
-        text = re.sub(iban_pattern, '[IBAN_REDACTED]', text)
-        
-        # 3. Emails (Case insensitive)
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        text = re.sub(email_pattern, '[EMAIL_REDACTED]', text, flags=re.IGNORECASE)
-        
-        # 4. US Social Security Numbers (SSN)
-        ssn_pattern = r'\b\d{3}-\d{2}-\d{4}\b'
-        text = re.sub(ssn_pattern, '[SSN_REDACTED]', text)
-        
-        # 5. IPv4 Addresses
-        ip_pattern = r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b'
-        text = re.sub(ip_pattern, '[IP_REDACTED]', text)
-        
-        # 6. Phone Numbers (US & International formats)
-        # Matches: +1-555-555-5555, (555) 555-5555, 555.555.5555
-        phone_pattern = r'\b(?:\+\d{1,2}\s?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}\b'
-        text = re.sub(phone_pattern, '[PHONE_REDACTED]', text)
+        return get_regex_engine().find_spans(text)
 
-        return text
+    @staticmethod
+    def _remove_pii_with_regex(text: str) -> str:
+        """Regex-only redaction (used when the NER model is unavailable)."""
+        return apply_redactions(text, TranscriptProcessingService._detect_pii_with_regex(text))
 
-    def remove_pii(self, text: str) -> str:
+    def _select_model_regions(self, text: str) -> Tuple[List[Tuple[int, int]], int, int]:
         """
-        Hybrid PII Removal:
-        1. Runs Regex first (fastest, catches clear patterns like CC numbers).
-        2. Runs NER Model second (catches context-dependent names/orgs).
+        Cascade tier 2: pick the regions worth sending to the NER model.
+        Returns (regions, segment_count, flagged_count).
         """
-        # Step 1: Regex Redaction
-        text = self._remove_pii_with_regex(text)
-        
-        # Step 2: Model Redaction (NER)
+        if not self.pii_cascade_enabled:
+            return ([(0, len(text))] if text.strip() else []), 1, 1
+        return flag_name_regions(text)
+
+    def detect_pii(self, text: str) -> List[PIISpan]:
+        """
+        Tiered PII detection on the original text:
+        1. Regex (fastest, catches clear patterns like CC numbers).
+        2. Capitalisation/gazetteer pass flags segments that may contain names.
+        3. NER Model on the flagged segments only (catches context-dependent names/orgs).
+        Spans are merged (regex wins on overlap) into a sorted, non-overlapping list
+        that callers can audit or re-apply with apply_redactions.
+        """
+        return self.detect_pii_many([text])[0]
+
+    def detect_pii_many(self, texts: List[str]) -> List[List[PIISpan]]:
+        """
+        detect_pii over several texts; the flagged regions of all of them go
+        through the NER model as one batch.
+        Raises PIIModelError when the loaded model fails, so nothing partially
+        redacted is returned, cached or written out; without a model at all the
+        spans are regex-only by design (and cache_key says so).
+        """
+        regex_spans: List[List[PIISpan]] = []
+        regex_times: List[float] = []
+        for text in texts:
+            started = time.perf_counter()
+            regex_spans.append(self._detect_pii_with_regex(text))
+            regex_times.append(time.perf_counter() - started)
+
+        ner_spans: List[List[PIISpan]] = [[] for _ in texts]
+        selections: List[Tuple[List[Tuple[int, int]], int, int]] = [([], 0, 0) for _ in texts]
+        gazetteer_times = [0.0] * len(texts)
+        ner_time = 0.0
         try:
             self._load_pii_model()
-            
             if self._pii_pipeline:
-                # The pipeline returns a list of entities: [{'entity_group': 'PER', 'score': 0.99, 'word': 'Samarth', 'start': 0, 'end': 7}, ...]
-                entities = self._pii_pipeline(text)
-                
-                # We must replace from END to START to keep indices valid
-                # Sort entities by start index descending
-                entities = sorted(entities, key=lambda x: x['start'], reverse=True)
-                
-                # Convert string to list of characters for mutable replacement
-                text_chars = list(text)
-                
-                for entity in entities:
-                    start = entity['start']
-                    end = entity['end']
-                    label = entity['entity_group'] # e.g., PER, LOC, ORG, DATE
-                    
-                    # Create redaction tag
-                    replacement = f"[{label}_REDACTED]"
-                    
-                    # Replace the slice
-                    text_chars[start:end] = list(replacement)
-                
-                text = "".join(text_chars)
-                
+                for i, text in enumerate(texts):
+                    started = time.perf_counter()
+                    selections[i] = self._select_model_regions(text)
+                    gazetteer_times[i] = time.perf_counter() - started
+
+                # Flatten (text index, region) pairs so a single model call covers every text
+                owners = [i for i, (regions, _, _) in enumerate(selections) for _ in regions]
+                flat_regions = [region for regions, _, _ in selections for region in regions]
+                started = time.perf_counter()
+                entities_per_region = detect_entities_many(
+                    self._pii_pipeline,
+                    [texts[i][start:end] for i, (start, end) in zip(owners, flat_regions)],
+                    tokenizer=self._pii_registry.get_tokenizer() if flat_regions else None,
+                    stride=self.pii_window_stride,
+                    batch_size=self.pii_batch_size
+                )
+                ner_time = time.perf_counter() - started
+                for i, (start, _), entities in zip(owners, flat_regions, entities_per_region):
+                    ner_spans[i].extend(PIISpan.from_entity(entity, offset=start) for entity in entities)
         except Exception as e:
-            print(f"Model PII detection failed (using regex-only result): {str(e)}")
-            
-        return text
+            logger.exception("Model PII detection failed for %d text(s)", len(texts))
+            raise PIIModelError(f"PII model unavailable: {str(e)}") from e
 
-    async def process_transcript(
-        self, 
+        total_chars = sum(len(text) for text in texts) or 1
+        stats = get_cascade_stats()
+        for i, text in enumerate(texts):
+            regions, segment_count, flagged_count = selections[i]
+            stats.record(
+                segments=segment_count,
+                segments_escalated=flagged_count,
+                chars=len(text),
+                chars_escalated=sum(end - start for start, end in regions),
+                regex_hits=len(regex_spans[i]),
+                ner_hits=len(ner_spans[i]),
+                regex_time_s=regex_times[i],
+                gazetteer_time_s=gazetteer_times[i],
+                # Batched model time is attributed to texts by length
+                ner_time_s=ner_time * len(text) / total_chars
+            )
+        return [merge_spans(regex_spans[i] + ner_spans[i]) for i in range(len(texts))]
+
+    def remove_pii(self, text: str) -> str:
+        """Redact all detected PII, building the output string in a single pass."""
+        return apply_redactions(text, self.detect_pii(text))
+
+    async def detect_pii_async(self, text: str) -> List[PIISpan]:
+        """
+        Run detect_pii on the redaction executor so the event loop stays responsive.
+        The torch path runs on the thread pool; the regex-only path can use the process pool.
+        Raises ExecutorSaturatedError when the redaction queue is full.
+        """
+        executor = get_redaction_executor()
+        kind = executor.resolve_kind(self._pii_registry.model_available)
+        if kind == "process":
+            return await executor.run(kind, TranscriptProcessingService._detect_pii_with_regex, text)
+        return await executor.run(kind, self.detect_pii, text)
+
+    async def remove_pii_async(self, text: str) -> str:
+        """Async counterpart of remove_pii (see detect_pii_async)."""
+        return apply_redactions(text, await self.detect_pii_async(text))
+
+    def cache_key(self, transcript_text: str) -> str:
+        """Content address of a processing result: input plus everything that shapes the output."""
+        return make_cache_key(
+            text=transcript_text,
+            pii_model=self._pii_registry.version if self._pii_registry.model_available else "regex-only",
+            pii_cascade=self.pii_cascade_enabled,
+            regex_set=get_regex_engine().version,
+            llm_model=f"{self.provider}/{self.model}",
+            output_format=self.STRUCTURED_OUTPUT_FORMAT,
+            long_document=(self.long_doc_threshold_chars, self.long_doc_segment_chars),
+            local_extraction=(self.local_extraction, self.local_only_max_chars),
+            compaction=self.compaction_enabled
+        )
+
+    async def _run_pipeline(
+        self,
         transcript_text: str,
-        base_filename: str,
-        output_dir: Path
+        pii_spans: Optional[List[PIISpan]] = None,
+        llm_semaphore: Optional[asyncio.Semaphore] = None
     ) -> Dict[str, Any]:
-        """Complete async pipeline."""
+        """
+        PII removal followed by structured output generation (the cacheable part).
+        `pii_spans` skips detection when it already ran (batched); `llm_semaphore`
+        bounds concurrent Backboard calls.
+        """
+        # Step 1: Remove PII (Sync CPU task, run off the event loop)
+        if pii_spans is None:
+            pii_spans = await self.detect_pii_async(transcript_text)
+        pii_cleaned_text = apply_redactions(transcript_text, pii_spans)
+        llm_text, compaction = self._compact(pii_cleaned_text)
         
-        # Step 1: Remove PII (Sync CPU task)
-        pii_cleaned_text = self.remove_pii(transcript_text)
+        # Step 2: Generate structured output (Async I/O task)
+        if llm_semaphore is None:
+            structured_output = await self.generate_structured_output(llm_text, pii_cleaned_text)
+        else:
+            async with llm_semaphore:
+                structured_output = await self.generate_structured_output(llm_text, pii_cleaned_text)
         
+        return {
+            "pii_cleaned_text": pii_cleaned_text,
+            "pii_spans": [span.to_dict() for span in pii_spans],
+            "structured_output": structured_output,
+            "compaction": compaction
+        }
+
+    def _compact(self, pii_cleaned_text: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Shrink the text sent to the LLM (fillers, stutters, repeated tags); returns (text, report)."""
+        if not self.compaction_enabled:
+            return pii_cleaned_text, None
+        compacted, report = compact_transcript(pii_cleaned_text)
+        get_compaction_stats().record(report)
+        return compacted, report
+
+    async def _run_cached(self, transcript_text: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        """Serve from the result cache when enabled; returns (result, cache_hit)."""
+        cache = get_processing_cache()
+        if cache is None:
+            return await compute(), False
+        return await cache.get_or_compute(self.cache_key(transcript_text), compute)
+
+    @staticmethod
+    def _save_outputs(result: Dict[str, Any], cache_hit: bool, base_filename: str, output_dir: Path) -> Dict[str, Any]:
+        """Write the cleaned text and structured output files and build the response payload."""
         # Save PII-cleaned text
         pii_cleaned_path = output_dir / f"{base_filename}_pii_cleaned.txt"
         with open(pii_cleaned_path, 'w', encoding='utf-8') as f:
-            f.write(pii_cleaned_text)
+            f.write(result["pii_cleaned_text"])
         
-        # Step 2: Generate structured output (Async I/O task)
-        structured_output = await self.generate_structured_output(pii_cleaned_text)
-        
-        # Step 3: Save structured output
+        # Save structured output
         structured_output_path = output_dir / f"{base_filename}_structured.json"
         with open(structured_output_path, 'w', encoding='utf-8') as f:
-            json.dump(structured_output, f, indent=2, ensure_ascii=False)
+            json.dump(result["structured_output"], f, indent=2, ensure_ascii=False)
         
         return {
             "pii_cleaned_path": str(pii_cleaned_path),
             "structured_output_path": str(structured_output_path),
-            "structured_output": structured_output,
+            "structured_output": result["structured_output"],
+            "pii_spans": result["pii_spans"],
+            "compaction": result.get("compaction"),
+            "cache_hit": cache_hit,
             "success": True
-        }
\ No newline at end of file
+        }
+
+    async def process_transcript(
+        self, 
+        transcript_text: str,
+        base_filename: str,
+        output_dir: Path
+    ) -> Dict[str, Any]:
+        """
+        Complete async pipeline.
+        Results are served from the content-addressed cache when the same transcript
+        was already processed with the same models, and identical concurrent
+        requests share one computation.
+        """
+        result, cache_hit = await self._run_cached(
+            transcript_text,
+            lambda: self._run_pipeline(transcript_text)
+        )
+        return self._save_outputs(result, cache_hit, base_filename, output_dir)
+
+    async def stream_transcript(
+        self,
+        transcript_text: str,
+        base_filename: str,
+        output_dir: Path
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of process_transcript yielding (event, data) pairs:
+        `pii_cleaned` as soon as redaction finishes, `token` for each chunk of the
+        LLM reply, then `result` with the same payload process_transcript returns.
+        Long transcripts (map-reduce) and cache hits skip the token events.
+        The Backboard key is only needed when the LLM step runs (not for cache
+        hits or transcripts answered locally in skip_llm mode).
+        """
+        cache = get_processing_cache()
+        key = self.cache_key(transcript_text)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            yield "pii_cleaned", {"pii_cleaned": cached["pii_cleaned_text"], "pii_spans": cached["pii_spans"]}
+            yield "result", self._save_outputs(cached, True, base_filename, output_dir)
+            return
+
+        pii_spans = await self.detect_pii_async(transcript_text)
+        pii_cleaned_text = apply_redactions(transcript_text, pii_spans)
+        span_dicts = [span.to_dict() for span in pii_spans]
+        yield "pii_cleaned", {"pii_cleaned": pii_cleaned_text, "pii_spans": span_dicts}
+
+        llm_text, compaction = self._compact(pii_cleaned_text)
+        if len(llm_text) > self.long_doc_threshold_chars or self._skips_llm(llm_text):
+            structured_output = await self.generate_structured_output(llm_text, pii_cleaned_text)
+        else:
+            if self.analyzer is None:
+                raise RuntimeError("Backboard SDK Error: BACKBOARD_API_KEY not configured")
+            chunks: List[str] = []
+            try:
+                async for event in self.analyzer.analyze_stream(
+                    self._transcript_message(llm_text),
+                    provider=self.provider,
+                    model=self.model
+                ):
+                    if event.get("type") == "content_streaming" and event.get("content"):
+                        chunks.append(event["content"])
+                        yield "token", {"content": event["content"]}
+            except Exception as e:
+                raise RuntimeError(f"Backboard SDK Error: {str(e)}")
+            structured_output = self._fill_local(await self._parse_reply("".join(chunks)), pii_cleaned_text)
+
+        result = {
+            "pii_cleaned_text": pii_cleaned_text,
+            "pii_spans": span_dicts,
+            "structured_output": structured_output,
+            "compaction": compaction
+        }
+        if cache is not None:
+            cache.put(key, result)
+        yield "result", self._save_outputs(result, False, base_filename, output_dir)
+
+    async def detect_pii_many_async(self, texts: List[str]) -> List[List[PIISpan]]:
+        """Run detect_pii_many as one redaction-executor job (see detect_pii_async)."""
+        executor = get_redaction_executor()
+        kind = executor.resolve_kind(self._pii_registry.model_available)
+        if kind == "process":
+            return await executor.run(kind, _detect_pii_many_with_regex, texts)
+        return await executor.run(kind, self.detect_pii_many, texts)
+
+    async def process_batch(
+        self,
+        items: List[Tuple[str, str]],
+        output_dir: Path,
+        max_concurrency: int = 8,
+        pii_batch_size: int = 16
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process (base_filename, transcript_text) items, yielding one result per item
+        as soon as it finishes (in completion order, tagged with its `index`).
+        Uncached items go through PII detection in batches of `pii_batch_size`;
+        Backboard calls fan out with at most `max_concurrency` in flight, so a slow
+        LLM response only delays its own item.
+        """
+        llm_semaphore = asyncio.Semaphore(max_concurrency)
+        cache = get_processing_cache()
+        finished: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = []
+
+        async def complete(
+            index: int,
+            base_filename: str,
+            text: str,
+            pii_spans: Optional[List[PIISpan]],
+            cached: Optional[Dict[str, Any]] = None
+        ):
+            payload: Dict[str, Any] = {"success": False, "error": "processing was cancelled"}
+            try:
+                if cached is not None:
+                    result, cache_hit = cached, True
+                else:
+                    result, cache_hit = await self._run_cached(
+                        text,
+                        lambda: self._run_pipeline(text, pii_spans, llm_semaphore)
+                    )
+                payload = self._save_outputs(result, cache_hit, base_filename, output_dir)
+            except Exception as e:
+                payload = {"success": False, "error": str(e)}
+            finally:
+                # Unbounded queue: never blocks, so the entry is put even when cancelled
+                finished.put_nowait({"index": index, "filename": base_filename, **payload})
+
+        def fail(index: int, base_filename: str, error: Exception):
+            finished.put_nowait({"index": index, "filename": base_filename, "success": False, "error": str(error)})
+
+        async def schedule():
+            # Indices handed to a task or failed; every other item is failed on the way out,
+            # since the consumer waits for exactly one entry per item
+            dispatched: Set[int] = set()
+            error: Exception = RuntimeError("batch scheduling stopped")
+            try:
+                misses: List[int] = []
+                for index, (base_filename, text) in enumerate(items):
+                    # This lookup is the item's only one, so the hit is counted once
+                    cached = cache.get(self.cache_key(text)) if cache is not None else None
+                    if cached is not None:
+                        tasks.append(asyncio.create_task(complete(index, base_filename, text, None, cached)))
+                        dispatched.add(index)
+                    else:
+                        misses.append(index)
+
+                for offset in range(0, len(misses), pii_batch_size):
+                    chunk = misses[offset:offset + pii_batch_size]
+                    try:
+                        spans_per_text = await self.detect_pii_many_async([items[i][1] for i in chunk])
+                    except Exception as e:
+                        for i in chunk:
+                            fail(i, items[i][0], e)
+                            dispatched.add(i)
+                        continue
+                    for i, pii_spans in zip(chunk, spans_per_text):
+                        tasks.append(asyncio.create_task(complete(i, items[i][0], items[i][1], pii_spans)))
+                        dispatched.add(i)
+            except Exception as e:
+                error = e
+            finally:
+                for index, (base_filename, _) in enumerate(items):
+                    if index not in dispatched:
+                        fail(index, base_filename, error)
+
+        scheduler = asyncio.create_task(schedule())
+        try:
+            for _ in range(len(items)):
+                yield await finished.get()
+            await scheduler
+        finally:
+            # Client went away or we are done: stop anything still running
+            for task in [scheduler, *tasks]:
+                task.cancel()
+
+
+def _detect_pii_many_with_regex(texts: List[str]) -> List[List[PIISpan]]:
+    """Process-pool entry point for batched regex-only detection (must be picklable)."""
+    return [TranscriptProcessingService._detect_pii_with_regex(text) for text in texts]
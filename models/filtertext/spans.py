@@ -0,0 +1,107 @@
+"""
+Span model shared by the PII detectors.
+
+Detectors report what they found as PIISpan objects with character offsets
+into the original text. Spans from all detectors are merged with fixed
+overlap/priority rules and the redacted string is built in a single pass.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+
+@dataclass(frozen=True)
+class PIISpan:
+    """A detected PII region `text[start:end]`."""
+    start: int
+    end: int
+    label: str               # e.g. EMAIL, CREDIT_CARD, PER, ORG
+    source: str = "regex"    # which detector produced it
+    score: float = 1.0
+
+    @property
+    def tag(self) -> str:
+        """Replacement written into the redacted text."""
+        return f"[{self.label}_REDACTED]"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PIISpan":
+        return cls(
+            start=int(data["start"]),
+            end=int(data["end"]),
+            label=data["label"],
+            source=data.get("source", "regex"),
+            score=float(data.get("score", 1.0))
+        )
+
+    @classmethod
+    def from_entity(cls, entity: Dict[str, Any], offset: int = 0) -> "PIISpan":
+        """Convert a Hugging Face token-classification entity."""
+        return cls(
+            start=offset + int(entity["start"]),
+            end=offset + int(entity["end"]),
+            label=entity["entity_group"],
+            source="ner",
+            score=float(entity["score"])
+        )
+
+
+# Higher wins when spans overlap. Regex hits are exact structured identifiers
+# (card numbers, emails), so they take precedence over model guesses.
+SOURCE_PRIORITY = {"regex": 2, "ner": 1}
+
+
+def _rank(span: PIISpan, priority: Dict[str, int]):
+    return (priority.get(span.source, 0), span.end - span.start, span.score)
+
+
+def merge_spans(spans: Iterable[PIISpan], priority: Optional[Dict[str, int]] = None) -> List[PIISpan]:
+    """
+    Combine spans from any number of detectors into a sorted, non-overlapping list.
+
+    Rules:
+    - Overlapping spans collapse into one span covering their union, so no
+      detected character is ever left unredacted.
+    - The merged span takes its label, source and score from the winning span:
+      highest source priority, then the longest span, then the highest score.
+    - Spans that merely touch (end == start) stay separate.
+    """
+    priority = priority or SOURCE_PRIORITY
+    merged: List[PIISpan] = []
+    winner: Optional[PIISpan] = None
+    for span in sorted(spans, key=lambda s: (s.start, -s.end)):
+        if span.end <= span.start:
+            continue
+        current = merged[-1] if merged else None
+        if current is not None and span.start < current.end:
+            if _rank(span, priority) > _rank(winner, priority):
+                winner = span
+            merged[-1] = PIISpan(
+                current.start,
+                max(current.end, span.end),
+                winner.label,
+                source=winner.source,
+                score=winner.score
+            )
+            continue
+        merged.append(span)
+        winner = span
+    return merged
+
+
+def apply_redactions(text: str, spans: Iterable[PIISpan]) -> str:
+    """
+    Replace each span with its tag in one linear pass.
+    Spans must be sorted by start and must not overlap.
+    """
+    parts: List[str] = []
+    cursor = 0
+    for span in spans:
+        parts.append(text[cursor:span.start])
+        parts.append(span.tag)
+        cursor = span.end
+    parts.append(text[cursor:])
+    return "".join(parts)
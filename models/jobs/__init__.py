@@ -0,0 +1 @@
+# Background job queue (SQLite-backed) for transcription and processing
@@ -0,0 +1,144 @@
+"""
+API routes for background jobs.
+
+POST /jobs/transcribe and POST /jobs/filtertext/process take the same input
+as /transcribe and /filtertext/process but answer 202 with a job ID right
+away; GET /jobs/{job_id} reports the job and, once it has succeeded, the same
+payload the synchronous endpoint would have returned.
+"""
+
+import os
+import uuid
+import shutil
+import asyncio
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse
+
+from audiotext.router import get_transcription_service, sanitize_filename, transcribe_upload, validate_audio_filename
+from audiotext.service import AudioTranscriptionService, upload_size
+from filtertext.router import TranscriptProcessRequest, get_processing_service, process_text
+from filtertext.service import TranscriptProcessingService
+from .service import JobError, JobHandler, get_job_queue, job_view
+
+# Initialize router
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# Upper bound for ?wait= on GET /jobs/{job_id}
+JOBS_MAX_WAIT_S = float(os.getenv("JOBS_MAX_WAIT_S", "60"))
+
+
+def job_handler(run: Callable[[Dict[str, Any]], Any]) -> JobHandler:
+    """Turn the HTTPExceptions raised by the shared endpoint code into JobErrors (503s are retried)."""
+    async def handler(payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await run(payload)
+        except HTTPException as e:
+            retry_after = (e.headers or {}).get("Retry-After") if e.status_code == 503 else None
+            raise JobError(e.status_code, e.detail, float(retry_after) if retry_after is not None else None)
+    return handler
+
+
+async def _run_transcription(payload: Dict[str, Any]) -> Dict[str, Any]:
+    service = get_transcription_service()
+    with open(payload["path"], "rb") as audio_file:
+        return await transcribe_upload(audio_file, payload["filename"], payload["long_audio"], service)
+
+
+async def _run_processing(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await process_text(TranscriptProcessRequest(**payload), get_processing_service())
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    "transcribe": job_handler(_run_transcription),
+    "process_transcript": job_handler(_run_processing)
+}
+
+
+def accepted_response(job: Dict[str, Any]) -> JSONResponse:
+    """202 with the job and where to poll it."""
+    status_url = f"{router.prefix}/{job['id']}"
+    return JSONResponse(
+        status_code=202,
+        content={**job_view(job), "status_url": status_url},
+        headers={"Location": status_url}
+    )
+
+
+def _save_upload(file: UploadFile, job_dir: Path, filename: str) -> Path:
+    job_dir.mkdir(parents=True, exist_ok=True)
+    path = job_dir / filename
+    file.file.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(file.file, f, 1024 * 1024)
+    return path
+
+
+@router.post("/transcribe")
+async def enqueue_transcription(
+    file: UploadFile = File(...),
+    long_audio: Optional[bool] = Query(None, description="Split into windows and transcribe them concurrently (default: by size)"),
+    service: AudioTranscriptionService = Depends(get_transcription_service)
+):
+    """
+    Queue an audio file for transcription and return a job ID immediately.
+    Poll GET /jobs/{job_id} (optionally with ?wait=) for the result.
+    """
+    validate_audio_filename(file.filename)
+    size_limit = max(service.max_upload_bytes, service.long_audio_max_bytes)
+    if upload_size(file.file) > size_limit:
+        raise HTTPException(status_code=413, detail=f"Audio file too large: limit is {size_limit} bytes")
+
+    queue = get_job_queue()
+    job_id = uuid.uuid4().hex
+    # The upload is kept on disk with the job, so a queued job survives a restart
+    path = await asyncio.to_thread(_save_upload, file, queue.job_dir(job_id), sanitize_filename(file.filename))
+    job = await queue.enqueue(
+        "transcribe",
+        {"path": str(path), "filename": file.filename, "long_audio": long_audio},
+        job_id=job_id
+    )
+    return accepted_response(job)
+
+
+@router.post("/filtertext/process")
+async def enqueue_processing(
+    request: TranscriptProcessRequest,
+    service: TranscriptProcessingService = Depends(get_processing_service)
+):
+    """
+    Queue transcript text for PII filtering and structured output and return a
+    job ID immediately. Poll GET /jobs/{job_id} (optionally with ?wait=) for the result.
+    """
+    job = await get_job_queue().enqueue(
+        "process_transcript",
+        {"text": request.text, "filename": request.filename}
+    )
+    return accepted_response(job)
+
+
+@router.get("/status")
+async def jobs_status():
+    """Worker pool settings and job counts by state."""
+    return await asyncio.to_thread(get_job_queue().status)
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for the job to finish (long-poll)")
+):
+    """
+    Job state, with `result` once it succeeded or `error` ({status_code, detail})
+    once it failed. With ?wait=N the request is held until the job finishes or
+    N seconds (at most JOBS_MAX_WAIT_S) pass.
+    """
+    queue = get_job_queue()
+    if wait > 0:
+        job = await queue.wait(job_id, min(wait, JOBS_MAX_WAIT_S))
+    else:
+        job = await queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
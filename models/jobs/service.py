@@ -0,0 +1,258 @@
+"""
+Background job queue for transcription and transcript processing.
+
+POST endpoints under /jobs store a job and return its ID at once; a pool of
+JOBS_WORKERS asyncio workers claims queued jobs from the SQLite table and runs
+the handler registered for the job's kind. Clients poll GET /jobs/{id} or
+long-poll it with ?wait=, which returns as soon as the job finishes.
+
+Running jobs are leased to this process (JOBS_LEASE_S) and the lease is renewed
+every third of that; jobs whose owner stopped renewing are requeued, so a job
+is never picked up twice while its worker is alive.
+
+A handler raises JobError to fail a job with an HTTP-style status and detail;
+errors that carry retry_after_s (server busy, circuit open) put the job back in
+the queue until JOBS_MAX_ATTEMPTS is reached. Uploaded files live in a per-job
+directory under JOBS_DIR that is removed once the job finishes.
+"""
+
+import os
+import time
+import shutil
+import asyncio
+import traceback
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .store import FINISHED_STATES, JobStore
+
+DEFAULT_JOBS_DIR = Path(__file__).parent / "data"
+DEFAULT_DB_PATH = Path(__file__).parent / "jobs.db"
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobError(Exception):
+    """A job failure to report to the client; retried later when retry_after_s is set."""
+
+    def __init__(self, status_code: int, detail: Any, retry_after_s: Optional[float] = None):
+        super().__init__(str(detail))
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after_s = retry_after_s
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"status_code": self.status_code, "detail": self.detail}
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat() if timestamp else None
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public representation of a job row (payload, e.g. server file paths, is left out)."""
+    view = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": _iso(job["created_at"]),
+        "started_at": _iso(job["started_at"]),
+        "finished_at": _iso(job["finished_at"])
+    }
+    if job["result"] is not None:
+        view["result"] = job["result"]
+    if job["error"] is not None:
+        view["error"] = job["error"]
+    return view
+
+
+class _Waiters:
+    """Long-poll requests waiting for one job."""
+
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.count = 0
+
+
+class JobQueue:
+    """Worker pool over a JobStore."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        jobs_dir: Path = DEFAULT_JOBS_DIR,
+        workers: int = 4,
+        max_attempts: int = 3,
+        retention_s: float = 7 * 24 * 3600,
+        poll_interval_s: float = 1.0
+    ):
+        self.store = store
+        self.jobs_dir = jobs_dir
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retention_s = retention_s
+        self.poll_interval_s = poll_interval_s
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        # One permit per enqueued job wakes an idle worker; the poll interval
+        # covers retries whose delay has passed
+        self._wakeup: Optional[asyncio.Semaphore] = None
+        # Long-poll waiters per job: the event set when the job finishes and how
+        # many requests wait on it; removed when the last one leaves
+        self._waiters: Dict[str, _Waiters] = {}
+        self._counters = {"enqueued": 0, "succeeded": 0, "failed": 0, "retried": 0, "recovered": 0}
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.jobs_dir / job_id
+
+    async def start(self, handlers: Dict[str, JobHandler]):
+        """Register handlers, requeue jobs interrupted by a restart and start the workers."""
+        self._handlers = dict(handlers)
+        self._wakeup = asyncio.Semaphore(0)
+        for job_id in await asyncio.to_thread(self.store.purge, self.retention_s):
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        await self._recover()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._lease_loop()))
+
+    async def stop(self):
+        """Cancel the workers; jobs they were running go back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> Dict[str, Any]:
+        job = await asyncio.to_thread(self.store.create, kind, payload, job_id)
+        self._counters["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.release()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def wait(self, job_id: str, timeout_s: float) -> Optional[Dict[str, Any]]:
+        """The job once it has finished, or as it is after `timeout_s`; None for an unknown job."""
+        deadline = time.monotonic() + timeout_s
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES or timeout_s <= 0:
+            return job
+
+        waiters = self._waiters.get(job_id)
+        if waiters is None:
+            waiters = self._waiters[job_id] = _Waiters()
+        waiters.count += 1
+        try:
+            while True:
+                # Registered before reading, so a finish in between is not missed
+                job = await self.get(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job["status"] in FINISHED_STATES or remaining <= 0:
+                    return job
+                try:
+                    # Bounded by the poll interval: another process may finish the job
+                    await asyncio.wait_for(waiters.event.wait(), min(remaining, self.poll_interval_s))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._leave(job_id, waiters)
+
+    def _leave(self, job_id: str, waiters: _Waiters):
+        waiters.count -= 1
+        if waiters.count <= 0 and self._waiters.get(job_id) is waiters:
+            del self._waiters[job_id]
+
+    async def _recover(self):
+        recovered = await asyncio.to_thread(self.store.recover)
+        self._counters["recovered"] += recovered
+        if recovered:
+            print(f"Jobs: requeued {recovered} job(s) whose worker stopped renewing its lease")
+            for _ in range(recovered):
+                self._wakeup.release()
+
+    async def _lease_loop(self):
+        """Renew the leases on our running jobs and requeue jobs whose lease expired elsewhere."""
+        while True:
+            await asyncio.sleep(self.store.lease_s / 3)
+            try:
+                await asyncio.to_thread(self.store.heartbeat)
+                await self._recover()
+            except Exception as e:
+                print(f"Jobs: lease renewal failed: {str(e)}")
+
+    async def _worker(self):
+        while True:
+            job = await asyncio.to_thread(self.store.claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.acquire(), self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        try:
+            handler = self._handlers.get(job["kind"])
+            if handler is None:
+                raise JobError(500, f"No handler for job kind: {job['kind']}")
+            result = await handler(job["payload"])
+            if not await asyncio.to_thread(self.store.finish, job_id, result):
+                print(f"Jobs: lease on {job_id} was lost before it finished; result dropped")
+                return
+            self._counters["succeeded"] += 1
+        except asyncio.CancelledError:
+            # Shutting down: leave the job for the next process
+            self.store.requeue(job_id)
+            raise
+        except JobError as e:
+            if e.retry_after_s is not None and job["attempts"] < self.max_attempts:
+                await asyncio.to_thread(self.store.requeue, job_id, e.retry_after_s, e.to_dict())
+                self._counters["retried"] += 1
+                return
+            await asyncio.to_thread(self.store.finish, job_id, None, e.to_dict())
+            self._counters["failed"] += 1
+        except Exception as e:
+            traceback.print_exc()
+            await asyncio.to_thread(self.store.finish, job_id, None, {"status_code": 500, "detail": str(e)})
+            self._counters["failed"] += 1
+
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        waiters = self._waiters.pop(job_id, None)
+        if waiters is not None:
+            waiters.event.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "max_attempts": self.max_attempts,
+            "jobs": self.store.counts(),
+            **self._counters
+        }
+
+
+# Singleton instance
+_job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get or create the process-wide job queue."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            store=JobStore(
+                Path(os.getenv("JOBS_DB_PATH", str(DEFAULT_DB_PATH))),
+                lease_s=float(os.getenv("JOBS_LEASE_S", "60"))
+            ),
+            jobs_dir=Path(os.getenv("JOBS_DIR", str(DEFAULT_JOBS_DIR))),
+            workers=int(os.getenv("JOBS_WORKERS", "4")),
+            max_attempts=int(os.getenv("JOBS_MAX_ATTEMPTS", "3")),
+            retention_s=float(os.getenv("JOBS_RETENTION_S", str(7 * 24 * 3600)))
+        )
+    return _job_queue
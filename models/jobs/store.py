@@ -0,0 +1,201 @@
+"""
+SQLite-backed job table.
+
+One row per job with its kind, JSON payload, state and result. The file lives
+on local disk, so queued jobs and finished results survive a restart. Several
+processes (uvicorn workers) can share the file: a job is claimed with a single
+conditional UPDATE, and the claiming process holds a lease on it that it
+renews with heartbeat(). recover() only requeues running jobs whose lease has
+expired, i.e. whose owner stopped or crashed. Within a process all access goes
+through one connection guarded by a lock; callers on the event loop run these
+methods in a worker thread.
+
+A payload is only kept while the job may still run: finish() replaces it with
+an empty object, so finished rows (kept until purge) do not hold the submitted
+transcript.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    run_after REAL NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_expires REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, run_after, created_at);
+"""
+
+# Columns added after the first release, for databases created before them
+_MIGRATIONS = {
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "lease_expires": "ALTER TABLE jobs ADD COLUMN lease_expires REAL NOT NULL DEFAULT 0"
+}
+
+
+class JobStore:
+    """Job rows in a local SQLite database."""
+
+    def __init__(self, db_path: Path, lease_s: float = 60.0, owner: Optional[str] = None):
+        self.db_path = db_path
+        self.lease_s = lease_s
+        # Unique per store instance, so a restarted process never inherits leases
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, statement in _MIGRATIONS.items():
+            if column not in columns:
+                self._conn.execute(statement)
+        # Rows finished before payloads were cleared on finish
+        self._conn.execute(
+            "UPDATE jobs SET payload = '{}' WHERE status IN (?, ?) AND payload != '{}'", FINISHED_STATES
+        )
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        for key in ("result", "error"):
+            if job[key] is not None:
+                job[key] = json.loads(job[key])
+        return job
+
+    def create(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> Dict[str, Any]:
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), time.time())
+            )
+            return self._to_dict(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._to_dict(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Move the oldest runnable queued job to running under this store's lease
+        and return it. The UPDATE only matches while the row is still queued, so
+        when another process claims the same row first, the next one is tried.
+        """
+        with self._lock:
+            while True:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? AND run_after <= ? ORDER BY created_at LIMIT 1",
+                    (QUEUED, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                claimed = self._conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, started_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ? AND status = ?",
+                    (RUNNING, self.owner, now + self.lease_s, now, row["id"], QUEUED)
+                ).rowcount
+                if claimed:
+                    return self._to_dict(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+    def heartbeat(self) -> int:
+        """Extend the lease on every job this store is running; returns how many."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE status = ? AND owner = ?",
+                (time.time() + self.lease_s, RUNNING, self.owner)
+            ).rowcount
+
+    def finish(
+        self,
+        job_id: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Record the outcome: succeeded with `result`, or failed with `error`, and
+        drop the payload, which is not needed once the job will not run again.
+        False when the lease was lost (the job was recovered and may run elsewhere).
+        """
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, owner = NULL, payload = '{}' "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (
+                    FAILED if error is not None else SUCCEEDED,
+                    json.dumps(result) if result is not None else None,
+                    json.dumps(error) if error is not None else None,
+                    time.time(),
+                    job_id,
+                    RUNNING,
+                    self.owner
+                )
+            ).rowcount > 0
+
+    def requeue(self, job_id: str, delay_s: float = 0.0, error: Optional[Dict[str, Any]] = None) -> bool:
+        """Put a job this store is running back in the queue, not to run before `delay_s` from now."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, run_after = ?, owner = NULL, lease_expires = 0 "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (QUEUED, json.dumps(error) if error is not None else None, time.time() + delay_s,
+                 job_id, RUNNING, self.owner)
+            ).rowcount > 0
+
+    def recover(self) -> int:
+        """Requeue running jobs whose lease expired (their process died); returns how many."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_expires = 0 WHERE status = ? AND lease_expires < ?",
+                (QUEUED, RUNNING, time.time())
+            ).rowcount
+
+    def purge(self, older_than_s: float) -> List[str]:
+        """Delete finished jobs older than `older_than_s`; returns their ids."""
+        cutoff = time.time() - older_than_s
+        with self._lock:
+            ids = [row["id"] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (*FINISHED_STATES, cutoff)
+            )]
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in ids])
+            return ids
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+            for row in self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+                counts[row["status"]] = row["n"]
+            return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Checks for transcript compaction (filtertext/compaction.py).
+
+Run with: python -m pytest test_compaction.py
+"""
+
+import asyncio
+
+from filtertext.compaction import compact_transcript
+
+
+def compact(text: str) -> str:
+    return compact_transcript(text)[0]
+
+
+def test_spoken_numbers_are_kept():
+    assert compact("twenty twenty five dollars in twenty twenty") == "twenty twenty five dollars in twenty twenty"
+    assert compact("my pin is four four one one") == "my pin is four four one one"
+    assert compact("one one nine nine") == "one one nine nine"
+
+
+def test_filler_stutters_are_collapsed():
+    assert compact("I I I think um we should, like like, wait") == "I think we should, like, wait"
+    assert compact("so so the the payment") == "so the payment"
+
+
+def test_grammatical_doubles_and_phrases_are_kept():
+    assert compact("he had had enough") == "he had had enough"
+    assert compact("I know that that works") == "I know that that works"
+    assert compact("pay back pay back") == "pay back pay back"
+
+
+def test_repeated_redaction_tags_are_collapsed():
+    assert compact("[PER_REDACTED] [PER_REDACTED], [PER_REDACTED] called") == "[PER_REDACTED] called"
+
+
+def test_finance_and_unit_tokens_are_kept():
+    assert compact("the facility is $5 MM, um, drawn") == "the facility is $5 MM, drawn"
+    assert compact("ERM and HMM sign off, UM") == "ERM and HMM sign off, UM"
+    assert compact("a 10 mm bolt, hmm, fine") == "a 10 mm bolt, fine"
+
+
+def test_local_extraction_reads_the_uncompacted_text():
+    from filtertext.service import TranscriptProcessingService
+
+    service = TranscriptProcessingService(backboard_api_key=None)
+    service.local_extraction = "skip_llm"
+    text = "We will draw $5 mm next week."
+    # Whatever the LLM-bound text lost, amounts come from the text before compaction
+    output = asyncio.run(service.generate_structured_output("We will draw $5 next week.", text))
+    assert output["entities_normalized"]["amounts"][0]["value"] == 5_000_000
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
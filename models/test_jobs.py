@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Checks for the SQLite job table (jobs/store.py).
+
+Run with: python -m pytest test_jobs.py
+"""
+
+import json
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from jobs.store import FAILED, SUCCEEDED, JobStore
+
+TRANSCRIPT = "Call Jane Doe on 555-0100 about the loan."
+
+
+def stored_payload(db_path: Path, job_id: str) -> str:
+    with sqlite3.connect(str(db_path)) as conn:
+        return conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+
+def test_finished_job_no_longer_holds_the_transcript():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "jobs.db"
+        store = JobStore(db_path)
+        job = store.create("process_transcript", {"text": TRANSCRIPT, "filename": "call"})
+        assert TRANSCRIPT in stored_payload(db_path, job["id"])
+
+        assert store.claim()["payload"]["text"] == TRANSCRIPT
+        assert store.finish(job["id"], {"data": {"summary": "ok"}})
+        finished = store.get(job["id"])
+        assert finished["status"] == SUCCEEDED
+        assert finished["result"] == {"data": {"summary": "ok"}}
+        assert TRANSCRIPT not in stored_payload(db_path, job["id"])
+        store.close()
+
+
+def test_failed_job_no_longer_holds_the_transcript():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "jobs.db"
+        store = JobStore(db_path)
+        job = store.create("process_transcript", {"text": TRANSCRIPT, "filename": "call"})
+        store.claim()
+        assert store.finish(job["id"], None, {"status_code": 503, "detail": "busy"})
+        assert store.get(job["id"])["status"] == FAILED
+        assert TRANSCRIPT not in stored_payload(db_path, job["id"])
+        store.close()
+
+
+def test_rows_finished_earlier_are_cleared_on_open():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "jobs.db"
+        store = JobStore(db_path)
+        job = store.create("process_transcript", {"text": TRANSCRIPT, "filename": "call"})
+        store.close()
+        # A row finished by an older version, which kept the payload
+        with sqlite3.connect(str(db_path)) as conn:
+            conn.execute("UPDATE jobs SET status = ?, result = ?, finished_at = 1 WHERE id = ?",
+                         (SUCCEEDED, json.dumps({}), job["id"]))
+
+        JobStore(db_path).close()
+        assert TRANSCRIPT not in stored_payload(db_path, job["id"])
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
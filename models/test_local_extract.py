@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Checks for local amount and date extraction (filtertext/local_extract.py).
+
+Run with: python -m pytest test_local_extract.py
+"""
+
+from filtertext.local_extract import extract_dates
+
+
+def isos(text: str) -> list:
+    return [item["iso"] for item in extract_dates(text)]
+
+
+def test_month_dates_are_extracted():
+    assert isos("the payment is due May 5th") == ["--05-05"]
+    assert isos("we spoke on 1 May 2024") == ["2024-05-01"]
+    assert isos("by March 15, 2024 at the latest") == ["2024-03-15"]
+    assert isos("statement from may 2024") == ["2024-05"]
+
+
+def test_modal_may_is_not_a_date():
+    assert isos("option 1 may be cheaper") == []
+    assert isos("we have 2 may need a refund") == []
+    assert isos("the rate may 3 times") == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
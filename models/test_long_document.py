@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Checks for map-reduce extraction of long transcripts (filtertext/long_document.py).
+
+Run with: python -m pytest test_long_document.py
+"""
+
+import asyncio
+
+from filtertext.long_document import merge_outputs
+from filtertext.output_parser import OutputParseError, get_output_parser
+from filtertext.service import TranscriptProcessingService
+
+OUTPUT_FORMAT = TranscriptProcessingService.STRUCTURED_OUTPUT_FORMAT
+ALLOWED_SENTIMENTS = TranscriptProcessingService.STRUCTURED_OUTPUT_ENUMS["sentiment"]
+
+
+def test_sentiment_tie_stays_within_the_schema():
+    merged = merge_outputs([{"sentiment": "positive"}, {"sentiment": "Negative"}], OUTPUT_FORMAT)
+    assert merged["sentiment"] == "neutral"
+    assert merge_outputs([], OUTPUT_FORMAT)["sentiment"] == "neutral"
+
+
+def test_sentiment_majority_wins():
+    outputs = [{"sentiment": "negative"}, {"sentiment": "positive"}, {"sentiment": "negative"}]
+    assert merge_outputs(outputs, OUTPUT_FORMAT)["sentiment"] == "negative"
+
+
+def test_merged_long_document_output_is_validated():
+    service = TranscriptProcessingService(backboard_api_key=None)
+    service.local_extraction = "off"
+    service.long_doc_threshold_chars = 50
+    service.long_doc_segment_chars = 40
+    service.analyzer = object()
+    sentiments = iter(["positive", "negative", "positive", "negative"])
+
+    async def extract(message):
+        return {
+            "summary": "part",
+            "key_points": ["one point"],
+            "entities": {"people": [], "organizations": [], "dates": [], "amounts": []},
+            "sentiment": next(sentiments, "neutral"),
+            "action_items": [],
+            "topics": []
+        }
+
+    service._extract = extract
+    text = " ".join(f"Sentence number {i} of the call." for i in range(4))
+    output = asyncio.run(service.generate_structured_output(text))
+    assert output["sentiment"] in ALLOWED_SENTIMENTS
+    assert output["key_points"] == ["one point"]
+
+
+def test_validate_rejects_a_sentiment_outside_the_schema():
+    parser = get_output_parser(OUTPUT_FORMAT, TranscriptProcessingService.STRUCTURED_OUTPUT_ENUMS)
+    merged = merge_outputs([{"sentiment": "positive"}], OUTPUT_FORMAT)
+    merged["summary"] = "call"
+    assert parser.validate(merged)["sentiment"] == "positive"
+    merged["sentiment"] = "mixed"
+    try:
+        parser.validate(merged)
+    except OutputParseError:
+        pass
+    else:
+        raise AssertionError("'mixed' passed validation")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Checks for the upstream circuit breaker (resilience.py) and the Backboard
+analyzer's use of it (filtertext/analyzer.py).
+
+Run with: python -m pytest test_resilience.py
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from resilience import CircuitOpenError, ResilientUpstream, UpstreamPolicy
+from filtertext.analyzer import BackboardAnalyzer
+
+
+class UpstreamDown(Exception):
+    status_code = 503
+
+
+def make_upstream() -> ResilientUpstream:
+    return ResilientUpstream("test", UpstreamPolicy(
+        timeout_s=1.0, retries=2, backoff_base_s=0.0, backoff_max_s=0.0, breaker_failures=1, breaker_reset_s=0.05
+    ))
+
+
+async def fail():
+    raise UpstreamDown("503")
+
+
+async def open_then_wait(upstream: ResilientUpstream):
+    try:
+        await upstream.call(fail, idempotent=False)
+    except UpstreamDown:
+        pass
+    assert upstream.breaker.state == "open"
+    await asyncio.sleep(0.06)
+    assert upstream.breaker.state == "half_open"
+
+
+def test_failing_half_open_probe_reopens():
+    async def scenario():
+        upstream = make_upstream()
+        await open_then_wait(upstream)
+        try:
+            await upstream.call(fail)
+        except (UpstreamDown, CircuitOpenError):
+            pass
+        assert upstream.breaker.state == "open"
+
+    asyncio.run(scenario())
+
+
+def test_nested_call_rejected_by_breaker_does_not_close_it():
+    async def scenario():
+        upstream = make_upstream()
+        await open_then_wait(upstream)
+
+        async def nested():
+            return await upstream.call(fail)
+
+        try:
+            await upstream.call(nested)
+        except CircuitOpenError:
+            pass
+        assert upstream.breaker.state == "open"
+
+    asyncio.run(scenario())
+
+
+class DownClient:
+    """Backboard stand-in whose thread and message calls all fail with 503."""
+
+    base_url = "http://backboard.test"
+
+    def __init__(self):
+        self.calls = {"create_thread": 0, "add_message": 0}
+
+    async def create_assistant(self, **kwargs):
+        return SimpleNamespace(assistant_id="assistant-1")
+
+    async def create_thread(self, assistant_id):
+        self.calls["create_thread"] += 1
+        raise UpstreamDown("503")
+
+    async def add_message(self, **kwargs):
+        self.calls["add_message"] += 1
+        raise UpstreamDown("503")
+
+
+def test_analyzer_half_open_probe_with_upstream_down():
+    async def scenario():
+        upstream = make_upstream()
+        client = DownClient()
+        analyzer = BackboardAnalyzer(client, "prompt", state_path=None, upstream=upstream)
+        await open_then_wait(upstream)
+        started = time.monotonic()
+        try:
+            await analyzer.analyze("transcript", provider="google", model="gemini")
+        except (UpstreamDown, CircuitOpenError):
+            pass
+        assert upstream.breaker.state == "open"
+        # One thread creation per probe, not a nested retry loop inside it
+        assert client.calls["create_thread"] == 1
+        assert time.monotonic() - started < 1.0
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
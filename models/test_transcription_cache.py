@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Checks for coalesced transcriptions (audiotext/service.py, audiotext/cache.py).
+
+Run with: python -m pytest test_transcription_cache.py
+"""
+
+import asyncio
+import io
+import os
+import tempfile
+
+os.environ["TRANSCRIPTION_CACHE_DIR"] = tempfile.mkdtemp(prefix="finsight-test-cache-")
+
+from audiotext.service import AudioTranscriptionService
+
+AUDIO = b"RIFF" + bytes(range(256)) * 64
+
+
+def make_service(started: asyncio.Event, release: asyncio.Event) -> AudioTranscriptionService:
+    service = AudioTranscriptionService(api_key="test-key")
+
+    async def transcribe_audio(audio_file, filename):
+        started.set()
+        await release.wait()
+        audio_file.seek(0)
+        return {"text": f"{len(audio_file.read())} bytes", "normalization": {"applied": False}}
+
+    service.transcribe_audio = transcribe_audio
+    return service
+
+
+def test_waiter_survives_the_leader_going_away():
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+        service = make_service(started, release)
+        leader_upload, waiter_upload = io.BytesIO(AUDIO), io.BytesIO(AUDIO)
+
+        leader = asyncio.create_task(service.transcribe(leader_upload, "call.wav", long_audio=False))
+        await started.wait()
+        waiter = asyncio.create_task(service.transcribe(waiter_upload, "call.wav", long_audio=False))
+        await asyncio.sleep(0.01)
+
+        # The leader's client disconnects: its request is cancelled and its upload closed
+        leader.cancel()
+        leader_upload.close()
+        release.set()
+
+        result, coalesced, digest = await waiter
+        assert coalesced
+        assert result["text"] == f"{len(AUDIO)} bytes"
+        await service.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_cache_hit_leaves_the_upload_readable():
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+        release.set()
+        service = make_service(started, release)
+        audio = AUDIO + b"second"
+        first, _, _ = await service.transcribe(io.BytesIO(audio), "a.wav", long_audio=False)
+        upload = io.BytesIO(audio)
+        result, hit, _ = await service.transcribe(upload, "a.wav", long_audio=False)
+        assert hit and result == first
+        assert upload.read() == audio
+        await service.aclose()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")